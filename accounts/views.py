@@ -5,6 +5,7 @@ from django.urls import reverse_lazy
 from django.views import View
 from accounts.models import CustomUser
 from accounts.forms import CustomUserCreationForm, CustomAuthenticationForm
+from cars.history import merge_session_favorites
 
 
 class RegisterView(View):
@@ -30,6 +31,7 @@ class RegisterView(View):
                 DealerProfile.objects.create(user=user)
 
             login(request, user)
+            merge_session_favorites(request)
             return redirect("home")  # Change to your home page URL name
         return render(request, self.template_name, {"form": form})
 
@@ -52,6 +54,8 @@ class LoginView(View):
             user = authenticate(request, username=username, password=password)
             if user:
                 login(request, user)
+                # Favorites collected before logging in move to the account
+                merge_session_favorites(request)
                 return redirect("home")  # Change to your home page URL name
             else:
                 form.add_error(None, "Invalid username or password")
@@ -9,12 +9,14 @@ from .models import (Car,
                            WorkProcessStep,
                             CarFeature,
                              PaintedPart,
-                              ChangedPart)
+                              ChangedPart,
+                               ImageDerivative)
 
 from image_uploader_widget.admin import ImageUploaderInline
 from django.forms import DateInput
 from django.db import models
 from django import forms
+from .search import search_ids
 
 
 class YearMonthDateInput(DateInput):
@@ -52,7 +54,8 @@ class CarAdmin(admin.ModelAdmin):
     """
     list_display = ("brand", "model", "manufacture_date", "price", "customs_tax_estimate","total_price")
     list_filter = ("brand", "fuel_type", "transmission")
-    search_fields = ("brand", "model")
+    # Shows the search box; the search itself uses the index (see get_search_results)
+    search_fields = ("car_title", "vin", "brand__name", "model__name")
     inlines = [CarImageInline]
     ordering = ("-created_at",)
     readonly_fields = ("created_at", "updated_at")
@@ -60,6 +63,14 @@ class CarAdmin(admin.ModelAdmin):
     list_editable = ("customs_tax_estimate", )
     form = CarAdminForm
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Full-text search over names, VIN, features and description (see cars/search.py).
+        """
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search_ids(search_term)), False
+
     formfield_overrides = {
         models.DateField: {
             "widget": YearMonthDateInput
@@ -101,6 +112,23 @@ class OurValueAdmin(admin.ModelAdmin):
 class WorkProcessStepAdmin(admin.ModelAdmin):
     list_display = ('step_number', 'tab_label', 'step_title')
 
+# Image derivative queue
+@admin.register(ImageDerivative)
+class ImageDerivativeAdmin(admin.ModelAdmin):
+    list_display = ("source_name", "field_name", "variant", "status", "attempts", "updated_at")
+    list_filter = ("status", "variant", "field_name")
+    search_fields = ("source_name",)
+    readonly_fields = ("content_type", "object_id", "field_name", "variant", "source_name",
+                       "file", "error", "attempts", "created_at", "updated_at")
+    actions = ["requeue"]
+
+    @admin.action(description="Re-queue selected derivatives")
+    def requeue(self, request, queryset):
+        queryset.update(status=ImageDerivative.PENDING, error="")
+
+    def has_add_permission(self, request):
+        return False
+
 admin.site.register(CarFeature)
 admin.site.register(Brand)
 admin.site.register(CarModel)
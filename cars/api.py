@@ -0,0 +1,209 @@
+# cars/api.py
+"""
+Read-only JSON listing API: /api/v1/cars/.
+
+- Filters are the home page's (?category, brand, model, from_year,
+  to_year, q), read with the same filter_state()/filter_q().
+- Pages are keyset pages over (created_at, id), newest first, using the
+  listing's CursorPaginator and its opaque ?cursor= values.
+- ?fields=id,title,price returns only those keys. Only the columns and
+  joins behind the requested fields are loaded.
+- Rows are built by CarListSerializer from plain getters. ModelSerializer
+  would instead bind and run a Field object per attribute for every car.
+- Responses carry an ETag from the matching cars' latest updated_at and
+  count, and the brand/model version (renames change the embedded names
+  without touching the cars), so polling clients get 304s. It costs one
+  aggregate query, before any row is loaded. There is no Last-Modified:
+  a date cannot tell that a car was deleted.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import generics, permissions, serializers
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from cars.facets import filter_q, filter_state
+from cars.models import Car
+from cars.pagination import CursorPaginator
+from cars.reference import reference_version
+from cars.search import search_ids
+
+
+def _decimal(value):
+    # Decimals as strings, like DRF's DecimalField
+    return None if value is None else str(value)
+
+
+def _related(name):
+    def get(car, request):
+        obj = getattr(car, name)
+        return obj and {"id": obj.pk, "name": obj.name}
+    return get
+
+
+def _image(car, request):
+    return request.build_absolute_uri(car.main_image.url) if car.main_image else None
+
+
+# Field -> (columns loaded for it, relations joined for it, getter)
+CAR_FIELDS = {
+    "id": (("id",), (), lambda car, request: car.pk),
+    "url": (
+        ("slug",), (),
+        lambda car, request: request.build_absolute_uri(reverse("car_detail", args=[car.slug])),
+    ),
+    "title": (("car_title",), (), lambda car, request: car.car_title),
+    "brand": (("brand__name",), ("brand",), _related("brand")),
+    "model": (("model__name",), ("model",), _related("model")),
+    "year": (("model_year",), (), lambda car, request: car.model_year),
+    "category": (("category",), (), lambda car, request: car.category),
+    "fuel_type": (("fuel_type",), (), lambda car, request: car.fuel_type),
+    "transmission": (("transmission",), (), lambda car, request: car.transmission),
+    "engine_volume": (("engine_volume",), (), lambda car, request: _decimal(car.engine_volume)),
+    "mileage": (("mileage",), (), lambda car, request: car.mileage),
+    "price": (("price",), (), lambda car, request: _decimal(car.price)),
+    "total_price": (("total_price",), (), lambda car, request: _decimal(car.total_price)),
+    "vin": (("vin",), (), lambda car, request: car.vin),
+    "featured": (("featured",), (), lambda car, request: car.featured),
+    "main_image": (("main_image",), (), _image),
+    "created_at": (("created_at",), (), lambda car, request: car.created_at.isoformat()),
+    "updated_at": (("updated_at",), (), lambda car, request: car.updated_at.isoformat()),
+}
+
+# Columns every page needs for its cursors
+CURSOR_COLUMNS = ("id", "created_at")
+
+
+def requested_fields(params):
+    """
+    Field names asked for with ?fields=, in CAR_FIELDS order; all of them
+    without it. Unknown names are a 400.
+    """
+    value = params.get("fields", "")
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    if not names:
+        return tuple(CAR_FIELDS)
+    unknown = names - CAR_FIELDS.keys()
+    if unknown:
+        raise ValidationError({"fields": [f"Unknown field: {name}" for name in sorted(unknown)]})
+    return tuple(name for name in CAR_FIELDS if name in names)
+
+
+def optimize(queryset, fields):
+    """
+    The queryset loading only what `fields` render: their columns and joins.
+    """
+    columns = set(CURSOR_COLUMNS)
+    related = set()
+    for name in fields:
+        field_columns, field_related, _ = CAR_FIELDS[name]
+        columns.update(field_columns)
+        related.update(field_related)
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(columns))
+
+
+class CarListSerializer(serializers.BaseSerializer):
+    """
+    Read-only car rows limited to context["fields"] (all of CAR_FIELDS
+    without it).
+    """
+
+    def to_representation(self, car):
+        request = self.context["request"]
+        fields = self.context.get("fields", CAR_FIELDS)
+        return {name: CAR_FIELDS[name][2](car, request) for name in fields}
+
+
+class CarCursorPagination(BasePagination):
+    """
+    DRF adapter of cars.pagination.CursorPaginator, with ?page_size= up to
+    settings.CAR_API_MAX_PAGE_SIZE.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request):
+        default = getattr(settings, "CAR_API_PAGE_SIZE", 20)
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, default))
+        except ValueError:
+            page_size = default
+        return max(1, min(page_size, getattr(settings, "CAR_API_MAX_PAGE_SIZE", 100)))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = CursorPaginator(queryset, self.get_page_size(request))
+        try:
+            self.page = paginator.page(request.query_params.get(self.cursor_query_param))
+        except ValueError as exc:
+            raise NotFound(str(exc))
+        return self.page.object_list
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_link(self.page.next_cursor),
+            "previous": self.get_link(self.page.previous_cursor),
+            "results": data,
+        })
+
+
+class CarListAPIView(generics.ListAPIView):
+    """
+    Cars matching the home page filters, newest first (see module docstring).
+    """
+    serializer_class = CarListSerializer
+    pagination_class = CarCursorPagination
+    renderer_classes = (JSONRenderer,)
+    # Public and read-only: no session lookup or CSRF check needed
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+
+    def get_queryset(self):
+        queryset = Car.objects.filter(filter_q(filter_state(self.request.query_params)))
+        query = self.request.query_params.get("q", "").strip()
+        if query:
+            # Search narrows the cars; the API keeps its newest-first pages
+            queryset = queryset.filter(pk__in=search_ids(query))
+        return queryset
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), "fields": self.fields}
+
+    def etag(self, queryset):
+        """
+        ETag of the response for `queryset`. The car count is part of it,
+        so deletions change it too, and so is the brand/model version.
+        """
+        changed = queryset.aggregate(last_modified=Max("updated_at"), cars=Count("pk"))
+        # Different query strings are different responses
+        key = f"{self.request.get_full_path()}|{changed['last_modified']}|{changed['cars']}|{reference_version()}"
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        self.fields = requested_fields(request.query_params)
+        queryset = self.get_queryset()
+
+        etag = self.etag(queryset)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(optimize(queryset, self.fields))
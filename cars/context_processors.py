@@ -0,0 +1,13 @@
+# cars/context_processors.py
+from django.utils.functional import SimpleLazyObject
+
+from .history import visitor_favorites
+
+
+def favorites(request):
+    """
+    favorite_ids: the visitor's favorite car ids as a set, for the heart
+    icons on car cards. Only pages that use it read the session or, for
+    a logged-in user, run the one query.
+    """
+    return {"favorite_ids": SimpleLazyObject(lambda: frozenset(visitor_favorites(request)))}
@@ -0,0 +1,216 @@
+# cars/export.py
+"""
+Streaming bulk export of the catalogue, as NDJSON or CSV, optionally
+gzipped: the partner dump (/export/cars.ndjson, /export/cars.csv) and
+the export_cars command.
+
+Memory stays constant whatever the catalogue size:
+
+- car rows are read as tuples with QuerySet.iterator(chunk_size=...), a
+  server-side cursor on PostgreSQL, and every chunk gets its images and
+  features in one batched query each, without building model instances;
+- rows are serialized as they come and joined into ~64 KB chunks;
+- gzip is a zlib stream compressing chunk by chunk.
+
+Nothing but the current chunk of cars is ever held.
+"""
+import csv
+import json
+import zlib
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils.encoding import filepath_to_uri
+
+from cars.models import Car, CarImage
+
+# Columns of every exported row, in order
+COLUMNS = (
+    "id", "url", "title", "brand", "model", "year", "category", "fuel_type", "transmission",
+    "engine_volume", "mileage", "price", "total_price", "vin", "created_at", "updated_at",
+    "main_image", "images", "features",
+)
+
+# Car columns read for them
+EXPORT_FIELDS = (
+    "id", "slug", "car_title", "brand__name", "model__name", "model_year", "category", "fuel_type",
+    "transmission", "engine_volume", "mileage", "price", "total_price", "vin", "created_at",
+    "updated_at", "main_image",
+)
+
+# Separator of list values in CSV cells
+CSV_LIST_SEPARATOR = "|"
+
+# Size the output is grouped into before it is sent or compressed
+CHUNK_BYTES = 64 * 1024
+
+
+def _chunk_size():
+    return getattr(settings, "CAR_EXPORT_CHUNK_SIZE", 2000)
+
+
+def _file_url(storage, base_url):
+    """
+    Function turning a stored file name into its URL. FileSystemStorage
+    URLs are its base_url and the quoted name, built without asking the
+    storage for every file; other storages may sign their URLs.
+    """
+    if isinstance(storage, FileSystemStorage):
+        prefix = base_url + storage.base_url
+        return lambda name: prefix + filepath_to_uri(name)
+
+    def url(name):
+        url = storage.url(name)
+        return url if "://" in url else base_url + url
+    return url
+
+
+def _chunks(queryset, chunk_size):
+    # Car rows read through one cursor (server-side on PostgreSQL), a chunk at a time
+    rows = queryset.order_by("pk").values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def _gallery(car_ids):
+    """
+    ({car id: [image name, ...]}, {car id: [feature name, ...]}) of a chunk
+    of cars, with one query each.
+    """
+    images = defaultdict(list)
+    rows = CarImage.objects.filter(car_id__in=car_ids).order_by("pk")
+    for car_id, name in rows.values_list("car_id", "image"):
+        images[car_id].append(name)
+
+    features = defaultdict(list)
+    rows = Car.features.through.objects.filter(car_id__in=car_ids).order_by("carfeature__name")
+    for car_id, name in rows.values_list("car_id", "carfeature__name"):
+        features[car_id].append(name)
+    return images, features
+
+
+def _decimal(value):
+    return None if value is None else str(value)
+
+
+def export_rows(queryset=None, base_url="", chunk_size=None):
+    """
+    One dict per car (keys: COLUMNS) in id order, read chunk by chunk.
+    URLs are prefixed with `base_url`, e.g. "https://example.com".
+    """
+    if queryset is None:
+        queryset = Car.objects.all()
+    # The detail URL pattern is reversed once, not per car
+    detail_url = base_url + reverse("car_detail", args=["-slug-"])
+    main_image_url = _file_url(Car._meta.get_field("main_image").storage, base_url)
+    image_url = _file_url(CarImage._meta.get_field("image").storage, base_url)
+
+    for chunk in _chunks(queryset, chunk_size or _chunk_size()):
+        images, features = _gallery([row[0] for row in chunk])
+        for (
+            car_id, slug, title, brand, model, year, category, fuel_type, transmission, engine_volume,
+            mileage, price, total_price, vin, created_at, updated_at, main_image,
+        ) in chunk:
+            yield {
+                "id": car_id,
+                "url": detail_url.replace("-slug-", slug),
+                "title": title,
+                "brand": brand,
+                "model": model,
+                "year": year,
+                "category": category,
+                "fuel_type": fuel_type,
+                "transmission": transmission,
+                "engine_volume": _decimal(engine_volume),
+                "mileage": mileage,
+                "price": _decimal(price),
+                "total_price": _decimal(total_price),
+                "vin": vin,
+                "created_at": created_at.isoformat(),
+                "updated_at": updated_at.isoformat(),
+                "main_image": main_image_url(main_image) if main_image else None,
+                "images": [image_url(name) for name in images[car_id]],
+                "features": features[car_id],
+            }
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class _Echo:
+    """
+    File-like object handing back what csv.writer writes to it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(value)
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[column]) for column in COLUMNS])
+
+
+# Format -> (line writer, content type)
+FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv; charset=utf-8"),
+}
+
+
+def _grouped(lines, size=CHUNK_BYTES):
+    """
+    The lines joined into chunks of about `size` characters.
+    """
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def gzipped(chunks):
+    """
+    The byte chunks as one gzip stream, compressed as they come.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_text(format, queryset=None, base_url="", chunk_size=None):
+    """
+    The export as ~64 KB text chunks.
+    """
+    writer, _ = FORMATS[format]
+    return _grouped(writer(export_rows(queryset, base_url, chunk_size)))
+
+
+def export_stream(format, gzip=False, queryset=None, base_url="", chunk_size=None):
+    """
+    The export as UTF-8 byte chunks, gzipped when asked to.
+    """
+    chunks = (chunk.encode() for chunk in export_text(format, queryset, base_url, chunk_size))
+    return gzipped(chunks) if gzip else chunks
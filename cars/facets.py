@@ -0,0 +1,175 @@
+# cars/facets.py
+"""
+Result counts for the home page filter sidebar.
+
+Every count comes from one grouped query over the filterable columns:
+
+    SELECT category, brand_id, model_id, model_year, COUNT(*)
+    FROM cars_car GROUP BY category, brand_id, model_id, model_year
+
+This facet table has one row per distinct combination, far fewer rows than
+there are cars, and is cached until a car is saved or deleted (see
+cars/signals.py). The counts for one filter state are summed from it in
+Python and cached per normalized filter key.
+
+Only what the sidebar shows is counted: categories, brands and models.
+Each facet ignores its own filter, so the other brands keep their counts
+while one brand is selected. model_year is grouped for the year range
+filter and the ends of the year sliders.
+"""
+import hashlib
+import json
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from cars.models import Car
+
+# GET parameter -> type of the HomeView filters
+FILTER_PARAMS = {
+    "category": str,
+    "brand": int,
+    "model": int,
+    "from_year": int,
+    "to_year": int,
+}
+
+# Columns of a facet table row, followed by the number of cars
+COLUMNS = ("category", "brand_id", "model_id", "model_year")
+CATEGORY, BRAND, MODEL, MODEL_YEAR, CARS = range(5)
+
+# Equality filters -> row column
+FILTER_COLUMNS = {"category": CATEGORY, "brand": BRAND, "model": MODEL}
+
+# Facet -> (row column, filters it ignores)
+FACETS = {
+    "category": (CATEGORY, ("category",)),
+    "brand": (BRAND, ("brand", "model")),  # a model implies its brand
+    "model": (MODEL, ("model",)),
+}
+
+VERSION_KEY = "car-facets:version"
+
+
+def filter_state(params):
+    """
+    The normalized filters of a query dict: blank and malformed values
+    are dropped, ids and years become ints.
+    """
+    state = {}
+    for name, cast in FILTER_PARAMS.items():
+        value = params.get(name)
+        if not value:
+            continue
+        try:
+            state[name] = cast(value)
+        except ValueError:
+            continue
+    return state
+
+
+def filter_q(state):
+    """
+    Q object applying a filter_state() to Car rows.
+    """
+    filters = Q()
+    if "category" in state:
+        filters &= Q(category=state["category"])
+    if "brand" in state:
+        filters &= Q(brand_id=state["brand"])
+    if "model" in state:
+        filters &= Q(model_id=state["model"])
+    # Year range from the sliders
+    if "from_year" in state:
+        filters &= Q(model_year__gte=state["from_year"])
+    if "to_year" in state:
+        filters &= Q(model_year__lte=state["to_year"])
+    return filters
+
+
+def _matches(row, state, ignore=()):
+    """
+    Whether a facet table row passes the filters, like filter_q() would.
+    """
+    for name, value in state.items():
+        if name in ignore:
+            continue
+        if name == "from_year":
+            if row[MODEL_YEAR] is None or row[MODEL_YEAR] < value:
+                return False
+        elif name == "to_year":
+            if row[MODEL_YEAR] is None or row[MODEL_YEAR] > value:
+                return False
+        elif row[FILTER_COLUMNS[name]] != value:
+            return False
+    return True
+
+
+def facet_version():
+    """
+    Version of the facet table, replaced whenever a car changes.
+    Reading it costs a shared cache lookup and no query.
+    """
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def invalidate_facets():
+    """
+    Retire every cached facet table and count after a car changed.
+    """
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _timeout():
+    return getattr(settings, "CAR_FACET_TIMEOUT", 300)
+
+
+def facet_table():
+    """
+    Rows of (category, brand_id, model_id, model_year, cars), loaded with
+    one grouped query and cached.
+    """
+    def load():
+        return [
+            tuple(row)
+            for row in Car.objects.order_by().values_list(*COLUMNS).annotate(cars=Count("id"))
+        ]
+
+    return cache.get_or_set(f"car-facets:{facet_version()}:table", load, _timeout())
+
+
+def facet_counts(state):
+    """
+    Counts for a filter_state():
+
+        {"total": 124, "category": {"auction": 12, ...}, "brand": {3: 40, ...},
+         "model": {17: 9, ...}, "min_year": 2012, "max_year": 2024}
+
+    min_year/max_year span every car, whatever the filters, for the year
+    sliders.
+    """
+    version = facet_version()
+    digest = hashlib.md5(json.dumps(state, sort_keys=True).encode()).hexdigest()
+    key = f"car-facets:{version}:{digest}"
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+
+    rows = facet_table()
+    counts = {"total": sum(row[CARS] for row in rows if _matches(row, state))}
+    for name, (column, ignore) in FACETS.items():
+        facet = Counter()
+        for row in rows:
+            if row[column] is not None and _matches(row, state, ignore):
+                facet[row[column]] += row[CARS]
+        counts[name] = dict(facet)
+
+    model_years = [row[MODEL_YEAR] for row in rows if row[MODEL_YEAR] is not None]
+    counts["min_year"] = min(model_years, default=None)
+    counts["max_year"] = max(model_years, default=None)
+
+    cache.set(key, counts, _timeout())
+    return counts
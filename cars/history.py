@@ -0,0 +1,138 @@
+# cars/history.py
+"""
+Per-visitor car lists kept in the session: recently viewed cars and
+favorites.
+
+Both are lists of integer car ids, newest first, without duplicates and
+capped in length, so a session stays small however long someone browses.
+The session is only written when a list actually changes: viewing the
+latest car again, as a reload or the back button does, saves nothing.
+
+Older sessions stored favorites as strings, oldest first; they are read
+in the new order and rewritten on the next change.
+
+A logged-in user's favorites are FavoriteCar rows instead, so they follow
+the user across devices; the session's favorites are merged into them at
+login. visitor_favorites() picks the right source and loads it at most
+once per request.
+"""
+from django.conf import settings
+
+from cars.models import Car, FavoriteCar
+
+VIEWED_KEY = "viewed"
+FAVORITES_KEY = "favorites"
+
+
+def _ids(session, key):
+    values = session.get(key, [])
+    if any(isinstance(value, str) for value in values):
+        values = reversed(values)  # the old oldest-first strings
+    return list(dict.fromkeys(int(value) for value in values if str(value).isdigit()))
+
+
+def _store(session, key, ids):
+    """
+    Put ids in the session unless it already holds exactly them.
+    Returns whether the session changed.
+    """
+    if session.get(key) == ids:
+        return False
+    session[key] = ids
+    return True
+
+
+def recently_viewed(session):
+    return _ids(session, VIEWED_KEY)
+
+
+def record_view(session, car_id):
+    """
+    Move car_id to the front of the recently viewed cars; only the last
+    settings.CAR_RECENTLY_VIEWED_LIMIT are kept. Returns whether the
+    session changed.
+    """
+    viewed = recently_viewed(session)
+    if viewed[:1] == [car_id]:
+        return False
+    limit = getattr(settings, "CAR_RECENTLY_VIEWED_LIMIT", 20)
+    viewed = [car_id] + [viewed_id for viewed_id in viewed if viewed_id != car_id]
+    return _store(session, VIEWED_KEY, viewed[:limit])
+
+
+def favorite_ids(session):
+    return _ids(session, FAVORITES_KEY)
+
+
+def toggle_favorite_car(session, car_id):
+    """
+    Add car_id to the favorites, or remove it if it is one already.
+    Past settings.CAR_FAVORITES_LIMIT the oldest favorites drop out.
+    Returns (added, favorite ids).
+    """
+    favorites = favorite_ids(session)
+    added = car_id not in favorites
+    if added:
+        favorites = [car_id] + favorites[:getattr(settings, "CAR_FAVORITES_LIMIT", 200) - 1]
+    else:
+        favorites.remove(car_id)
+    _store(session, FAVORITES_KEY, favorites)
+    return added, favorites
+
+
+# --- Favorites of the visitor behind a request ---
+
+def _is_user(request):
+    user = getattr(request, "user", None)
+    return user is not None and user.is_authenticated
+
+
+def visitor_favorites(request):
+    """
+    Favorite car ids of the request's visitor, newest first: one query
+    for a logged-in user, the session otherwise.
+    """
+    if not hasattr(request, "_favorite_ids"):
+        if _is_user(request):
+            request._favorite_ids = list(
+                FavoriteCar.objects.filter(user=request.user).values_list("car_id", flat=True)
+            )
+        else:
+            request._favorite_ids = favorite_ids(request.session)
+    return request._favorite_ids
+
+
+def toggle_visitor_favorite(request, car_id):
+    """
+    toggle_favorite_car() for the request's visitor. Returns
+    (added, favorite ids), or (False, None) for an unknown car of a
+    logged-in user.
+    """
+    if not _is_user(request):
+        added, request._favorite_ids = toggle_favorite_car(request.session, car_id)
+        return added, request._favorite_ids
+
+    deleted, _ = FavoriteCar.objects.filter(user=request.user, car_id=car_id).delete()
+    if not deleted:
+        if not Car.objects.filter(pk=car_id).exists():
+            return False, None
+        FavoriteCar.objects.get_or_create(user=request.user, car_id=car_id)
+    request.__dict__.pop("_favorite_ids", None)
+    return not deleted, visitor_favorites(request)
+
+
+def merge_session_favorites(request):
+    """
+    Move the session's favorites into the just logged-in user's, in one
+    insert, and drop them from the session.
+    """
+    car_ids = favorite_ids(request.session)
+    if car_ids:
+        existing = set(Car.objects.filter(pk__in=car_ids).values_list("pk", flat=True))
+        # Oldest first, so the newest favorite gets the highest id
+        FavoriteCar.objects.bulk_create(
+            [FavoriteCar(user=request.user, car_id=car_id) for car_id in reversed(car_ids) if car_id in existing],
+            ignore_conflicts=True,
+        )
+    request.session.pop(FAVORITES_KEY, None)
+    request.__dict__.pop("_favorite_ids", None)
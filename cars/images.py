@@ -0,0 +1,548 @@
+# cars/images.py
+"""
+Background derivative pipeline for car media.
+
+Saving a Car or CarImage only stores the uploaded original and queues one
+ImageDerivative row per (image field, variant). The worker command
+`manage.py process_car_images` picks pending rows up, renders them with
+Pillow (optionally in a process pool) and marks them ready or failed.
+"""
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from PIL import Image, features
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Car, CarImage, ImageDerivative
+from .page_cache import touch_car
+
+# Canvas sizes (width, height) rendered for every image, keyed by size name
+SIZES = {
+    "thumb": (200, 150),
+    "card": (480, 360),
+    "detail": (1000, 750),
+    "zoom": (2000, 1500),
+}
+
+# Output formats: MIME type, Pillow encoder options and file extension
+FORMATS = {
+    "avif": {"mime": "image/avif", "save": {"format": "AVIF", "quality": 60}, "extension": "avif"},
+    "webp": {"mime": "image/webp", "save": {"format": "WEBP", "quality": 80, "method": 4}, "extension": "webp"},
+    "jpeg": {"mime": "image/jpeg", "save": {"format": "JPEG", "quality": 90}, "extension": "jpg"},
+}
+
+
+def enabled_formats():
+    """
+    Formats rendered for every size, best first. JPEG is always the fallback;
+    AVIF is opt-in (settings.CAR_IMAGE_AVIF) because encoding it is slow.
+    """
+    formats = ["webp", "jpeg"]
+    if getattr(settings, "CAR_IMAGE_AVIF", False) and features.check("avif"):
+        formats.insert(0, "avif")
+    return formats
+
+
+# Variant name ("card.webp") -> (canvas size, format)
+VARIANTS = {
+    f"{size}.{image_format}": (dimensions, image_format)
+    for size, dimensions in SIZES.items()
+    for image_format in enabled_formats()
+}
+
+DEFAULT_VARIANT = "detail.jpeg"
+
+# Inline preview stored on the owner row (see Car.placeholder)
+PLACEHOLDER_SIZE = (32, 24)
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Models whose identical uploads share a single original file on disk
+DEDUPLICATED_MODELS = ("cars.carimage",)
+
+
+def render_canvas(img, output_size):
+    """
+    Resize an RGB image to cover `output_size` while keeping its aspect
+    ratio and centre it on a white canvas of exactly that size.
+    """
+    ratio = max(output_size[0] / img.width, output_size[1] / img.height)
+    new_size = (int(img.width * ratio), int(img.height * ratio))
+    resized = img.resize(new_size, Image.LANCZOS)
+
+    background = Image.new("RGB", output_size, (255, 255, 255))
+    x = (output_size[0] - new_size[0]) // 2
+    y = (output_size[1] - new_size[1]) // 2
+    background.paste(resized, (x, y))
+    return background
+
+
+def render_placeholder(img):
+    """
+    Returns (data URI of a 32x24 WebP preview, dominant colour as #rrggbb)
+    for an RGB image.
+    """
+    preview = render_canvas(img, PLACEHOLDER_SIZE)
+    buffer = BytesIO()
+    preview.save(buffer, format="WEBP", quality=40)
+    data_uri = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    # Most frequent colour of a 4-colour palette of the photo itself (no canvas padding)
+    sample = img.copy()
+    sample.thumbnail(PLACEHOLDER_SIZE)
+    paletted = sample.quantize(colors=4)
+    _, index = max(paletted.getcolors())
+    red, green, blue = paletted.getpalette()[index * 3:index * 3 + 3]
+    return data_uri, f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def render_variants(source_path, targets, placeholder=False):
+    """
+    Decode the source once and encode every (name, size, format) target.
+    Returns ({name: bytes}, placeholder or None). Runs without touching the
+    database so it can be used in worker processes.
+    """
+    with Image.open(source_path) as img:
+        img = img.convert("RGB")  # prevent errors for PNG w/ alpha
+    img.thumbnail(SIZES["zoom"])
+
+    rendered = {}
+    canvases = {}
+    for name, size, image_format in targets:
+        if size not in canvases:
+            canvases[size] = render_canvas(img, size)
+        buffer = BytesIO()
+        canvases[size].save(buffer, **FORMATS[image_format]["save"])
+        rendered[name] = buffer.getvalue()
+    return rendered, render_placeholder(img) if placeholder else None
+
+
+def file_hash(name):
+    """
+    SHA-256 hex digest of a stored file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with default_storage.open(name, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def release_file(name, exclude_pk=None):
+    """
+    Delete a derivative file unless another derivative row still uses it.
+    Derivative files are content-addressed, so identical originals share them.
+    """
+    if not name:
+        return
+    in_use = ImageDerivative.objects.filter(file=name).exclude(pk=exclude_pk).exists()
+    if not in_use and default_storage.exists(name):
+        default_storage.delete(name)
+
+
+def deduplicate_original(instance, field_name, source_hash):
+    """
+    Point a freshly uploaded gallery image at an identical file that is
+    already stored and remove the duplicate upload from disk.
+    """
+    source = getattr(instance, field_name)
+    twin = (
+        ImageDerivative.objects.filter(
+            content_type=ContentType.objects.get_for_model(instance),
+            field_name=field_name,
+            source_hash=source_hash,
+        )
+        .exclude(source_name=source.name)
+        .values_list("source_name", flat=True)
+        .first()
+    )
+    if not twin or not default_storage.exists(twin):
+        return
+
+    default_storage.delete(source.name)
+    source.name = twin
+    # queryset.update() keeps post_save from firing a second time
+    type(instance).objects.filter(pk=instance.pk).update(**{field_name: twin})
+
+
+def is_placeholder_source(model, field_name):
+    return getattr(model, "PLACEHOLDER_FIELD", None) == field_name
+
+
+def copy_placeholder(instance, twins):
+    """
+    Reuse the placeholder already computed for identical bytes on another
+    row. Clears a stale placeholder and returns False when there is none.
+    """
+    values = ("", "")
+    owners = {(twin.content_type_id, twin.object_id, twin.field_name) for twin in twins.values()}
+    for content_type_id, object_id, field_name in owners:
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if not is_placeholder_source(model, field_name):
+            continue
+        found = (
+            model.objects.filter(pk=object_id)
+            .exclude(placeholder="")
+            .values_list("placeholder", "dominant_color")
+            .first()
+        )
+        if found:
+            values = found
+            break
+
+    if (instance.placeholder, instance.dominant_color) != tuple(values):
+        instance.placeholder, instance.dominant_color = values
+        type(instance).objects.filter(pk=instance.pk).update(
+            placeholder=instance.placeholder, dominant_color=instance.dominant_color
+        )
+    return bool(values[0])
+
+
+def touch_owners(derivatives):
+    """
+    Mark the cars owning the given derivatives as changed, so their
+    detail pages start serving them: one touch_car() for the whole batch.
+    """
+    object_ids = {}
+    for derivative in derivatives:
+        object_ids.setdefault(derivative.content_type_id, set()).add(derivative.object_id)
+
+    car_ids = set()
+    for content_type_id, ids in object_ids.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is Car:
+            car_ids |= ids
+        elif model is CarImage:
+            car_ids.update(CarImage.objects.filter(pk__in=ids).values_list("car_id", flat=True))
+    touch_car(*sorted(car_ids))
+
+
+def _retryable(derivative):
+    return (
+        derivative.status == ImageDerivative.FAILED
+        and derivative.attempts < getattr(settings, "CAR_IMAGE_MAX_ATTEMPTS", 3)
+    )
+
+
+def enqueue_derivatives(instance):
+    """
+    Queue every variant of each image field on `instance` whose original
+    changed since it was last processed, or whose render failed fewer than
+    settings.CAR_IMAGE_MAX_ATTEMPTS times. Fields that were cleared lose
+    their derivatives.
+
+    When the stored name is unchanged this costs a single SELECT. A new
+    name is hashed; bytes that were processed before (here or for another
+    image) reuse the existing derivative instead of being rendered again.
+    """
+    content_type = ContentType.objects.get_for_model(instance)
+    ready = []
+    existing = {
+        (derivative.field_name, derivative.variant): derivative
+        for derivative in ImageDerivative.objects.filter(
+            content_type=content_type, object_id=instance.pk
+        )
+    }
+
+    for field_name in instance.IMAGE_FIELDS:
+        source = getattr(instance, field_name)
+
+        if not source:
+            for variant in VARIANTS:
+                if (field_name, variant) in existing:
+                    existing[field_name, variant].delete()
+            if is_placeholder_source(instance, field_name) and instance.placeholder:
+                copy_placeholder(instance, {})
+            continue
+
+        stale = [
+            variant for variant in VARIANTS
+            if (field_name, variant) not in existing
+            or existing[field_name, variant].source_name != source.name
+            or _retryable(existing[field_name, variant])
+        ]
+        if not stale:
+            continue
+
+        try:
+            source_hash = file_hash(source.name)
+        except OSError:
+            # Missing original: queue it anyway, the worker records the failure
+            source_hash = ""
+        if source_hash and instance._meta.label_lower in DEDUPLICATED_MODELS:
+            deduplicate_original(instance, field_name, source_hash)
+
+        twins = None
+        for variant in stale:
+            derivative = existing.get((field_name, variant)) or ImageDerivative(
+                content_type=content_type,
+                object_id=instance.pk,
+                field_name=field_name,
+                variant=variant,
+            )
+            # A retry of the same original keeps counting its attempts
+            retry = derivative.pk and derivative.source_name == source.name
+            derivative.source_name = source.name
+
+            if (
+                source_hash and derivative.pk and derivative.source_hash == source_hash
+                and derivative.status != ImageDerivative.FAILED
+            ):
+                # Same bytes under a new name: keep the current state
+                derivative.save(update_fields=["source_name", "updated_at"])
+                continue
+
+            old_file = derivative.file.name
+            if not source_hash:
+                twins = {}
+            elif twins is None:
+                twins = {
+                    twin.variant: twin
+                    for twin in ImageDerivative.objects.filter(
+                        source_hash=source_hash, status=ImageDerivative.READY
+                    ).exclude(file="")
+                }
+                if is_placeholder_source(instance, field_name) and not copy_placeholder(instance, twins):
+                    # Let the worker decode the original once to build its placeholder
+                    twins = {}
+            twin = twins.get(variant)
+            derivative.source_hash = source_hash
+            derivative.error = ""
+            if not retry:
+                derivative.attempts = 0
+            if twin:
+                derivative.file = twin.file.name
+                derivative.width, derivative.height = twin.width, twin.height
+                derivative.status = ImageDerivative.READY
+                ready.append(derivative)
+            else:
+                derivative.file = ""
+                derivative.width = derivative.height = None
+                derivative.status = ImageDerivative.PENDING
+            derivative.save()
+
+            if old_file and old_file != derivative.file.name:
+                release_file(old_file, exclude_pk=derivative.pk)
+
+    touch_owners(ready)
+
+
+def _render_job(job):
+    """
+    Process-pool entry point: returns (source path, {target name: bytes},
+    placeholder or None, error message).
+    """
+    source_path, targets, placeholder = job
+    try:
+        return (source_path, *render_variants(source_path, targets, placeholder), "")
+    except Exception as exc:  # Pillow raises a variety of exception types
+        return source_path, {name: None for name, _, _ in targets}, None, f"{exc.__class__.__name__}: {exc}"
+
+
+def derivative_name(derivative):
+    """
+    Content-addressed storage name, e.g. derivatives/card/ab/ab12....webp
+    Identical originals therefore share one rendered file per variant.
+    """
+    size, image_format = derivative.variant.split(".")
+    digest = derivative.source_hash
+    return f"derivatives/{size}/{digest[:2]}/{digest}.{FORMATS[image_format]['extension']}"
+
+
+def worker_pool(workers):
+    """
+    Process pool for Pillow work, or None to render in-process (workers <= 1).
+    """
+    if workers <= 1:
+        return None
+    # django.setup lets spawn/forkserver children unpickle jobs from this module
+    return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+
+
+def _live_originals(derivatives):
+    """
+    {(source hash, source name): name to render from}. An original deleted
+    since it was queued (e.g. a replaced main image) is swapped for another
+    stored copy of the same bytes, from this batch or any other row, so
+    one missing file does not fail every row sharing its hash.
+    """
+    names = {}
+    for derivative in derivatives:
+        names.setdefault(derivative.source_hash, {})[derivative.source_name] = None
+
+    originals = {}
+    for source_hash, candidates in names.items():
+        live = [name for name in candidates if default_storage.exists(name)]
+        if not live:
+            others = (
+                ImageDerivative.objects.filter(source_hash=source_hash)
+                .exclude(source_name__in=list(candidates))
+                .values_list("source_name", flat=True)
+                .distinct()
+            )
+            found = next((name for name in others if default_storage.exists(name)), None)
+            live = [found] if found else []
+        for name in candidates:
+            # Nothing alive: render from its own name and record the failure
+            originals[source_hash, name] = name if name in live else (live[0] if live else name)
+    return originals
+
+
+def process_derivatives(derivatives, executor=None, force=False):
+    """
+    Render the given derivatives and store the results.
+    Each original is decoded once for all of its variants. With an executor
+    from worker_pool() the Pillow work is fanned out to worker processes
+    while all database and storage writes stay in the calling process.
+    Files already rendered for the same bytes are reused unless `force`.
+    A result is stored only if its row still has the status and original
+    it was read with: an image replaced meanwhile was queued again, and
+    the render of its old original is dropped.
+    Returns the number of derivatives that became ready.
+    """
+    by_pk, errors = {}, {}
+    for derivative in derivatives:
+        by_pk[derivative.pk] = derivative
+        if not derivative.source_hash:
+            # Rows queued before hashes were tracked
+            try:
+                derivative.source_hash = file_hash(derivative.source_name)
+            except OSError as exc:
+                derivative.source_hash = ""
+                errors[derivative.pk] = f"{exc.__class__.__name__}: {exc}"
+
+    # One job per original; (bytes, variant) pairs already on disk are skipped
+    targets, placeholder_owners, seen = {}, {}, set()
+    originals = _live_originals(derivative for derivative in by_pk.values() if derivative.pk not in errors)
+    for derivative in by_pk.values():
+        if derivative.pk in errors:
+            continue
+        source_path = default_storage.path(originals[derivative.source_hash, derivative.source_name])
+        model = ContentType.objects.get_for_id(derivative.content_type_id).model_class()
+        if is_placeholder_source(model, derivative.field_name):
+            placeholder_owners.setdefault(source_path, set()).add(
+                (model, derivative.object_id, derivative.field_name, derivative.source_name)
+            )
+
+        name = derivative_name(derivative)
+        if name in seen or (not force and default_storage.exists(name)):
+            continue
+        seen.add(name)
+        size, image_format = VARIANTS[derivative.variant]
+        targets.setdefault(source_path, []).append((name, size, image_format))
+
+    jobs = [
+        (source_path, targets.get(source_path, []), source_path in placeholder_owners)
+        for source_path in {**targets, **placeholder_owners}
+    ]
+    if executor is not None and len(jobs) > 1:
+        results = list(executor.map(_render_job, jobs))
+    else:
+        results = [_render_job(job) for job in jobs]
+
+    failed = {}
+    for source_path, rendered, placeholder, error in results:
+        for name, content in rendered.items():
+            if content is None:
+                failed[name] = error
+            else:
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                default_storage.save(name, ContentFile(content))
+        if placeholder:
+            data_uri, color = placeholder
+            for model, pk, field_name, source_name in placeholder_owners.get(source_path, ()):
+                model.objects.filter(pk=pk, **{field_name: source_name}).update(
+                    placeholder=data_uri, dominant_color=color
+                )
+
+    ready = []
+    for derivative in by_pk.values():
+        old_file, read_status = derivative.file.name, derivative.status
+        derivative.attempts += 1
+        error = errors.get(derivative.pk) or failed.get(derivative_name(derivative))
+        if error:
+            derivative.status = ImageDerivative.FAILED
+            derivative.error = error
+        else:
+            derivative.file = derivative_name(derivative)
+            derivative.width, derivative.height = VARIANTS[derivative.variant][0]
+            derivative.status = ImageDerivative.READY
+            derivative.error = ""
+        written = ImageDerivative.objects.filter(
+            pk=derivative.pk, status=read_status, source_name=derivative.source_name
+        ).update(
+            source_hash=derivative.source_hash,
+            file=derivative.file.name,
+            width=derivative.width,
+            height=derivative.height,
+            status=derivative.status,
+            error=derivative.error,
+            attempts=derivative.attempts,
+            updated_at=timezone.now(),
+        )
+        if not written:
+            # Replaced or deleted meanwhile: its row no longer wants this render
+            if not error:
+                release_file(derivative.file.name)
+            continue
+        if not error:
+            ready.append(derivative)
+        if old_file and old_file != derivative.file.name:
+            release_file(old_file, exclude_pk=derivative.pk)
+
+    touch_owners(ready)
+    return len(ready)
+
+
+def process_pending(limit=None, executor=None):
+    """
+    Process the oldest pending derivatives. Returns (processed, ready).
+
+    The batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED and stays
+    locked until its results are stored, so concurrent workers take
+    different rows (on databases without row locks every worker may read
+    the same rows, and the conditional write keeps the results sound).
+    """
+    with transaction.atomic():
+        queue = ImageDerivative.objects.select_for_update(skip_locked=True).filter(
+            status=ImageDerivative.PENDING, variant__in=VARIANTS
+        ).order_by("created_at")
+        if limit:
+            queue = queue[:limit]
+        derivatives = list(queue)
+        return len(derivatives), process_derivatives(derivatives, executor=executor)
+
+
+def ready_variants(image):
+    """
+    Ready derivatives of an image field (a FieldFile) keyed by variant name.
+    Uses the owner's prefetched derivatives when they are available.
+    """
+    if not image:
+        return {}
+    field_name = image.field.name
+    return {
+        derivative.variant: derivative
+        for derivative in image.instance.derivatives.all()
+        if derivative.field_name == field_name
+        and derivative.status == ImageDerivative.READY
+        and derivative.source_name == image.name
+        and derivative.file
+    }
+
+
+def ready_url(image, variant=DEFAULT_VARIANT):
+    """
+    URL of the ready `variant` of an image field, or None.
+    """
+    derivative = ready_variants(image).get(variant)
+    return derivative.file.url if derivative else None
@@ -0,0 +1,121 @@
+"""
+Synthetic catalogue used by the benchmark commands.
+Not a command itself: Django skips modules starting with an underscore.
+"""
+import random
+import statistics
+import time
+
+from django.db import connection
+
+from cars.models import Brand, Car, CarModel, Year
+
+BRANDS = 20
+MODELS_PER_BRAND = 8
+YEARS = range(2005, 2025)
+
+FUEL_TYPES = ["petrol", "diesel", "hybrid", "electric"]
+TRANSMISSIONS = ["automatic", "manual"]
+CATEGORIES = [Car.AUCTION, Car.KOREA_STOCK, Car.ON_THE_WAY, Car.SOLD_OUT]
+TRIMS = ["Base", "Comfort", "Premium", "Sport", "Luxury", "Limited", "Prestige", "Signature"]
+BODIES = ["Sedan", "Hatchback", "SUV", "Crossover", "Coupe", "Wagon", "Minivan", "Pickup"]
+# Letters of a VIN (I, O and Q are never used)
+VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+SYLLABLES = ["ka", "ro", "su", "ne", "ti", "mo", "va", "le", "zo", "ri", "an", "to", "se", "ga"]
+
+
+def model_name(brand, model):
+    """
+    A made-up single-word model name, distinct for every (brand, model).
+    """
+    index = brand * MODELS_PER_BRAND + model
+    return "".join(
+        SYLLABLES[index // len(SYLLABLES) ** power % len(SYLLABLES)] for power in range(3)
+    ).capitalize()
+
+
+def seed_cars(count, batch_size=5000, seed=0):
+    """
+    Bulk-insert `count` random cars (no signals, no images) and return
+    the reference rows they point at as (brands, models, years).
+    """
+    rng = random.Random(seed)
+    brands = [Brand.objects.create(name=f"Bench Brand {i}") for i in range(BRANDS)]
+    models = [
+        CarModel.objects.create(name=f"Bench {model_name(i, j)}", brand=brand)
+        for i, brand in enumerate(brands)
+        for j in range(MODELS_PER_BRAND)
+    ]
+    years = [Year.objects.create(year=year) for year in YEARS]
+    token = rng.getrandbits(32)
+
+    for start in range(0, count, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, count)):
+            model = rng.choice(models)
+            year = rng.choice(years)
+            price = rng.randint(5000, 80000)
+            batch.append(Car(
+                slug=f"bench-{token:x}-{i}",
+                vin="".join(rng.choice(VIN_CHARS) for _ in range(17)),
+                car_title=f"{model.name} {rng.choice(TRIMS)} {rng.choice(BODIES)}",
+                category=rng.choice(CATEGORIES),
+                featured=rng.random() < 0.02,
+                brand_id=model.brand_id,
+                model=model,
+                year=year,
+                # bulk_create skips Car.save(), which fills model_year
+                model_year=year.year,
+                fuel_type=rng.choice(FUEL_TYPES),
+                transmission=rng.choice(TRANSMISSIONS),
+                engine_volume=rng.choice([1.2, 1.4, 1.6, 2.0, 2.5, 3.0, 3.5]),
+                price=price,
+                total_price=price + rng.randint(500, 8000),
+                mileage=rng.randint(0, 250000),
+            ))
+        Car.objects.bulk_create(batch)
+
+    return brands, models, years
+
+
+def random_vectors(count, seed=0):
+    """
+    {car id: recommendation.car_vector()} for `count` random cars, built in
+    memory without touching the database.
+    """
+    rng = random.Random(seed)
+    models = [(brand, brand * MODELS_PER_BRAND + j) for brand in range(BRANDS) for j in range(MODELS_PER_BRAND)]
+    vectors = {}
+    for car_id in range(1, count + 1):
+        brand_id, model_id = rng.choice(models)
+        vectors[car_id] = {
+            "price": float(rng.randint(5500, 88000)),
+            "model_year": rng.choice(YEARS),
+            "engine_volume": rng.choice([1.2, 1.4, 1.6, 2.0, 2.5, 3.0, 3.5]),
+            "mileage": rng.randint(0, 250000),
+            "model_id": model_id,
+            "brand_id": brand_id,
+            "fuel_type": rng.choice(FUEL_TYPES),
+            "transmission": rng.choice(TRANSMISSIONS),
+        }
+    return vectors
+
+
+def analyze():
+    """
+    Refresh planner statistics after a bulk load.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def timed(func, repeat):
+    """
+    Median wall time of `func()` in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
@@ -0,0 +1,88 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from cars.export import export_stream
+from cars.models import Car, CarFeature, CarImage
+
+from ._synthetic import analyze, seed_cars
+
+FEATURES = 20
+FEATURES_PER_CAR = 3
+IMAGES_PER_CAR = 2
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the streaming catalogue export (cars/export.py) on synthetic
+    cars with gallery images and features.
+
+    The cars are inserted inside a transaction that is rolled back at the
+    end. For every format, plain and gzipped, it reports the rows per
+    second and the output size of a full export, then the peak Python
+    memory of a second run under tracemalloc. "list" is the former way:
+    every car loaded at once with its images and features.
+    """
+    help = "Benchmark the streaming catalogue export against synthetic cars."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cars", type=int, default=100_000, help="Synthetic cars to insert.")
+        parser.add_argument("--chunk-size", type=int, help="Cars read per database round trip.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}, {options['cars']} synthetic cars")
+
+        with transaction.atomic():
+            seed_cars(options["cars"])
+            self.seed_gallery()
+            analyze()
+
+            self.stdout.write(f"{'case':<12} {'rows/s':>10} {'output':>10} {'peak':>10}")
+            for name, export in self.cases(options["chunk_size"]):
+                started = time.perf_counter()
+                size = export()
+                rate = options["cars"] / (time.perf_counter() - started)
+                tracemalloc.start()
+                export()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                output = f"{size / 2**20:.1f}MB" if size is not None else "-"
+                self.stdout.write(f"{name:<12} {rate:>10.0f} {output:>10} {peak / 2**20:>8.1f}MB")
+            transaction.set_rollback(True)
+
+    def seed_gallery(self, batch_size=5000):
+        rng = random.Random(0)
+        features = CarFeature.objects.bulk_create(
+            [CarFeature(name=f"Bench feature {i}") for i in range(FEATURES)]
+        )
+        through = Car.features.through
+        car_ids = list(Car.objects.values_list("pk", flat=True))
+        for start in range(0, len(car_ids), batch_size):
+            batch = car_ids[start:start + batch_size]
+            through.objects.bulk_create([
+                through(car_id=car_id, carfeature_id=feature.pk)
+                for car_id in batch
+                for feature in rng.sample(features, FEATURES_PER_CAR)
+            ])
+            CarImage.objects.bulk_create([
+                CarImage(car_id=car_id, image=f"cars/gallery/bench-{car_id}-{i}.jpg")
+                for car_id in batch
+                for i in range(IMAGES_PER_CAR)
+            ])
+
+    def cases(self, chunk_size):
+        def streamed(format, gzip):
+            # Bytes written; the chunks are dropped as a network socket would
+            return lambda: sum(len(chunk) for chunk in export_stream(format, gzip=gzip, chunk_size=chunk_size))
+
+        def listed():
+            list(Car.objects.select_related("brand", "model").prefetch_related("images", "features"))
+
+        yield "list", listed
+        yield "ndjson", streamed("ndjson", False)
+        yield "ndjson.gz", streamed("ndjson", True)
+        yield "csv", streamed("csv", False)
+        yield "csv.gz", streamed("csv", True)
@@ -0,0 +1,77 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Case, When
+
+from cars.models import Car
+from cars.views import FavoritesView
+
+from ._synthetic import analyze, seed_cars, timed
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks one page of the favorites list at several favorite counts.
+
+    "case/when" is the former ordering: every favorite in a CASE WHEN
+    branch and an IN list, then OFFSET/LIMIT. "sliced" is FavoritesView's
+    current one: the ordered ids are sliced in Python and only the page's
+    cars are fetched. Synthetic cars are inserted inside a transaction that
+    is rolled back at the end. For the first and the last page it reports
+    the median latency and the number of SQL parameters sent.
+    """
+    help = "Benchmark the favorites page ordering against synthetic cars."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--favorites", type=int, nargs="+", default=[10, 100, 1000], help="Favorite counts to measure."
+        )
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (median is reported).")
+
+    def handle(self, *args, **options):
+        per_page = FavoritesView.paginate_by
+        cars = max(options["favorites"]) * 2
+        self.stdout.write(f"Database: {connection.vendor}, {cars} synthetic cars, {per_page} per page")
+
+        with transaction.atomic():
+            seed_cars(cars)
+            analyze()
+            car_ids = list(Car.objects.values_list("pk", flat=True))
+            rng = random.Random(0)
+
+            self.stdout.write(
+                f"{'favorites':>9} {'page':>5} {'case/when':>11} {'params':>7} {'sliced':>9} {'params':>7}"
+            )
+            for count in options["favorites"]:
+                favorites = rng.sample(car_ids, count)
+                pages = (count - 1) // per_page + 1
+                for number in sorted({1, pages}):
+                    old, old_params = self.case_when(favorites, number, per_page)
+                    new, new_params = self.sliced(favorites, number, per_page)
+                    self.stdout.write(
+                        f"{count:>9} {number:>5} "
+                        f"{timed(old, options['repeat']):>9.2f}ms {old_params:>7} "
+                        f"{timed(new, options['repeat']):>7.2f}ms {new_params:>7}"
+                    )
+            transaction.set_rollback(True)
+
+    def case_when(self, favorites, number, per_page):
+        order = Case(*[When(id=car_id, then=position) for position, car_id in enumerate(favorites)])
+        start = (number - 1) * per_page
+        page = Car.objects.for_listing().filter(id__in=favorites).order_by(order)[start:start + per_page]
+        return lambda: list(page.all()), self.params(page)
+
+    def sliced(self, favorites, number, per_page):
+        page_ids = favorites[(number - 1) * per_page:number * per_page]
+        queryset = Car.objects.for_listing().filter(pk__in=page_ids)
+
+        def fetch():
+            cars = Car.objects.for_listing().in_bulk(page_ids)
+            return [cars[car_id] for car_id in page_ids if car_id in cars]
+
+        return fetch, self.params(queryset)
+
+    @staticmethod
+    def params(queryset):
+        return len(queryset.query.sql_with_params()[1])
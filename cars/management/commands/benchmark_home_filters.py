@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from cars.models import Car
+from cars.views import HomeView
+
+from ._synthetic import analyze, seed_cars, timed
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the home page filter combinations with and without the
+    Car listing indexes (Car.Meta.indexes).
+
+    Synthetic cars are inserted into the configured database inside a
+    transaction that is rolled back at the end, so it can be run against
+    SQLite (core.settings.dev) or PostgreSQL (core.settings.prod) alike.
+    For every case it reports the median latency of the page query and of
+    its COUNT(*) before/after, and with --explain the query plans.
+    """
+    help = "Benchmark HomeView filters against synthetic cars, with and without the listing indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cars", type=int, default=100_000, help="Synthetic cars to insert.")
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (median is reported).")
+        parser.add_argument("--explain", action="store_true", help="Print the query plans.")
+        parser.add_argument("--keep", action="store_true", help="Commit the synthetic cars instead of rolling back.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}, {options['cars']} synthetic cars")
+
+        with transaction.atomic():
+            brands, models, years = seed_cars(options["cars"])
+            brand, model = models[0].brand, models[0]
+            cases = [
+                ("all", {}),
+                ("category", {"category": Car.AUCTION}),
+                ("brand", {"brand": brand.pk}),
+                ("brand+model", {"brand": brand.pk, "model": model.pk}),
+                ("years", {"from_year": 2015, "to_year": 2018}),
+                ("category+brand+model+years", {
+                    "category": Car.AUCTION, "brand": brand.pk, "model": model.pk,
+                    "from_year": 2010, "to_year": 2020,
+                }),
+            ]
+
+            self.set_indexes(enabled=False)
+            before = self.measure(cases, options)
+            self.set_indexes(enabled=True)
+            after = self.measure(cases, options)
+
+            self.report(before, after)
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def set_indexes(self, enabled):
+        # Plain DDL: SQLite's schema editor refuses to run inside atomic()
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for index in Car._meta.indexes:
+                if enabled:
+                    sql = str(index.create_sql(Car, editor))
+                else:
+                    sql = editor.sql_delete_index % {
+                        "table": editor.quote_name(Car._meta.db_table),
+                        "name": editor.quote_name(index.name),
+                    }
+                cursor.execute(sql)
+        analyze()
+
+    def querysets(self, cases):
+        factory = RequestFactory()
+        for name, params in cases:
+            view = HomeView()
+            view.setup(factory.get("/", params))
+            yield name, view.get_queryset().order_by("-created_at", "-id")
+        yield "featured", Car.objects.filter(featured=True).order_by("-created_at", "-id")
+
+    def measure(self, cases, options):
+        results = {}
+        for name, queryset in self.querysets(cases):
+            page = queryset[:HomeView.paginate_by]
+            results[name] = {
+                "page": timed(lambda: list(page.all()), options["repeat"]),
+                "count": timed(queryset.count, options["repeat"]),
+                "plan": page.explain() if options["explain"] else "",
+            }
+        return results
+
+    def report(self, before, after):
+        self.stdout.write(
+            f"{'case':<28} {'page before':>12} {'page after':>12} {'count before':>13} {'count after':>12}"
+        )
+        for name in before:
+            self.stdout.write(
+                f"{name:<28} {before[name]['page']:>10.2f}ms {after[name]['page']:>10.2f}ms "
+                f"{before[name]['count']:>11.2f}ms {after[name]['count']:>10.2f}ms"
+            )
+        for name in before:
+            if before[name]["plan"]:
+                self.stdout.write(f"\n== {name}\n-- before\n{before[name]['plan']}\n-- after\n{after[name]['plan']}")
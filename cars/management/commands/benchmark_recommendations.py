@@ -0,0 +1,44 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from cars.recommendation import feature_matrix, recommendations_per_car
+
+from ._synthetic import random_vectors, timed
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the recommendation scoring on synthetic catalogues.
+
+    Car vectors are generated in memory, so no database rows are written.
+    For every catalogue size it reports the median latency of one car's
+    top-K query, the per-car cost
+    when a batch is scored at once (as rebuild_car_recommendations does),
+    and the cost of building the matrix.
+    """
+    help = "Benchmark recommendation scoring at several catalogue sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cars", type=int, nargs="+", default=[10_000, 100_000], help="Catalogue sizes to measure."
+        )
+        parser.add_argument("--repeat", type=int, default=20, help="Queries per measurement (median is reported).")
+        parser.add_argument("--batch", type=int, default=256, help="Cars scored together for the batch figure.")
+
+    def handle(self, *args, **options):
+        k = recommendations_per_car()
+        rng = random.Random(1)
+
+        self.stdout.write(f"{'cars':>8} {'build':>10} {'numpy/query':>12} {'numpy/car@batch':>16}")
+        for count in options["cars"]:
+            vectors = random_vectors(count)
+            ids = list(vectors)
+            matrix = feature_matrix(vectors)
+
+            build = timed(lambda: feature_matrix(vectors), 3)
+            query = timed(lambda: matrix.top_neighbours([rng.choice(ids)], k), options["repeat"])
+            batch = rng.sample(ids, min(options["batch"], count))
+            per_car = timed(lambda: matrix.top_neighbours(batch, k), 3) / len(batch)
+
+            self.stdout.write(f"{count:>8} {build:>8.1f}ms {query:>10.2f}ms {per_car:>14.3f}ms")
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from cars.models import Car
+from cars.search import search_ids, write_documents
+from cars.views import HomeView
+
+from ._synthetic import analyze, seed_cars, timed
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the catalogue search (cars/search.py) on synthetic cars.
+
+    The cars and their search documents are inserted inside a transaction
+    that is rolled back at the end, so it can be run against SQLite
+    (FTS5) or PostgreSQL (tsvector + trigram) alike. For every query it
+    reports the number of matches and the median latency of the ranked
+    search alone and of a filtered home page of results.
+    """
+    help = "Benchmark the catalogue search against synthetic cars."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cars", type=int, default=100_000, help="Synthetic cars to insert.")
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (median is reported).")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}, {options['cars']} synthetic cars")
+
+        with transaction.atomic():
+            brands, models, years = seed_cars(options["cars"])
+            car_ids = list(Car.objects.order_by("pk").values_list("pk", flat=True))
+            for start in range(0, len(car_ids), 5000):
+                write_documents(Car.objects.filter(pk__in=car_ids[start:start + 5000]))
+            analyze()
+
+            vin = Car.objects.get(pk=car_ids[len(car_ids) // 2]).vin
+            model = models[len(models) // 4]
+            # "Bench Mosuka" -> "mosuka", a word of about 1 in 160 titles
+            word = model.name.split()[-1].lower()
+            cases = [
+                ("model", word, {}),
+                ("prefix", word[:4], {}),
+                ("model+trim", f"{word} sport", {}),
+                ("vin prefix", vin[:8], {}),
+                ("typo", word[0] + word[2] + word[1] + word[3:], {}),
+                ("filtered", word, {"brand": model.brand_id, "from_year": 2010}),
+                ("common", "sport", {}),
+            ]
+
+            self.stdout.write(f"{'case':<12} {'query':<20} {'matches':>8} {'search':>9} {'page':>9}")
+            for name, query, filters in cases:
+                matches = len(search_ids(query))
+                search = timed(lambda: search_ids(query), options["repeat"])
+                page = timed(lambda: self.home_page(query, filters), options["repeat"])
+                self.stdout.write(f"{name:<12} {query:<20} {matches:>8} {search:>7.2f}ms {page:>7.2f}ms")
+            transaction.set_rollback(True)
+
+    def home_page(self, query, filters):
+        view = HomeView()
+        view.setup(RequestFactory().get("/", {"q": query, **filters}))
+        view.object_list = view.get_queryset()
+        return view.paginate_queryset(view.object_list, view.paginate_by)
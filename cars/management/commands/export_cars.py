@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.export import FORMATS, export_stream, export_text
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    """
+    Writes the whole catalogue as NDJSON or CSV, e.g. for the nightly
+    partner dump. Cars are streamed in chunks (see cars/export.py), so
+    memory use does not grow with the catalogue.
+    """
+    help = "Export every car as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson", help="Output format.")
+        parser.add_argument("--output", default="-", help="File to write; - for standard output.")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output (needs --output).")
+        parser.add_argument("--base-url", default="", help='Prefix of the URLs, e.g. "https://example.com".')
+        parser.add_argument("--chunk-size", type=int, help="Cars read per database round trip.")
+
+    def handle(self, *args, **options):
+        export = {
+            "queryset": Car.objects.all(),
+            "base_url": options["base_url"].rstrip("/"),
+            "chunk_size": options["chunk_size"],
+        }
+        if options["output"] == "-":
+            if options["gzip"]:
+                raise CommandError("--gzip needs --output.")
+            for chunk in export_text(options["format"], **export):
+                self.stdout.write(chunk, ending="")
+            return
+
+        started = time.monotonic()
+        cars = Car.objects.count()
+        with open(options["output"], "wb") as output:
+            for chunk in export_stream(options["format"], gzip=options["gzip"], **export):
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {cars} cars to {options['output']} in {time.monotonic() - started:.1f}s."
+        ))
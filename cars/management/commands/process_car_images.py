@@ -0,0 +1,52 @@
+import os
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+
+from cars.images import process_pending, worker_pool
+from cars.recommendation import process_refresh_queue
+
+
+class Command(BaseCommand):
+    """
+    Worker for the image derivative queue.
+    Renders pending ImageDerivative rows and refreshes the recommendations
+    of queued cars (CarRecommendationRefresh); runs until stopped unless
+    --once is given.
+    """
+    help = "Render pending car image derivatives (resized variants) and refresh queued recommendations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Derivatives rendered per batch.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Size of the Pillow process pool (1 renders in-process).",
+        )
+        parser.add_argument(
+            "--recommendation-batch-size",
+            type=int,
+            default=500,
+            help="Cars whose recommendations are refreshed per batch.",
+        )
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        with worker_pool(options["workers"]) or nullcontext() as executor:
+            while True:
+                processed, ready = process_pending(limit=options["batch_size"], executor=executor)
+                if processed:
+                    self.stdout.write(
+                        f"Processed {processed} derivative(s), {ready} ready, {processed - ready} failed."
+                    )
+                refreshed = process_refresh_queue(limit=options["recommendation_batch_size"])
+                if refreshed:
+                    self.stdout.write(f"Refreshed the recommendations of {refreshed} car(s).")
+                if processed or refreshed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
@@ -0,0 +1,174 @@
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from cars.images import VARIANTS, enqueue_derivatives, process_derivatives, worker_pool
+from cars.models import Car, CarImage, ImageDerivative
+
+# Model -> timestamp field used by --since
+SOURCES = (
+    (Car, "updated_at"),
+    (CarImage, "uploaded_at"),
+)
+
+
+class Command(BaseCommand):
+    """
+    Regenerates image derivatives for existing Car and CarImage rows,
+    e.g. after a canvas size changed or a variant was added.
+
+    Rows are streamed in primary-key order with iterator() and rendered in
+    batches across a process pool. After every batch the last finished
+    primary key is written to a checkpoint file, so an interrupted run
+    continues where it stopped with --resume.
+    """
+    help = "Rebuild resized variants for all car media."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only-missing",
+            action="store_true",
+            help="Render only variants that are missing, pending or failed.",
+        )
+        parser.add_argument(
+            "--since",
+            help="Only rows changed/uploaded on or after this date (YYYY-MM-DD or ISO datetime).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be rendered and exit.")
+        parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint.")
+        parser.add_argument(
+            "--checkpoint",
+            default=os.path.join(settings.MEDIA_ROOT, "derivatives", ".rebuild-checkpoint.json"),
+            help="Checkpoint file used by --resume.",
+        )
+        parser.add_argument("--batch-size", type=int, default=100, help="Rows rendered per batch.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Size of the Pillow process pool (1 renders in-process).",
+        )
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options["since"])
+        checkpoint = self.load_checkpoint(options["checkpoint"]) if options["resume"] else {}
+
+        started = time.monotonic()
+        totals = {"rows": 0, "rendered": 0, "ready": 0}
+
+        pool = None if options["dry_run"] else worker_pool(options["workers"])
+        with pool or nullcontext() as executor:
+            for model, timestamp_field in SOURCES:
+                label = model._meta.label_lower
+                queryset = model.objects.order_by("pk")
+                if since:
+                    queryset = queryset.filter(**{f"{timestamp_field}__gte": since})
+                if checkpoint.get(label):
+                    queryset = queryset.filter(pk__gt=checkpoint[label])
+
+                batch = []
+                for instance in queryset.iterator(chunk_size=options["batch_size"]):
+                    batch.append(instance)
+                    if len(batch) >= options["batch_size"]:
+                        self.run_batch(batch, options, executor, totals, checkpoint)
+                        batch = []
+                if batch:
+                    self.run_batch(batch, options, executor, totals, checkpoint)
+
+        if not options["dry_run"] and os.path.exists(options["checkpoint"]):
+            os.remove(options["checkpoint"])
+
+        elapsed = time.monotonic() - started
+        rate = totals["rendered"] / elapsed if elapsed else 0
+        verb = "Would render" if options["dry_run"] else "Rendered"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['rendered']} image(s) for {totals['rows']} row(s) "
+            f"in {elapsed:.1f}s ({rate:.1f} images/sec); {totals['ready']} ready."
+        ))
+
+    def run_batch(self, batch, options, executor, totals, checkpoint):
+        model = type(batch[0])
+        content_type = ContentType.objects.get_for_model(model)
+        pks = [instance.pk for instance in batch]
+        totals["rows"] += len(batch)
+
+        if options["dry_run"]:
+            totals["rendered"] += self.count_stale(batch, content_type, options["only_missing"])
+            return
+
+        for instance in batch:
+            # Creates rows for new variants and picks up replaced originals
+            enqueue_derivatives(instance)
+
+        derivatives = ImageDerivative.objects.filter(
+            content_type=content_type, object_id__in=pks, variant__in=VARIANTS
+        )
+        if options["only_missing"]:
+            derivatives = derivatives.exclude(status=ImageDerivative.READY)
+        derivatives = list(derivatives)
+
+        totals["rendered"] += len(derivatives)
+        totals["ready"] += process_derivatives(
+            derivatives, executor=executor, force=not options["only_missing"]
+        )
+
+        checkpoint[model._meta.label_lower] = pks[-1]
+        self.save_checkpoint(options["checkpoint"], checkpoint)
+        self.stdout.write(f"{model._meta.verbose_name}: up to pk {pks[-1]}, {totals['rendered']} image(s) so far")
+
+    def count_stale(self, batch, content_type, only_missing):
+        """
+        Number of derivatives a real run would render for this batch.
+        """
+        ready = set(
+            ImageDerivative.objects.filter(
+                content_type=content_type,
+                object_id__in=[instance.pk for instance in batch],
+                status=ImageDerivative.READY,
+            ).values_list("object_id", "field_name", "variant", "source_name")
+        )
+        count = 0
+        for instance in batch:
+            for field_name in instance.IMAGE_FIELDS:
+                source = getattr(instance, field_name)
+                if not source:
+                    continue
+                for variant in VARIANTS:
+                    if not only_missing or (instance.pk, field_name, variant, source.name) not in ready:
+                        count += 1
+        return count
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f"Invalid --since value: {value!r}")
+            parsed = datetime.combine(day, datetime.min.time())
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def load_checkpoint(self, path):
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return {}
+
+    def save_checkpoint(self, path, checkpoint):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(checkpoint, handle)
+        os.replace(tmp_path, path)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cars.models import Car
+from cars.recommendation import (
+    feature_matrix, load_vectors, neighbour_lists, recommendations_per_car, write_recommendations,
+)
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the CarRecommendation list of every car from scratch,
+    e.g. after the similarity weights changed. Saves keep the table fresh
+    in between, so this is not needed on a schedule.
+    """
+    help = "Rebuild the precomputed similar-car lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Cars written per transaction.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        k = recommendations_per_car()
+        vectors = load_vectors(Car.objects.all())
+        car_ids = sorted(vectors)
+        matrix = feature_matrix(vectors)
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(car_ids), batch_size):
+            batch = car_ids[start:start + batch_size]
+            write_recommendations(neighbour_lists(batch, vectors, k, matrix))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {k} recommendations for {len(car_ids)} cars in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cars.models import Car
+from cars.search import write_documents
+
+
+class Command(BaseCommand):
+    """
+    Rewrites the CarSearchDocument of every car, e.g. after deploying the
+    search tables or changing what a document contains. Saves keep the
+    documents fresh in between, so this is not needed on a schedule.
+    """
+    help = "Rebuild the catalogue search documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000, help="Cars written per transaction.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        car_ids = list(Car.objects.order_by("pk").values_list("pk", flat=True))
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(car_ids), batch_size):
+            write_documents(Car.objects.filter(pk__in=car_ids[start:start + batch_size]))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the search documents of {len(car_ids)} cars in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 16:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0018_car_changed_parts_count_car_painted_parts_count'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('field_name', models.CharField(help_text='Image field on the owner, e.g. main_image', max_length=50)),
+                ('variant', models.CharField(help_text='Variant name from cars.images.VARIANTS', max_length=50)),
+                ('source_name', models.CharField(help_text='Storage name of the original this derivative is built from', max_length=255)),
+                ('file', models.ImageField(blank=True, upload_to='derivatives/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Image Derivative',
+                'verbose_name_plural': 'Image Derivatives',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='derivative_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id', 'field_name', 'variant'), name='unique_image_derivative')],
+            },
+        ),
+    ]
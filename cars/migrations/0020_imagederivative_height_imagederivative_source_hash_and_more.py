@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0019_imagederivative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagederivative',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagederivative',
+            name='source_hash',
+            field=models.CharField(blank=True, db_index=True, help_text="SHA-256 of the original's bytes; unchanged bytes are never re-rendered", max_length=64),
+        ),
+        migrations.AddField(
+            model_name='imagederivative',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
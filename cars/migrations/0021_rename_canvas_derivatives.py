@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def rename_canvas(apps, schema_editor):
+    """
+    The single 1000x750 'canvas' variant is now the 'detail.jpeg' entry of
+    the variant registry; keep already rendered files.
+    """
+    ImageDerivative = apps.get_model("cars", "ImageDerivative")
+    ImageDerivative.objects.filter(variant="canvas").update(variant="detail.jpeg")
+
+
+def restore_canvas(apps, schema_editor):
+    ImageDerivative = apps.get_model("cars", "ImageDerivative")
+    ImageDerivative.objects.filter(variant="detail.jpeg").update(variant="canvas")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0020_imagederivative_height_imagederivative_source_hash_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_canvas, restore_canvas),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0021_rename_canvas_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='dominant_color',
+            field=models.CharField(blank=True, default='', editable=False, max_length=7),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='placeholder',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Tiny base64 WebP data URI of main_image'),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='dominant_color',
+            field=models.CharField(blank=True, default='', editable=False, max_length=7),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='placeholder',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Tiny base64 WebP data URI of the image'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0022_car_dominant_color_car_placeholder_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['-created_at', '-id'], name='car_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='car_category_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['brand', '-created_at', '-id'], name='car_brand_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['brand', 'model', '-created_at', '-id'], name='car_brand_model_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('featured', True)), fields=['-created_at', '-id'], name='car_featured_newest_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import ExtractYear
+
+
+def backfill_model_year(apps, schema_editor):
+    """
+    Copy year.year onto every car, falling back to the manufacture date,
+    with two set-based UPDATEs instead of saving car by car.
+    """
+    Car = apps.get_model("cars", "Car")
+    Year = apps.get_model("cars", "Year")
+    Car.objects.filter(year__isnull=False).update(
+        model_year=Subquery(Year.objects.filter(pk=OuterRef("year_id")).values("year")[:1])
+    )
+    Car.objects.filter(year__isnull=True, manufacture_date__isnull=False).update(
+        model_year=ExtractYear("manufacture_date")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0024_car_model_year'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_model_year, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0025_backfill_car_model_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='cars.car')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for', to='cars.car')),
+            ],
+            options={
+                'verbose_name': 'Car Recommendation',
+                'verbose_name_plural': 'Car Recommendations',
+                'ordering': ('car', 'rank'),
+                'constraints': [models.UniqueConstraint(fields=('car', 'rank'), name='unique_car_recommendation_rank'), models.UniqueConstraint(fields=('car', 'recommended'), name='unique_car_recommendation')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Existing cars get their recommendations from
+    `manage.py rebuild_car_recommendations`, run once after deploying: the
+    full rebuild is O(N²) and uses the live scoring code, neither of which
+    belongs in a migration.
+    """
+
+    dependencies = [
+        ('cars', '0026_car_recommendation'),
+    ]
+
+    operations = []
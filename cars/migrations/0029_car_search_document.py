@@ -0,0 +1,104 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Full-text indexes over cars_carsearchdocument (see cars/search.py)
+INDEX_SQL = {
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE cars_carsearch_fts USING fts5(
+            title, vin, features, description,
+            content='cars_carsearchdocument', content_rowid='car_id', prefix='2 3'
+        )
+        """,
+        "CREATE VIRTUAL TABLE cars_carsearch_vocab USING fts5vocab(cars_carsearch_fts, 'col')",
+        """
+        CREATE TRIGGER cars_carsearch_fts_insert AFTER INSERT ON cars_carsearchdocument BEGIN
+            INSERT INTO cars_carsearch_fts(rowid, title, vin, features, description)
+            VALUES (new.car_id, new.title, new.vin, new.features, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER cars_carsearch_fts_delete AFTER DELETE ON cars_carsearchdocument BEGIN
+            INSERT INTO cars_carsearch_fts(cars_carsearch_fts, rowid, title, vin, features, description)
+            VALUES ('delete', old.car_id, old.title, old.vin, old.features, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER cars_carsearch_fts_update AFTER UPDATE ON cars_carsearchdocument BEGIN
+            INSERT INTO cars_carsearch_fts(cars_carsearch_fts, rowid, title, vin, features, description)
+            VALUES ('delete', old.car_id, old.title, old.vin, old.features, old.description);
+            INSERT INTO cars_carsearch_fts(rowid, title, vin, features, description)
+            VALUES (new.car_id, new.title, new.vin, new.features, new.description);
+        END
+        """,
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        """
+        ALTER TABLE cars_carsearchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', title), 'A')
+            || setweight(to_tsvector('simple', vin), 'A')
+            || setweight(to_tsvector('simple', features), 'B')
+            || setweight(to_tsvector('simple', description), 'C')
+        ) STORED
+        """,
+        "CREATE INDEX car_search_vector_idx ON cars_carsearchdocument USING gin (search_vector)",
+        "CREATE INDEX car_search_title_trgm_idx ON cars_carsearchdocument USING gin (title gin_trgm_ops)",
+    ],
+}
+
+DROP_SQL = {
+    "sqlite": [
+        "DROP TRIGGER IF EXISTS cars_carsearch_fts_insert",
+        "DROP TRIGGER IF EXISTS cars_carsearch_fts_delete",
+        "DROP TRIGGER IF EXISTS cars_carsearch_fts_update",
+        "DROP TABLE IF EXISTS cars_carsearch_vocab",
+        "DROP TABLE IF EXISTS cars_carsearch_fts",
+    ],
+    "postgresql": [
+        "DROP INDEX IF EXISTS car_search_title_trgm_idx",
+        "DROP INDEX IF EXISTS car_search_vector_idx",
+        "ALTER TABLE cars_carsearchdocument DROP COLUMN IF EXISTS search_vector",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in INDEX_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in DROP_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    """
+    Existing cars get their documents from `manage.py rebuild_car_search`,
+    run once after deploying; saves keep them fresh afterwards.
+    """
+
+    dependencies = [
+        ('cars', '0028_favorite_car'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarSearchDocument',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='cars.car')),
+                ('title', models.TextField(blank=True, default='')),
+                ('vin', models.CharField(blank=True, default='', max_length=17)),
+                ('features', models.TextField(blank=True, default='')),
+                ('description', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Car Search Document',
+                'verbose_name_plural': 'Car Search Documents',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0029_car_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarRecommendationRefresh',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='cars.car')),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Car Recommendation Refresh',
+                'verbose_name_plural': 'Car Recommendation Refreshes',
+            },
+        ),
+    ]
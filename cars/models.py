@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.db import models
 from django.utils.text import slugify
-from PIL import Image
 from django.core.exceptions import ValidationError
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
 
 
 class Brand(models.Model):
@@ -81,6 +83,64 @@ class ChangedPart(models.Model):
     def __str__(self):
         return f"{self.car} – {self.name}"
 
+class CarQuerySet(models.QuerySet):
+    """
+    Reusable querysets for the pages that render Car rows.
+    """
+
+    # Columns rendered by partials/cars.html
+    LISTING_FIELDS = (
+        "id", "slug", "category", "price", "mileage", "main_image",
+        "placeholder", "dominant_color", "changed_parts_count", "painted_parts_count",
+        "created_at", "brand__name", "model__name", "year__year",
+    )
+
+    def for_listing(self):
+        """
+        Cars ready for a listing grid: brand/model/year joined in, only the
+        card's columns loaded and the main image's ready derivatives
+        prefetched, so a page costs the same number of queries at any size.
+        """
+        return (
+            self.select_related("brand", "model", "year")
+            .only(*self.LISTING_FIELDS)
+            .prefetch_related(
+                models.Prefetch(
+                    "derivatives",
+                    queryset=ImageDerivative.objects.filter(
+                        field_name="main_image", status=ImageDerivative.READY
+                    ),
+                )
+            )
+        )
+
+    @staticmethod
+    def detail_lookups():
+        """
+        Prefetch lookups for everything the car detail page renders.
+        Also used with prefetch_related_objects() on an already loaded car.
+        """
+        return (
+            "derivatives",
+            models.Prefetch(
+                "images",
+                queryset=CarImage.objects.order_by("pk").prefetch_related("derivatives"),
+            ),
+            "features",
+            "painted_parts",
+            "changed_parts",
+        )
+
+    def for_detail(self):
+        """
+        A car with everything its detail page renders: brand/model/year
+        joined in, gallery images (with their derivatives), features and
+        painted/changed parts prefetched. The page then costs a fixed number
+        of queries however many images or parts the car has.
+        """
+        return self.select_related("brand", "model", "year").prefetch_related(*self.detail_lookups())
+
+
 # Car model
 class Car(models.Model):
     """
@@ -150,6 +210,9 @@ class Car(models.Model):
     model = models.ForeignKey(CarModel, on_delete=models.CASCADE, null=True)
     year = models.ForeignKey(Year, on_delete=models.CASCADE, null=True)
     slug = models.SlugField(max_length=200, unique=True, blank=True)
+    # Copy of year.year (or the manufacture date's year) kept in sync on save,
+    # so year range filters are an index range scan without the Year join
+    model_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, db_index=True)
 
     # Technical details
     fuel_type = models.CharField(
@@ -198,6 +261,18 @@ class Car(models.Model):
     damage_map = models.ImageField(upload_to='body_maps/', null=True)
     paint_map = models.ImageField(upload_to='body_maps/', null=True)
 
+    # Resized variants of the images above, produced in the background
+    derivatives = GenericRelation("ImageDerivative")
+
+    # Inline preview of main_image shown until the real image loads
+    placeholder = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Tiny base64 WebP data URI of main_image"
+    )
+    dominant_color = models.CharField(max_length=7, blank=True, default="", editable=False)
+
     changed_parts_count = models.PositiveIntegerField(null=True, default=0)
     painted_parts_count = models.PositiveIntegerField(null=True, default=0)
 
@@ -222,11 +297,37 @@ class Car(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CarQuerySet.as_manager()
+
+    class Meta:
+        # Match the listing filters, each followed by the newest-first
+        # (created_at, id) order used for both numbered and keyset pages
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="car_newest_idx"),
+            models.Index(fields=["category", "-created_at", "-id"], name="car_category_newest_idx"),
+            models.Index(fields=["brand", "-created_at", "-id"], name="car_brand_newest_idx"),
+            models.Index(fields=["brand", "model", "-created_at", "-id"], name="car_brand_model_newest_idx"),
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(featured=True),
+                name="car_featured_newest_idx",
+            ),
+        ]
+
+    # Image fields processed by the derivative pipeline (see cars/images.py)
+    IMAGE_FIELDS = ("main_image", "damage_map", "paint_map")
+    PLACEHOLDER_FIELD = "main_image"
 
     def save(self, *args, **kwargs):
         """
         Automatically generates slug from brand, model, and year if not provided.
+        Image resizing is queued by a post_save signal and done by a worker.
         """
+        self.model_year = self.get_model_year()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"year", "manufacture_date"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "model_year"}
+
         # First save to get PK
         super().save(*args, **kwargs)
 
@@ -249,62 +350,15 @@ class Car(models.Model):
         if updated_fields:
             super().save(update_fields=updated_fields)
 
-
-        # # Set slug only if blank
-        # if not self.slug and self.pk:
-        #     super().save(*args, **kwargs)
-        #     self.slug = slugify(f"{self.brand}-{self.model}-{self.year}-{self.pk}")
-        # super().save(*args, **kwargs)
-
-        # # resize image
-        # output_size = (1000, 750)  # fixed container size (width, height)
-        # img = Image.open(self.main_image.path)
-        # img = img.convert("RGB")  # prevent errors for PNG w/ alpha
-
-        # # resize while keeping aspect ratio (always covers container)
-        # img.thumbnail((2000, 1500))  # allow upscaling
-        # ratio = max(output_size[0] / img.width, output_size[1] / img.height)
-        # new_size = (int(img.width * ratio), int(img.height * ratio))
-        # img = img.resize(new_size, Image.LANCZOS)
-
-        # # create background canvas
-        # background = Image.new("RGB", output_size, (255, 255, 255))
-
-        # # center position on canvas
-        # x = (output_size[0] - new_size[0]) // 2
-        # y = (output_size[1] - new_size[1]) // 2
-        # background.paste(img, (x, y))
-
-        # # save result
-        # background.save(self.main_image.path, quality=90)
-
-        # For body image map
-
-
-        # Calculate total_price automatically
-        # self.total_price = (self.price or 0) + (self.customs_tax_estimate or 0)
-        # super().save(*args, **kwargs)
-
-        def resize_image(image_field, output_size=(1000, 750)):
-            if not image_field:
-                return
-            from PIL import Image
-            img = Image.open(image_field.path)
-            img = img.convert("RGB")
-            img.thumbnail((2000, 1500))
-            ratio = max(output_size[0] / img.width, output_size[1] / img.height)
-            new_size = (int(img.width * ratio), int(img.height * ratio))
-            img = img.resize(new_size, Image.LANCZOS)
-            background = Image.new("RGB", output_size, (255, 255, 255))
-            x = (output_size[0] - new_size[0]) // 2
-            y = (output_size[1] - new_size[1]) // 2
-            background.paste(img, (x, y))
-            background.save(image_field.path, quality=90)
-
-        
-        resize_image(self.main_image)
-        resize_image(self.damage_map)
-        resize_image(self.paint_map)
+    def get_model_year(self):
+        """
+        The car's model year: the selected Year, else the manufacture date's year.
+        """
+        if self.year_id:
+            return self.year.year
+        if self.manufacture_date:
+            return self.manufacture_date.year
+        return None
 
     def __str__(self):
         return f"{self.brand} {self.model} {self.year}"
@@ -323,36 +377,166 @@ class CarImage(models.Model):
     image = models.ImageField(upload_to='cars/gallery/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
+    derivatives = GenericRelation("ImageDerivative")
 
-        super().save(*args, **kwargs)
+    placeholder = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Tiny base64 WebP data URI of the image"
+    )
+    dominant_color = models.CharField(max_length=7, blank=True, default="", editable=False)
+
+    IMAGE_FIELDS = ("image",)
+    PLACEHOLDER_FIELD = "image"
+
+    def __str__(self):
+        return f"Image for {self.car}"
 
-        # resize image
-        output_size = (1000, 750)  # fixed container size (width, height)
-        img = Image.open(self.image.path)
-        img = img.convert("RGB")  # prevent errors for PNG w/ alpha
 
-        # resize while keeping aspect ratio (always covers container)
-        img.thumbnail((2000, 1500))  # allow upscaling
-        ratio = max(output_size[0] / img.width, output_size[1] / img.height)
-        new_size = (int(img.width * ratio), int(img.height * ratio))
-        img = img.resize(new_size, Image.LANCZOS)
+# Image derivatives
+class ImageDerivative(models.Model):
+    """
+    A resized variant of one image field of a Car or CarImage.
+    Rows are created as 'pending' when an original is uploaded and
+    double as the job queue consumed by `manage.py process_car_images`.
+    """
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
 
-        # create background canvas
-        background = Image.new("RGB", output_size, (255, 255, 255))
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    owner = GenericForeignKey("content_type", "object_id")
 
-        # center position on canvas
-        x = (output_size[0] - new_size[0]) // 2
-        y = (output_size[1] - new_size[1]) // 2
-        background.paste(img, (x, y))
+    field_name = models.CharField(max_length=50, help_text="Image field on the owner, e.g. main_image")
+    variant = models.CharField(max_length=50, help_text="Variant name from cars.images.VARIANTS")
+    source_name = models.CharField(
+        max_length=255,
+        help_text="Storage name of the original this derivative is built from"
+    )
+    source_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="SHA-256 of the original's bytes; unchanged bytes are never re-rendered"
+    )
+    file = models.ImageField(upload_to='derivatives/', blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
 
-        # save result
-        background.save(self.image.path, quality=90)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
 
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Image Derivative"
+        verbose_name_plural = "Image Derivatives"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id", "field_name", "variant"],
+                name="unique_image_derivative",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="derivative_queue_idx"),
+        ]
 
     def __str__(self):
-        return f"Image for {self.car}"
-    
+        return f"{self.field_name}:{self.variant} ({self.status})"
+
+
+# Precomputed recommendations
+class CarRecommendation(models.Model):
+    """
+    One of the top-K most similar cars of a car, ranked from 1.
+    Maintained by cars/recommendation.py after a car is saved or deleted.
+    """
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="recommendations")
+    recommended = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="recommended_for")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = "Car Recommendation"
+        verbose_name_plural = "Car Recommendations"
+        ordering = ("car", "rank")
+        constraints = [
+            models.UniqueConstraint(fields=["car", "rank"], name="unique_car_recommendation_rank"),
+            models.UniqueConstraint(fields=["car", "recommended"], name="unique_car_recommendation"),
+        ]
+
+    def __str__(self):
+        return f"{self.car} #{self.rank}: {self.recommended}"
+
+
+class CarRecommendationRefresh(models.Model):
+    """
+    A car whose recommendations are out of date: queued in the transaction
+    that edits it and consumed in batches by the `manage.py
+    process_car_images` worker (see cars/recommendation.py).
+    """
+    car = models.OneToOneField(Car, on_delete=models.CASCADE, primary_key=True, related_name="+")
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Car Recommendation Refresh"
+        verbose_name_plural = "Car Recommendation Refreshes"
+
+    def __str__(self):
+        return f"{self.car} (queued {self.queued_at:%Y-%m-%d %H:%M})"
+
+
+
+class FavoriteCar(models.Model):
+    """
+    A car a logged-in user marked as favorite. Anonymous visitors keep
+    theirs in the session (see cars/history.py) until they log in.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="favorite_cars")
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="favorited_by")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Favorite Car"
+        verbose_name_plural = "Favorite Cars"
+        ordering = ("-created_at", "-pk")
+        constraints = [
+            # Also the index behind loading a user's favorites
+            models.UniqueConstraint(fields=["user", "car"], name="unique_favorite_car"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} → {self.car}"
+
+
+class CarSearchDocument(models.Model):
+    """
+    The text a car is found by, indexed by the database for full-text
+    search. Maintained by cars/search.py whenever the car, its features,
+    brand, model or year change.
+    """
+    car = models.OneToOneField(Car, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    title = models.TextField(blank=True, default="")  # brand, model, year and car_title
+    vin = models.CharField(max_length=17, blank=True, default="")
+    features = models.TextField(blank=True, default="")
+    description = models.TextField(blank=True, default="")
+
+    class Meta:
+        verbose_name = "Car Search Document"
+        verbose_name_plural = "Car Search Documents"
+
+    def __str__(self):
+        return self.title
 
 # --- 1. Core "About Us" Information (Hero + Mission + CTA) ---
 
@@ -0,0 +1,68 @@
+# cars/page_cache.py
+"""
+Cache of the rendered car detail page.
+
+The expensive, visitor-independent part of the page (gallery, specs,
+features, parts, maps, videos) is rendered once and stored together with
+the main image URL. Recommended cars are not cached: they are read from
+the precomputed CarRecommendation table. Entries are stamped with the
+car's slug and updated_at: a stamp mismatch is a miss, so an edited car is
+re-rendered in every process even when the cache backend is per-process
+(locmem).
+
+Changes to related rows (gallery images, parts, features) touch
+Car.updated_at and drop the entry from cars/signals.py; derivatives that
+become ready do the same, once per batch, from cars/images.py.
+"""
+from django.core.cache import caches
+from django.utils import timezone
+
+from cars.models import Car
+
+CACHE_ALIAS = "car_pages"
+
+
+def page_cache():
+    return caches[CACHE_ALIAS]
+
+
+def detail_key(car_id):
+    return f"car-detail:{car_id}"
+
+
+def detail_stamp(car):
+    return f"{car.slug}:{car.updated_at.isoformat()}"
+
+
+def get_detail(car):
+    """
+    The cached entry for this version of the car, or None.
+    """
+    entry = page_cache().get(detail_key(car.pk))
+    if entry and entry["stamp"] == detail_stamp(car):
+        return entry
+    return None
+
+
+def set_detail(car, **fragments):
+    """
+    Store the rendered fragments for this version of the car.
+    """
+    entry = {"stamp": detail_stamp(car), **fragments}
+    page_cache().set(detail_key(car.pk), entry)
+    return entry
+
+
+def invalidate_detail(*car_ids):
+    page_cache().delete_many([detail_key(car_id) for car_id in car_ids if car_id])
+
+
+def touch_car(*car_ids):
+    """
+    Mark cars as changed after an edit to one of their related rows.
+    queryset.update() bumps updated_at without firing Car signals again.
+    """
+    car_ids = [car_id for car_id in car_ids if car_id]
+    if car_ids:
+        Car.objects.filter(pk__in=car_ids).update(updated_at=timezone.now())
+        invalidate_detail(*car_ids)
@@ -0,0 +1,181 @@
+# cars/pagination.py
+"""
+Keyset (seek) pagination for the car listings.
+
+Instead of COUNT(*) + OFFSET, a page is fetched with a WHERE on the sort key
+of the last row seen, here (created_at, id) newest first:
+
+    WHERE created_at < :created_at OR (created_at = :created_at AND id < :id)
+    ORDER BY created_at DESC, id DESC LIMIT :per_page + 1
+
+so page 1000 costs the same as page 1. The position travels in an opaque
+?cursor= value. Totals come from a cached, approximate count.
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import Http404
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def encode_cursor(obj, direction=NEXT):
+    """
+    Opaque cursor pointing just past (NEXT) or just before (PREVIOUS) obj.
+    """
+    payload = json.dumps([obj.created_at.isoformat(), obj.pk, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    """
+    Returns (created_at, pk, direction); raises ValueError for anything
+    that was not produced by encode_cursor().
+    """
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        created_at, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(created_at)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {value!r}") from exc
+    if direction not in (NEXT, PREVIOUS):
+        raise ValueError(f"Invalid cursor: {value!r}")
+    return created_at, pk, direction
+
+
+def approximate_count(queryset, timeout=None):
+    """
+    COUNT(*) of the queryset, cached per SQL statement for a few minutes.
+    """
+    key = "car-count:" + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    if timeout is None:
+        timeout = getattr(settings, "CAR_LISTING_COUNT_TIMEOUT", 300)
+    return cache.get_or_set(key, queryset.order_by().count, timeout)
+
+
+class CursorPage:
+    """
+    One page of a keyset-paginated queryset.
+    Quacks enough like django.core.paginator.Page for the listing templates.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Newest-first keyset paginator over (created_at, id).
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    @property
+    def count(self):
+        return approximate_count(self.queryset)
+
+    def page(self, cursor=None):
+        """
+        The page after/before `cursor`, or the first page without one.
+        """
+        if not cursor:
+            return self._page(self.queryset.order_by("-created_at", "-pk"), None, NEXT)
+
+        created_at, pk, direction = decode_cursor(cursor)
+        if direction == NEXT:
+            rows = self.queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            ).order_by("-created_at", "-pk")
+        else:
+            rows = self.queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            ).order_by("created_at", "pk")
+        return self._page(rows, cursor, direction)
+
+    def _page(self, rows, cursor, direction):
+        # One extra row tells whether there is more in the walking direction
+        object_list = list(rows[:self.per_page + 1])
+        more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if direction == PREVIOUS:
+            object_list.reverse()
+        if not object_list:
+            return CursorPage(object_list, self)
+
+        # Coming from a cursor means there is a page on the side we came from
+        has_next = more if direction == NEXT else True
+        has_previous = bool(cursor) if direction == NEXT else more
+        return CursorPage(
+            object_list,
+            self,
+            next_cursor=encode_cursor(object_list[-1], NEXT) if has_next else None,
+            previous_cursor=encode_cursor(object_list[0], PREVIOUS) if has_previous else None,
+        )
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in keyset pagination for a ListView.
+
+    A request carrying ?cursor= (empty for the first page) is paginated by
+    (created_at, id) with CursorPaginator; without it the view keeps its
+    usual numbered pages, unless settings.CAR_LISTING_CURSOR_PAGINATION is on.
+    """
+    cursor_param = "cursor"
+
+    def use_cursor_pagination(self):
+        return self.cursor_param in self.request.GET or getattr(
+            settings, "CAR_LISTING_CURSOR_PAGINATION", False
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_param))
+        except ValueError as exc:
+            raise Http404(str(exc))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get("page_obj")
+        if getattr(page, "is_cursor", False):
+            # Links keep the current filters and only swap the cursor
+            query = self.request.GET.copy()
+            query.pop("page", None)
+            for name, cursor in (("next", page.next_cursor), ("previous", page.previous_cursor)):
+                if cursor:
+                    query[self.cursor_param] = cursor
+                    context[f"{name}_page_query"] = query.urlencode()
+        return context
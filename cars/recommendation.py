@@ -1,99 +1,343 @@
-from django.db.models import Q, Min, Max
-from cars.models import Car
+# cars/recommendation.py
+"""
+Car recommendations.
+
+Similar cars are precomputed: every car keeps its top-K neighbours in
+CarRecommendation, so the detail page reads them with one indexed query.
+similarity() scores two cars over price, model year, engine volume,
+mileage, fuel type, transmission, brand and model.
+
+Saving a car with changed features queues it (CarRecommendationRefresh,
+see cars/signals.py); the `manage.py process_car_images` worker then
+refreshes the queued cars in batches, off the request path: their own
+lists are recomputed and merged into the other cars' lists. Only the
+lists that hold a car or whose k-th score it reaches are read, and only
+those it drops out of are recomputed in full, so a batch costs one pass
+over the cars' feature columns. `manage.py rebuild_car_recommendations`
+rebuilds every list, e.g. after the weights below change.
+
+The scoring runs in batched NumPy matrix operations (see
+cars/recommendation_engine.py).
+"""
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
+from cars import recommendation_engine
+from cars.history import favorite_ids, recently_viewed
+from cars.models import Car, CarRecommendation, CarRecommendationRefresh
+
+# Columns loaded for similarity()
+VECTOR_FIELDS = (
+    "id", "brand_id", "model_id", "fuel_type", "transmission",
+    "model_year", "engine_volume", "total_price", "price", "mileage",
+)
+
+# Car fields whose change moves a car's recommendations
+SIMILARITY_FIELDS = (
+    "brand", "model", "fuel_type", "transmission", "year", "model_year",
+    "engine_volume", "total_price", "price", "mileage",
+)
+
+# Numeric feature -> (weight, difference at which its score halves)
+NUMERIC_WEIGHTS = {
+    "price": (3.0, 3000),
+    "model_year": (2.0, 2),
+    "engine_volume": (1.0, 0.4),
+    "mileage": (1.0, 40000),
+}
+
+# Categorical feature -> weight of an exact match
+CATEGORICAL_WEIGHTS = {
+    "model_id": 2.0,
+    "brand_id": 1.5,
+    "fuel_type": 1.0,
+    "transmission": 1.0,
+}
+
+
+def recommendations_per_car():
+    return getattr(settings, "CAR_RECOMMENDATIONS_PER_CAR", 6)
+
+
+def car_vector(row):
+    """
+    Features of one VECTOR_FIELDS row; total_price falls back to price.
+    """
+    price = row["total_price"] if row["total_price"] is not None else row["price"]
+    engine_volume = row["engine_volume"]
+    return {
+        "price": float(price) if price is not None else None,
+        "model_year": row["model_year"],
+        "engine_volume": float(engine_volume) if engine_volume is not None else None,
+        "mileage": row["mileage"],
+        **{name: row[name] for name in CATEGORICAL_WEIGHTS},
+    }
+
+
+def load_vectors(queryset):
+    """
+    {car id: car_vector()} for every car of the queryset, in one query.
+    """
+    return {row["id"]: car_vector(row) for row in queryset.values(*VECTOR_FIELDS)}
+
+
+def similarity(a, b):
+    """
+    Weighted similarity of two car vectors; higher is more similar.
+    Missing values score nothing.
+    """
+    score = 0.0
+    for name, (weight, half) in NUMERIC_WEIGHTS.items():
+        if a[name] is not None and b[name] is not None:
+            score += weight * half / (half + abs(a[name] - b[name]))
+    for name, weight in CATEGORICAL_WEIGHTS.items():
+        if a[name] is not None and a[name] == b[name]:
+            score += weight
+    return score
+
+
+def _best(scored, k):
+    return [(car_id, score) for score, car_id in heapq.nlargest(k, ((score, car_id) for car_id, score in scored))]
+
+
+def feature_matrix(vectors):
+    """
+    NumPy FeatureMatrix of the vectors.
+    """
+    return recommendation_engine.FeatureMatrix(vectors, NUMERIC_WEIGHTS, CATEGORICAL_WEIGHTS)
+
+
+def neighbour_lists(car_ids, vectors, k, matrix=None):
+    """
+    {car id: [(car id, score), ...]} of the k cars most similar to each
+    car, best first, ties to the newer (higher id) car. Scored in batched
+    matrix operations.
+    """
+    car_ids = [car_id for car_id in car_ids if car_id in vectors]
+    if matrix is None:
+        matrix = feature_matrix(vectors)
+    return matrix.top_neighbours(car_ids, k)
+
+
+def write_recommendations(lists):
+    """
+    Replace the stored lists of the given cars: {car id: [(car id, score), ...]}.
+    """
+    if not lists:
+        return
+    with transaction.atomic():
+        CarRecommendation.objects.filter(car_id__in=lists.keys()).delete()
+        CarRecommendation.objects.bulk_create([
+            CarRecommendation(car_id=car_id, recommended_id=recommended_id, rank=rank, score=score)
+            for car_id, neighbours in lists.items()
+            for rank, (recommended_id, score) in enumerate(neighbours, start=1)
+        ])
+
+
+def refresh_recommendations(*car_ids):
+    """
+    Bring the table up to date after the given cars were added or edited:
+    their own lists are recomputed and they are merged into every other list.
+    """
+    vectors = load_vectors(Car.objects.all())
+    changed = {car_id for car_id in car_ids if car_id in vectors}
+    if not changed:
+        return
+    k = recommendations_per_car()
+    matrix = feature_matrix(vectors)
+    lists = neighbour_lists(changed, vectors, k, matrix)
+    scores = matrix.scores_by_id(changed)
+
+    # Only lists that hold a changed car, or whose k-th score a changed car
+    # now reaches (or that are short of k), can move; the rest are not read
+    others = CarRecommendation.objects.exclude(car_id__in=changed).order_by()
+    affected = set(others.filter(recommended_id__in=changed).values_list("car_id", flat=True))
+    kth = dict(others.filter(rank=k).values_list("car_id", "score"))
+    for other_id in vectors:
+        if other_id in changed or other_id in affected:
+            continue
+        if other_id not in kth or any(scores[car_id][other_id] >= kth[other_id] for car_id in changed):
+            affected.add(other_id)
+
+    stored = defaultdict(dict)
+    rows = others.filter(car_id__in=affected).values_list("car_id", "recommended_id", "score")
+    for car_id, recommended_id, score in rows:
+        stored[car_id][recommended_id] = score
+
+    full = []
+    for other_id in affected:
+        listed = stored.get(other_id, {})
+        candidates = {car_id: score for car_id, score in listed.items() if car_id not in changed}
+        for car_id in changed:
+            score = scores[car_id][other_id]
+            if car_id in listed and score < listed[car_id]:
+                # It got less similar: a car outside the list may now beat it
+                full.append(other_id)
+                break
+            candidates[car_id] = score
+        else:
+            neighbours = _best(candidates.items(), k)
+            if neighbours != _best(listed.items(), k):
+                lists[other_id] = neighbours
+
+    lists.update(neighbour_lists(full, vectors, k, matrix))
+    write_recommendations(lists)
+
+
+def queue_refresh(*car_ids):
+    """
+    Queue the given cars for refresh_recommendations(). The rows are part
+    of the caller's transaction, so they only reach the worker once it
+    commits, and a rolled-back edit queues nothing.
+    """
+    CarRecommendationRefresh.objects.bulk_create(
+        [CarRecommendationRefresh(car_id=car_id) for car_id in set(car_ids)], ignore_conflicts=True
+    )
+
+
+def process_refresh_queue(limit=None):
+    """
+    Refresh the oldest queued cars in one batch. Returns how many.
+    Refreshes read and rewrite shared lists, so the queue rows are locked
+    until the batch is written and concurrent workers take turns.
+    """
+    with transaction.atomic():
+        queue = CarRecommendationRefresh.objects.select_for_update().order_by("queued_at")
+        if limit:
+            queue = queue[:limit]
+        car_ids = list(queue.values_list("car_id", flat=True))
+        if car_ids:
+            CarRecommendationRefresh.objects.filter(car_id__in=car_ids).delete()
+            refresh_recommendations(*car_ids)
+    return len(car_ids)
 
 
 def recommend_for_car(car_id, limit=6):
     """
-    Recommend similar cars based on a single car's attributes.
-    Uses brand, model, price, fuel type, year range, engine volume,
-    transmission and mileage similarity.
-    """
-    try:
-        car = Car.objects.get(id=car_id)
-    except Car.DoesNotExist:
-        return Car.objects.none()
-
-    # year_value = car.year.year  # FK → integer
-    # engine = float(car.engine_volume)
-    
-    # Base similarity filters
-    queryset = Car.objects.filter(
-        # Q(fuel_type=car.fuel_type) &                            # same fuel
-        # Q(transmission=car.transmission) &                      # same transmission
-        # Q(engine_volume__range=(engine - 0.3, engine + 0.3)) &  # close engine size
-        # Q(year__year__range=(year_value - 1, year_value + 1)) & # close years
-        Q(total_price__range=(car.total_price - 2000, car.total_price + 2000))     # close price
-    ).exclude(id=car.id)
-
-    # Prioritization
-    queryset = queryset.order_by(
-        'total_price',     # closest price first
-        '-brand',          # same brand goes higher
-        '-model',          # same model
-        'mileage'          # lower mileage is better
-    )[:limit]
-
-    return queryset
-
-
-def recommend_for_general(viewed_ids, limit=10):
-    """
-    Recommend cars based on multiple user-viewed cars.
-    Extracts a viewing profile (brand frequency, fuel, transmission,
-    price range, year range, engine volume range, condition)
-    and recommends cars matching that profile.
-    """
-
-    if not viewed_ids:
-        return Car.objects.none()
-
-    viewed = Car.objects.filter(id__in=viewed_ids)
-
-    if not viewed.exists():
-        return Car.objects.none()
-
-    # Extract patterns
-    brands = viewed.values_list("brand", flat=True)
-    models = viewed.values_list("model", flat=True)
-    fuels = viewed.values_list("fuel_type", flat=True)
-    transmissions = viewed.values_list("transmission", flat=True)
-    conditions = viewed.values_list("condition", flat=True)
-
-    # Numeric ranges
-    price_min = viewed.aggregate(Min("price"))["price__min"]
-    price_max = viewed.aggregate(Max("price"))["price__max"]
-
-    year_min = viewed.aggregate(Min("year__year"))["year__year__min"]
-    year_max = viewed.aggregate(Max("year__year"))["year__year__max"]
-
-    engine_min = viewed.aggregate(Min("engine_volume"))["engine_volume__min"]
-    engine_max = viewed.aggregate(Max("engine_volume"))["engine_volume__max"]
-
-    mileage_min = viewed.aggregate(Min("mileage"))["mileage__min"]
-    mileage_max = viewed.aggregate(Max("mileage"))["mileage__max"]
-
-    queryset = Car.objects.exclude(id__in=viewed_ids)
-
-    # Profile-based filters
-    queryset = queryset.filter(
-        Q(brand__in=brands) |
-        Q(model__in=models) |
-        Q(fuel_type__in=fuels) |
-        Q(transmission__in=transmissions) |
-        Q(condition__in=conditions) |
-        Q(price__range=(price_min - 2500, price_max + 2500)) |
-        Q(year__year__range=(year_min - 1, year_max + 1)) |
-        Q(engine_volume__range=(engine_min - 0.3, engine_max + 0.3)) |
-        Q(mileage__range=(mileage_min, mileage_max)) 
+    The precomputed most similar cars of a car, best first, ready for
+    listing cards. Reads CarRecommendation with one indexed query.
+    """
+    return (
+        Car.objects.for_listing()
+        .filter(recommended_for__car_id=car_id)
+        .order_by("recommended_for__rank")[:limit]
     )
 
-    # Prioritization: more relevant cars first
-    queryset = queryset.order_by(
-        '-brand',
-        '-model',
-        'price',
-        'mileage'
-    )[:limit]
 
-    return queryset
+# --- "Recommended for you": a profile of the session's cars ---
+
+# A favorite says more about taste than a view
+PROFILE_WEIGHTS = {"viewed": 1.0, "favorites": 2.0}
+# Session key where older sessions kept the features of their cars
+OLD_PROFILE_SESSION_KEY = "car_profile"
+
+
+def session_vector(car):
+    """
+    car_vector() of a loaded Car, without a query.
+    """
+    return car_vector({field: getattr(car, field) for field in VECTOR_FIELDS})
+
+
+def profile_ids(session, favorites=None):
+    """
+    (viewed, favorites): the visitor's car ids from cars/history.py, which
+    is all the profile keeps in the session. favorites defaults to the
+    session's; pass history.visitor_favorites() for a logged-in user.
+    """
+    # Features stored by older sessions are dropped the first time they are seen
+    session.pop(OLD_PROFILE_SESSION_KEY, None)
+    viewed = recently_viewed(session)
+    favorites = favorite_ids(session) if favorites is None else list(favorites)
+    return viewed, favorites
+
+
+def session_profile(session, favorites=None):
+    """
+    {"viewed": [...], "favorites": [...], "vectors": {id: vector}}: the
+    profile_ids() and the features of those cars, loaded with one query.
+    Deleted cars have no vector.
+    """
+    viewed, favorites = profile_ids(session, favorites)
+    vectors = load_vectors(Car.objects.filter(pk__in=viewed + favorites)) if viewed or favorites else {}
+    return {"viewed": viewed, "favorites": favorites, "vectors": vectors}
+
+
+def profile_summary(profile):
+    """
+    Weighted means of the numeric features and shares of every category
+    value over the profile's cars.
+    """
+    weights = {}
+    for kind, weight in PROFILE_WEIGHTS.items():
+        for car_id in profile[kind]:
+            if car_id in profile["vectors"]:
+                weights[car_id] = max(weights.get(car_id, 0.0), weight)
+
+    means = {}
+    for name in NUMERIC_WEIGHTS:
+        known = [(profile["vectors"][car_id][name], weight) for car_id, weight in weights.items()
+                 if profile["vectors"][car_id][name] is not None]
+        total = sum(weight for _, weight in known)
+        means[name] = sum(value * weight for value, weight in known) / total if total else None
+
+    shares = {}
+    total = sum(weights.values())
+    for name in CATEGORICAL_WEIGHTS:
+        counts = defaultdict(float)
+        for car_id, weight in weights.items():
+            value = profile["vectors"][car_id][name]
+            if value is not None:
+                counts[value] += weight / total
+        shares[name] = dict(counts)
+    return means, shares
+
+
+def profile_similarity(vector, means, shares):
+    """
+    similarity() against a profile: closeness to the mean of each numeric
+    feature plus each category's share. A one-car profile scores exactly
+    like similarity() against that car.
+    """
+    score = 0.0
+    for name, (weight, half) in NUMERIC_WEIGHTS.items():
+        if vector[name] is not None and means[name] is not None:
+            score += weight * half / (half + abs(vector[name] - means[name]))
+    for name, weight in CATEGORICAL_WEIGHTS.items():
+        score += weight * shares[name].get(vector[name], 0.0)
+    return score
+
+
+def recommend_for_general(session, limit=10, favorites=None):
+    """
+    Cars for the session's profile of viewed and favorite cars, best first.
+    The candidates are the precomputed neighbours of those cars; they and
+    the profile's own cars are fetched with their features in one query
+    and ranked by profile_similarity().
+    """
+    viewed, favorites = profile_ids(session, favorites)
+    seen = set(viewed) | set(favorites)
+    if not seen:
+        return []
+
+    vectors = load_vectors(
+        Car.objects.filter(Q(pk__in=seen) | Q(recommended_for__car_id__in=seen)).distinct()
+    )
+    profile = {
+        "viewed": viewed,
+        "favorites": favorites,
+        "vectors": {car_id: vector for car_id, vector in vectors.items() if car_id in seen},
+    }
+    means, shares = profile_summary(profile)
+    best = _best(
+        (
+            (car_id, profile_similarity(vector, means, shares))
+            for car_id, vector in vectors.items() if car_id not in seen
+        ),
+        limit,
+    )
+    cars = Car.objects.for_listing().in_bulk([car_id for car_id, _ in best])
+    return [cars[car_id] for car_id, _ in best if car_id in cars]
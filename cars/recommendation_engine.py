@@ -0,0 +1,123 @@
+# cars/recommendation_engine.py
+"""
+NumPy scoring engine behind cars/recommendation.py.
+
+The features of every car are held as column arrays: one float array per
+numeric feature (NaN when missing) and one integer code array per
+categorical feature (-1 when missing). A batch of cars is scored against
+the whole catalogue as one (batch, cars) matrix, with the same formula as
+recommendation.similarity():
+
+    weight * half / (half + |a - b|)    price, model year, engine, mileage
+    weight * (a == b)                   model, brand, fuel, transmission
+
+Comparing category codes by broadcasting gives the same result as a dot
+product of one-hot columns, without a cars x categories matrix. The top K
+of a row come from argpartition, so a query costs O(cars), not a sort.
+"""
+import numpy as np
+
+# Score cells computed at once (rows x cars), about 8 MB of float64
+BATCH_CELLS = 1_000_000
+
+
+class FeatureMatrix:
+    """
+    Column arrays of car vectors ({car id: recommendation.car_vector()}).
+    """
+
+    def __init__(self, vectors, numeric_weights, categorical_weights):
+        self.numeric_weights = numeric_weights
+        self.categorical_weights = categorical_weights
+        # Category value -> code, per categorical feature
+        self.codes = {name: {} for name in categorical_weights}
+
+        rows = list(vectors.values())
+        self.ids = np.fromiter(vectors.keys(), dtype=np.int64, count=len(rows))
+        self.numeric = {
+            name: np.array([self._number(row[name]) for row in rows], dtype=np.float64)
+            for name in numeric_weights
+        }
+        self.categorical = {
+            name: np.array([self._code(name, row[name]) for row in rows], dtype=np.int64)
+            for name in categorical_weights
+        }
+        self.index = {car_id: row for row, car_id in enumerate(self.ids.tolist())}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _number(value):
+        return np.nan if value is None else value
+
+    def _code(self, name, value):
+        if value is None:
+            return -1
+        return self.codes[name].setdefault(value, len(self.codes[name]))
+
+    # --- Scoring ---
+
+    def scores(self, rows):
+        """
+        (len(rows), cars) similarity matrix; a car against itself is -inf.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        total = np.zeros((len(rows), len(self.ids)))
+        for name, (weight, half) in self.numeric_weights.items():
+            column = self.numeric[name]
+            part = np.abs(column[rows, None] - column[None, :])
+            part += half
+            np.divide(weight * half, part, out=part)
+            if np.isnan(column).any():
+                np.nan_to_num(part, copy=False, nan=0.0)
+            total += part
+        for name, weight in self.categorical_weights.items():
+            codes = self.categorical[name]
+            own = codes[rows, None]
+            matches = own == codes[None, :]
+            matches &= own >= 0
+            total += np.where(matches, weight, 0.0)
+        total[np.arange(len(rows)), rows] = -np.inf
+        return total
+
+    def _batches(self, car_ids):
+        rows = np.array([self.index[car_id] for car_id in car_ids], dtype=np.int64)
+        size = max(1, BATCH_CELLS // max(1, len(self.ids)))
+        for start in range(0, len(rows), size):
+            batch = rows[start:start + size]
+            yield batch, self.scores(batch)
+
+    def scores_by_id(self, car_ids):
+        """
+        {car id: {other car id: score}} of the given cars against every other car.
+        """
+        ids = self.ids.tolist()
+        result = {}
+        for batch, scores in self._batches(car_ids):
+            for row, row_scores in zip(batch.tolist(), scores.tolist()):
+                result[ids[row]] = {
+                    other_id: score for other_id, score in zip(ids, row_scores) if other_id != ids[row]
+                }
+        return result
+
+    def top_neighbours(self, car_ids, k):
+        """
+        {car id: [(car id, score), ...]} of the k most similar cars, best
+        first, ties to the higher id.
+        """
+        k = min(k, len(self.ids) - 1)
+        if k <= 0:
+            return {car_id: [] for car_id in car_ids}
+
+        result = {}
+        for batch, scores in self._batches(car_ids):
+            # The k-th best score of each row; everything tied with it is a candidate
+            kth_rows = np.argpartition(scores, -k, axis=1)[:, -k]
+            kth = scores[np.arange(len(batch)), kth_rows]
+            for row, row_scores, threshold in zip(batch, scores, kth):
+                candidates = np.flatnonzero(row_scores >= threshold)
+                order = np.lexsort((self.ids[candidates], row_scores[candidates]))[::-1][:k]
+                best = candidates[order]
+                result[int(self.ids[row])] = list(zip(self.ids[best].tolist(), row_scores[best].tolist()))
+        return result
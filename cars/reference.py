@@ -0,0 +1,131 @@
+# cars/reference.py
+"""
+Reference data of the home filter sidebar: brands and their models.
+
+Brand and CarModel rows rarely change but are read on every home page
+view, so they are loaded into one snapshot that is kept twice:
+
+- in the shared cache (CACHES["default"]), so one process's load serves
+  the others;
+- in this process, so most requests skip even the unpickling.
+
+Both copies are stamped with a version: a digest of the snapshot, kept in
+the shared cache. Being derived from the rows, it is the same in every
+process and across restarts. Saving or deleting a Brand or CarModel drops
+it (see cars/signals.py) and every process reloads on its next request.
+The same version names the catalogue, the whole brand -> models tree
+served as one JSON document that browsers may keep for days.
+"""
+import gzip
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from cars.models import Brand, CarModel
+
+VERSION_KEY = "car-reference:version"
+
+# (version, snapshot) last seen by this process
+_local = (None, None)
+
+
+def load_reference_data():
+    """
+    {"brands": [{"id", "name"}, ...], "models": {brand_id: [{"id", "name"}, ...]}}
+    """
+    models = {}
+    for model in CarModel.objects.order_by("pk").values("id", "name", "brand_id"):
+        models.setdefault(model.pop("brand_id"), []).append(model)
+    return {
+        "brands": list(Brand.objects.order_by("pk").values("id", "name")),
+        "models": models,
+    }
+
+
+def _timeout():
+    return getattr(settings, "CAR_REFERENCE_TIMEOUT", 60 * 60 * 24)
+
+
+def _digest(data):
+    body = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    # 48 bits: an int URL segment that JavaScript reads exactly
+    return int(hashlib.sha256(body).hexdigest()[:12], 16)
+
+
+def reference_data():
+    """
+    The current snapshot, from this process, the shared cache or the database.
+    """
+    global _local
+    version = reference_version()
+    local_version, data = _local
+    if local_version == version:
+        return data
+
+    data = cache.get_or_set(f"car-reference:{version}", load_reference_data, _timeout())
+    _local = (version, data)
+    return data
+
+
+def reference_version():
+    """
+    Catalogue version number, a digest of the brand and model rows.
+    Reading it costs a shared cache lookup and no query, except the first
+    time after a change, which loads (and shares) the new snapshot.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        data = load_reference_data()
+        version = _digest(data)
+        cache.set(f"car-reference:{version}", data, _timeout())
+        cache.set(VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_reference_data():
+    """
+    Retire the snapshot in every process after a Brand or CarModel changed.
+    """
+    cache.delete(VERSION_KEY)
+    # Again once committed: another process may have digested the old rows meanwhile
+    transaction.on_commit(lambda: cache.delete(VERSION_KEY))
+
+
+def brands():
+    return reference_data()["brands"]
+
+
+def models_for_brand(brand_id):
+    """
+    The models of one brand, [] for an unknown or missing brand.
+    """
+    return reference_data()["models"].get(brand_id, [])
+
+
+def catalogue():
+    """
+    (version, json_bytes, gzip_bytes) of the current brand -> models tree:
+
+        {"version": 1, "brands": [{"id", "name", "models": [{"id", "name"}, ...]}, ...]}
+
+    Both encodings are built once per version and kept in the shared cache.
+    """
+    version = reference_version()
+
+    def build():
+        data = reference_data()
+        tree = {
+            "version": version,
+            "brands": [
+                {**brand, "models": data["models"].get(brand["id"], [])} for brand in data["brands"]
+            ],
+        }
+        body = json.dumps(tree, ensure_ascii=False, separators=(",", ":")).encode()
+        # mtime=0 keeps the bytes identical for every process
+        return body, gzip.compress(body, mtime=0)
+
+    body, compressed = cache.get_or_set(f"car-catalogue:{version}", build, _timeout())
+    return version, body, compressed
@@ -0,0 +1,209 @@
+# cars/search.py
+"""
+Catalogue search.
+
+Every car has a CarSearchDocument row with the text it can be found by,
+in four weighted parts: title (brand, model, year and car_title), VIN,
+feature names and description. Saving a car, its features, brand, model
+or year rewrites the row (see cars/signals.py).
+
+The database indexes the rows itself (migration 0029; existing cars are
+indexed with `manage.py rebuild_car_search`):
+
+- SQLite: an FTS5 table over the documents, kept in step by triggers and
+  ranked with bm25();
+- PostgreSQL: a generated, weighted tsvector column with a GIN index,
+  ranked with ts_rank(), plus a trigram index on the title.
+
+Every word of a query matches as a prefix, so "tuc 2.0" finds a Tucson
+2.0 and the first characters of a VIN find the car. When nothing
+matches, misspelt words are replaced by the closest words of the
+titles: trigram similarity on PostgreSQL, difflib over the FTS5
+vocabulary on SQLite. Other databases fall back to unindexed icontains lookups.
+"""
+import difflib
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from cars.models import Car, CarSearchDocument
+
+FTS_TABLE = "cars_carsearch_fts"
+VOCAB_TABLE = "cars_carsearch_vocab"
+
+# Car fields that appear in a search document
+SEARCH_FIELDS = ("car_title", "vin", "brand", "model", "year", "model_year", "description")
+SEARCH_COLUMNS = tuple(Car._meta.get_field(name).attname for name in SEARCH_FIELDS)
+
+# bm25() weights of the FTS5 columns: title, vin, features, description
+FTS_WEIGHTS = (10.0, 10.0, 3.0, 1.0)
+
+# Words of a query that are used
+MAX_TERMS = 8
+
+
+def search_terms(query):
+    """
+    Lowercase words of a query, as both indexes tokenize them.
+    """
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _limit():
+    return getattr(settings, "CAR_SEARCH_LIMIT", 1000)
+
+
+# --- Documents ---
+
+def build_documents(cars, document_model=CarSearchDocument):
+    """
+    Unsaved search documents of a Car queryset, with one query for the
+    cars and one for their features.
+    """
+    cars = list(cars.select_related("brand", "model", "year"))
+    features = defaultdict(list)
+    through = cars[0].features.through if cars else None
+    if through is not None:
+        rows = through.objects.filter(car_id__in=[car.pk for car in cars]).order_by("carfeature__name")
+        for car_id, name in rows.values_list("car_id", "carfeature__name"):
+            features[car_id].append(name)
+
+    return [
+        document_model(
+            car_id=car.pk,
+            title=" ".join(
+                str(part) for part in (
+                    car.brand and car.brand.name, car.model and car.model.name,
+                    car.model_year, car.car_title,
+                ) if part
+            ),
+            vin=car.vin or "",
+            features=" ".join(features[car.pk]),
+            description=car.description or "",
+        )
+        for car in cars
+    ]
+
+
+def write_documents(cars, document_model=CarSearchDocument):
+    """
+    Replace the search documents of a Car queryset's cars.
+    """
+    documents = build_documents(cars, document_model)
+    with transaction.atomic():
+        document_model.objects.filter(car_id__in=[document.car_id for document in documents]).delete()
+        document_model.objects.bulk_create(documents)
+
+
+def search_values(car):
+    """
+    The car's values of the SEARCH_FIELDS, to tell whether a save changed them.
+    """
+    return tuple(getattr(car, column) for column in SEARCH_COLUMNS)
+
+
+def index_cars(*car_ids):
+    """
+    Rewrite the search documents of the given cars.
+    """
+    if car_ids:
+        write_documents(Car.objects.filter(pk__in=car_ids))
+
+
+# --- Queries ---
+
+def search_ids(query, limit=None):
+    """
+    Ids of the cars matching every word of `query`, best match first.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    limit = limit or _limit()
+    backend = {"sqlite": _sqlite_search, "postgresql": _postgresql_search}.get(connection.vendor, _fallback_search)
+    return backend(terms, limit)
+
+
+def _fetch_ids(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _phrase(term, prefix=True):
+    return f'"{term}"*' if prefix else f'"{term}"'
+
+
+def _fts_match(groups):
+    # Each word is a group of alternative phrases; groups are ANDed
+    return " AND ".join("(" + " OR ".join(group) + ")" for group in groups)
+
+
+def _sqlite_search(terms, limit):
+    sql = (
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+        f"ORDER BY bm25({FTS_TABLE}, {', '.join(map(str, FTS_WEIGHTS))}), rowid DESC LIMIT %s"
+    )
+    exact = [[_phrase(term)] for term in terms]
+    ids = _fetch_ids(sql, [_fts_match(exact), limit])
+    if ids:
+        return ids
+
+    # Nothing matched: try the closest title words for the unknown ones
+    groups = [_sqlite_close_terms(term) for term in terms]
+    if not all(groups) or groups == exact:
+        return []
+    return _fetch_ids(sql, [_fts_match(groups), limit])
+
+
+def _sqlite_close_terms(term):
+    """
+    The term itself when some indexed word starts with it, else the
+    title words that look like it (sharing its first letter).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT term FROM {VOCAB_TABLE} WHERE term >= %s AND term < %s LIMIT 1",
+            [term, term + "\U0010ffff"],
+        )
+        if cursor.fetchone():
+            return [_phrase(term)]
+        cursor.execute(
+            f"SELECT term FROM {VOCAB_TABLE} WHERE term >= %s AND term < %s AND col = 'title'",
+            [term[0], term[0] + "\U0010ffff"],
+        )
+        vocabulary = [row[0] for row in cursor.fetchall()]
+    return [_phrase(match, prefix=False) for match in difflib.get_close_matches(term, vocabulary, n=3, cutoff=0.75)]
+
+
+def _postgresql_search(terms, limit):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    ids = _fetch_ids(
+        "SELECT car_id FROM cars_carsearchdocument WHERE search_vector @@ to_tsquery('simple', %s) "
+        "ORDER BY ts_rank(search_vector, to_tsquery('simple', %s)) DESC, car_id DESC LIMIT %s",
+        [tsquery, tsquery, limit],
+    )
+    if ids:
+        return ids
+
+    # Nothing matched: rank titles by trigram word similarity instead
+    text = " ".join(terms)
+    return _fetch_ids(
+        "SELECT car_id FROM cars_carsearchdocument WHERE %s <%% title "
+        "ORDER BY word_similarity(%s, title) DESC, car_id DESC LIMIT %s",
+        [text, text, limit],
+    )
+
+
+def _fallback_search(terms, limit):
+    filters = Q()
+    for term in terms:
+        filters &= (
+            Q(title__icontains=term) | Q(vin__istartswith=term)
+            | Q(features__icontains=term) | Q(description__icontains=term)
+        )
+    documents = CarSearchDocument.objects.filter(filters).order_by("-car_id")
+    return list(documents.values_list("car_id", flat=True)[:limit])
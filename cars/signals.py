@@ -1,7 +1,16 @@
 # cars/signals.py
-from django.db.models.signals import pre_delete, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Car
+from django.utils import timezone
+from .models import Brand, Car, CarFeature, CarModel, CarRecommendation, ChangedPart, ImageDerivative, PaintedPart, Year
+from .facets import invalidate_facets
+from .images import enqueue_derivatives, release_file
+from .page_cache import invalidate_detail, touch_car
+from .recommendation import (
+    SIMILARITY_FIELDS, load_vectors, queue_refresh, session_vector,
+)
+from .reference import invalidate_reference_data
+from .search import SEARCH_COLUMNS, SEARCH_FIELDS, index_cars, search_values
 # Import CarImage, checking if it exists
 try:
     from .models import CarImage
@@ -63,6 +72,49 @@ def car_delete_main_image_on_delete(sender, instance, **kwargs):
     delete_file_if_exists(instance, 'main_image')
 
 
+@receiver(post_save, sender=Year)
+def year_sync_car_model_year(sender, instance, raw=False, **kwargs):
+    """
+    Keeps the denormalized Car.model_year in step when a Year is edited.
+    """
+    if raw:
+        return
+    cars = Car.objects.filter(year=instance).exclude(model_year=instance.year)
+    car_ids = list(cars.values_list("pk", flat=True))
+    if car_ids:
+        cars.update(model_year=instance.year, updated_at=timezone.now())
+        invalidate_facets()
+        queue_refresh(*car_ids)
+
+
+# --- SIGNALS FOR THE IMAGE DERIVATIVE PIPELINE ---
+
+def _touches_images(instance, update_fields):
+    """
+    False when a save explicitly updated only non-image fields.
+    """
+    return update_fields is None or bool(set(update_fields) & set(instance.IMAGE_FIELDS))
+
+
+@receiver(post_save, sender=Car)
+def car_enqueue_image_derivatives(sender, instance, update_fields=None, raw=False, **kwargs):
+    """
+    Queues background resizing for new or replaced Car images.
+    """
+    if raw or not _touches_images(instance, update_fields):
+        return
+    enqueue_derivatives(instance)
+
+
+@receiver(pre_delete, sender=ImageDerivative)
+def image_derivative_delete_file_on_delete(sender, instance, **kwargs):
+    """
+    Deletes the rendered variant file when its ImageDerivative row is deleted,
+    unless another derivative of identical bytes still shares it.
+    """
+    release_file(instance.file.name, exclude_pk=instance.pk)
+
+
 # --- SIGNALS FOR CARIMAGE MODEL (If it exists) ---
 
 if CarImage:
@@ -71,5 +123,224 @@ if CarImage:
         """
         Deletes the image file (gallery image) when the CarImage object is deleted.
         """
+        # Identical uploads are deduplicated, so keep files other rows still use
+        if sender.objects.filter(image=instance.image.name).exclude(pk=instance.pk).exists():
+            return
         # Ensure the image field name in CarImage model is 'image'
-        delete_file_if_exists(instance, 'image')
\ No newline at end of file
+        delete_file_if_exists(instance, 'image')
+
+    @receiver(post_save, sender=CarImage)
+    def car_image_enqueue_image_derivatives(sender, instance, update_fields=None, raw=False, **kwargs):
+        """
+        Queues background resizing for a new or replaced gallery image.
+        """
+        if raw or not _touches_images(instance, update_fields):
+            return
+        enqueue_derivatives(instance)
+
+
+# --- SIGNALS FOR THE DETAIL PAGE CACHE (see cars/page_cache.py) ---
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def car_invalidate_detail_page(sender, instance, **kwargs):
+    """
+    Drops the cached detail page of an edited or deleted car.
+    """
+    invalidate_detail(instance.pk)
+
+
+@receiver(post_save, sender=CarImage)
+@receiver(post_delete, sender=CarImage)
+@receiver(post_save, sender=PaintedPart)
+@receiver(post_delete, sender=PaintedPart)
+@receiver(post_save, sender=ChangedPart)
+@receiver(post_delete, sender=ChangedPart)
+def car_related_invalidate_detail_page(sender, instance, raw=False, **kwargs):
+    """
+    A gallery image or part changed: the car's page must be re-rendered.
+    """
+    if raw:
+        return
+    touch_car(instance.car_id)
+
+
+@receiver(m2m_changed, sender=Car.features.through)
+def car_features_invalidate_detail_page(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Features were added to or removed from a car (or cars from a feature).
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        touch_car(instance.pk)
+    elif action == "pre_clear":
+        touch_car(*instance.cars.values_list("pk", flat=True))
+    else:
+        touch_car(*pk_set)
+
+
+@receiver(post_save, sender=CarFeature)
+def car_feature_invalidate_detail_page(sender, instance, created=False, raw=False, **kwargs):
+    """
+    A renamed feature shows up on every page that lists it.
+    """
+    if raw or created:
+        return
+    touch_car(*instance.cars.values_list("pk", flat=True))
+
+
+# --- SIGNALS FOR THE FILTER SIDEBAR COUNTS (see cars/facets.py) ---
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def car_invalidate_facets(sender, instance, raw=False, **kwargs):
+    """
+    A car was added, edited or deleted: the sidebar counts may have moved.
+    """
+    if raw:
+        return
+    invalidate_facets()
+
+
+# --- SIGNALS FOR THE FILTER REFERENCE DATA (see cars/reference.py) ---
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+def reference_data_invalidate(sender, instance, raw=False, **kwargs):
+    """
+    A brand or model was added, renamed or deleted.
+    """
+    if raw:
+        return
+    invalidate_reference_data()
+
+
+# --- SIGNALS FOR THE RECOMMENDATION TABLE (see cars/recommendation.py) ---
+
+@receiver(pre_save, sender=Car)
+def car_snapshot_similarity(sender, instance, update_fields=None, raw=False, **kwargs):
+    """
+    Remember the stored features of an edited car, so that a save that
+    leaves them alone (e.g. a new customs estimate) skips the refresh.
+    """
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(SIMILARITY_FIELDS):
+        return
+    instance._similarity_vector = load_vectors(Car.objects.filter(pk=instance.pk)).get(instance.pk)
+
+
+@receiver(post_save, sender=Car)
+def car_refresh_recommendations(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    """
+    A new car or a changed price, year, engine, etc. moves its neighbours:
+    queued for the worker, not refreshed in the request.
+    """
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(SIMILARITY_FIELDS):
+        return
+    before = instance.__dict__.pop("_similarity_vector", None)
+    if not created and before is not None and before == session_vector(instance):
+        return
+    queue_refresh(instance.pk)
+
+
+@receiver(pre_delete, sender=Car)
+def car_remember_recommended_by(sender, instance, **kwargs):
+    """
+    Remember whose lists the car is in before the cascade removes it.
+    """
+    instance._recommended_by = list(
+        CarRecommendation.objects.filter(recommended=instance).values_list("car_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Car)
+def car_refill_recommendations(sender, instance, **kwargs):
+    """
+    Queue the lists the deleted car left a gap in for a refill.
+    """
+    queue_refresh(*getattr(instance, "_recommended_by", ()))
+
+
+# --- SIGNALS FOR THE SEARCH INDEX (see cars/search.py) ---
+
+@receiver(pre_save, sender=Car)
+def car_snapshot_search_values(sender, instance, update_fields=None, raw=False, **kwargs):
+    """
+    Remember the stored title, VIN, description, etc. of an edited car, so
+    that a save that leaves them alone (e.g. a new price) keeps its document.
+    """
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    instance._search_values = Car.objects.filter(pk=instance.pk).values_list(*SEARCH_COLUMNS).first()
+
+
+@receiver(post_save, sender=Car)
+def car_index_search_document(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    """
+    A new car, or one with a changed title, VIN, description, etc.
+    """
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    before = instance.__dict__.pop("_search_values", None)
+    if not created and before is not None and before == search_values(instance):
+        return
+    index_cars(instance.pk)
+
+
+@receiver(m2m_changed, sender=Car.features.through)
+def car_features_index_search_documents(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Feature names are part of the documents of the cars that have them.
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            index_cars(instance.pk)
+    elif action == "pre_clear":
+        instance._search_car_ids = list(instance.cars.values_list("pk", flat=True))
+    elif action == "post_clear":
+        index_cars(*getattr(instance, "_search_car_ids", ()))
+    elif action in ("post_add", "post_remove"):
+        index_cars(*pk_set)
+
+
+@receiver(post_save, sender=CarFeature)
+def car_feature_index_search_documents(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    index_cars(*instance.cars.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=CarFeature)
+def car_feature_remember_cars(sender, instance, **kwargs):
+    """
+    Remember which cars had the feature before the cascade removes the links.
+    """
+    instance._search_car_ids = list(instance.cars.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=CarFeature)
+def car_feature_deleted_index_search_documents(sender, instance, **kwargs):
+    index_cars(*getattr(instance, "_search_car_ids", ()))
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=CarModel)
+@receiver(post_save, sender=Year)
+def reference_index_search_documents(sender, instance, created=False, raw=False, **kwargs):
+    """
+    A renamed brand or model, or an edited year, is in its cars' titles.
+    """
+    if raw or created:
+        return
+    lookup = {Brand: "brand", CarModel: "model", Year: "year"}[sender]
+    index_cars(*Car.objects.filter(**{lookup: instance}).values_list("pk", flat=True))
@@ -0,0 +1,156 @@
+# cars/suggest.py
+"""
+Typeahead suggestions for the search box: brands, models, "brand model
+year" combinations and VIN prefixes.
+
+They come from an index kept in this process, built from data the home
+page already caches: the brand/model snapshot (cars/reference.py) and
+the facet table (cars/facets.py), whose car counts weigh the
+suggestions. Only the VINs are read from the database, once per build.
+The index is rebuilt when either version changes, i.e. after a brand,
+model or car was saved, so a keystroke costs two shared cache lookups
+and a binary search.
+"""
+import bisect
+import heapq
+from collections import Counter, defaultdict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.urls import reverse
+
+from cars.facets import BRAND, CARS, MODEL, MODEL_YEAR, facet_table, facet_version
+from cars.models import Car
+from cars.reference import reference_data, reference_version
+
+BRAND_KIND = "brand"
+MODEL_KIND = "model"
+YEAR_KIND = "year"
+VIN_KIND = "vin"
+
+# Order of equally weighted suggestions
+KIND_ORDER = (BRAND_KIND, MODEL_KIND, YEAR_KIND)
+
+# Shortest query looked up among VINs
+VIN_MIN_LENGTH = 3
+
+# ((reference version, facet version), SuggestionIndex) last built by this process
+_local = (None, None)
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+def _entry(kind, label, count, **params):
+    return {
+        "kind": kind,
+        "label": label,
+        "count": count,
+        "url": f"{reverse('home')}?{urlencode(params)}",
+    }
+
+
+class SuggestionIndex:
+    """
+    Sorted search keys pointing at suggestion entries, plus the sorted VINs.
+    """
+
+    def __init__(self, entries, vins):
+        # Every entry is found by the start of its label and of its label
+        # without the brand ("tucson 2020" as well as "hyundai tucson 2020")
+        self.entries = entries
+        pairs = []
+        for position, (keys, _) in enumerate(entries):
+            pairs.extend((key, position) for key in keys)
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.positions = [position for _, position in pairs]
+        self.vins = vins
+
+    @classmethod
+    def build(cls):
+        data = reference_data()
+        counts = Counter()
+        model_years = defaultdict(set)
+        for row in facet_table():
+            counts[BRAND_KIND, row[BRAND]] += row[CARS]
+            counts[MODEL_KIND, row[MODEL]] += row[CARS]
+            if row[MODEL] is not None and row[MODEL_YEAR] is not None:
+                counts[YEAR_KIND, row[MODEL], row[MODEL_YEAR]] += row[CARS]
+                model_years[row[MODEL]].add(row[MODEL_YEAR])
+
+        entries = []
+        for brand in data["brands"]:
+            entries.append((
+                [normalize(brand["name"])],
+                _entry(BRAND_KIND, brand["name"], counts[BRAND_KIND, brand["id"]], brand=brand["id"]),
+            ))
+            for model in data["models"].get(brand["id"], []):
+                label = f"{brand['name']} {model['name']}"
+                entries.append((
+                    [normalize(label), normalize(model["name"])],
+                    _entry(MODEL_KIND, label, counts[MODEL_KIND, model["id"]], brand=brand["id"], model=model["id"]),
+                ))
+                for year in sorted(model_years[model["id"]]):
+                    entries.append((
+                        [normalize(f"{label} {year}"), normalize(f"{model['name']} {year}")],
+                        _entry(
+                            YEAR_KIND, f"{label} {year}", counts[YEAR_KIND, model["id"], year],
+                            brand=brand["id"], model=model["id"], from_year=year, to_year=year,
+                        ),
+                    ))
+
+        vins = Car.objects.exclude(vin__isnull=True).exclude(vin="").values_list("vin", flat=True)
+        return cls(entries, sorted(vin.upper() for vin in vins))
+
+    def lookup(self, query, limit):
+        """
+        Up to `limit` suggestions starting with `query`, most cars first.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + "\U0010ffff")
+        matches = set(self.positions[start:end])
+        best = heapq.nlargest(
+            limit,
+            matches,
+            key=lambda position: (
+                self.entries[position][1]["count"],
+                -KIND_ORDER.index(self.entries[position][1]["kind"]),
+                -position,
+            ),
+        )
+        suggestions = [self.entries[position][1] for position in best]
+
+        vin = query.strip().upper()
+        if len(suggestions) < limit and len(vin) >= VIN_MIN_LENGTH and vin.isalnum():
+            start = bisect.bisect_left(self.vins, vin)
+            for match in self.vins[start:start + limit - len(suggestions)]:
+                if not match.startswith(vin):
+                    break
+                suggestions.append(_entry(VIN_KIND, match, 1, q=match))
+        return suggestions
+
+
+def suggestion_index():
+    """
+    This process's index, rebuilt after a brand, model or car changed.
+    """
+    global _local
+    version = (reference_version(), facet_version())
+    local_version, index = _local
+    if local_version != version:
+        index = SuggestionIndex.build()
+        _local = (version, index)
+    return index
+
+
+def suggest(query, limit=None):
+    """
+    [{"kind", "label", "count", "url"}, ...] for what the user typed so far.
+    """
+    limit = limit or getattr(settings, "CAR_SUGGEST_LIMIT", 8)
+    return suggestion_index().lookup(query, limit)
@@ -0,0 +1,94 @@
+# cars/templatetags/car_images.py
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from cars.images import DEFAULT_VARIANT, FORMATS, SIZES, is_placeholder_source, ready_variants
+
+register = template.Library()
+
+
+@register.filter
+def variant_url(image, variant=DEFAULT_VARIANT):
+    """
+    Returns the URL of a ready derivative of an image field, e.g.
+    {{ car.main_image|variant_url }} or {{ image_obj.image|variant_url:"thumb.jpeg" }}.
+    Falls back to the original upload while the derivative is still pending.
+    """
+    if not image:
+        return ""
+    derivative = ready_variants(image).get(variant)
+    return derivative.file.url if derivative else image.url
+
+
+@register.filter
+def placeholder_style(image):
+    """
+    Inline CSS painting the stored placeholder (dominant colour + tiny WebP)
+    behind an image field until the real image has loaded.
+    """
+    if not image:
+        return ""
+    owner = image.instance
+    if not is_placeholder_source(owner, image.field.name) or not owner.placeholder:
+        return ""
+    return f"background: {owner.dominant_color} url('{owner.placeholder}') center / cover no-repeat"
+
+
+def _srcset(variants, image_format, sizes):
+    return ", ".join(
+        f"{variants[f'{size}.{image_format}'].file.url} {SIZES[size][0]}w"
+        for size in sizes
+        if f"{size}.{image_format}" in variants
+    )
+
+
+@register.simple_tag
+def picture(image, sizes_list="thumb card detail zoom", sizes="100vw", **attrs):
+    """
+    Renders a responsive <picture> for any Car/CarImage image field:
+
+        {% picture car.main_image "thumb card detail" sizes="50vw" class="card-img-top" alt="Car" %}
+
+    One <source> per modern format (AVIF, WebP) plus a JPEG <img> fallback,
+    each with a width-descriptor srcset over the listed canvas sizes.
+    Extra keyword arguments become <img> attributes (data_slide_to -> data-slide-to).
+    Until derivatives are ready it renders a plain <img> of the original.
+    The owner's stored placeholder is painted as the <img> background.
+    """
+    if not image:
+        return ""
+
+    attrs = {name.replace("_", "-"): value for name, value in attrs.items()}
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    style = placeholder_style(image)
+    if style:
+        attrs.setdefault("style", style)
+
+    names = [size for size in sizes_list.split() if size in SIZES]
+    variants = ready_variants(image)
+    fallback = _srcset(variants, "jpeg", names)
+    if not names or not fallback:
+        attributes = format_html_join(" ", '{}="{}"', attrs.items())
+        return format_html('<img src="{}" {}>', image.url, attributes)
+
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (FORMATS[image_format]["mime"], srcset, sizes)
+            for image_format in ("avif", "webp")
+            for srcset in [_srcset(variants, image_format, names)]
+            if srcset
+        ),
+    )
+    largest = f"{names[-1]}.jpeg"
+    src = variants[largest].file.url if largest in variants else image.url
+    width, height = SIZES[names[-1]]
+    attrs.setdefault("width", width)
+    attrs.setdefault("height", height)
+    attributes = format_html_join(" ", '{}="{}"', attrs.items())
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        sources, src, fallback, sizes, attributes,
+    )
@@ -1,10 +1,16 @@
 from django.urls import path
-from cars.views import HomeView, FavoritesView, CarDetailView, toggle_favorite, car_models_by_brand, AboutUsView
+from cars.api import CarListAPIView
+from cars.views import HomeView, FavoritesView, CarDetailView, toggle_favorite, car_models_by_brand, car_catalogue, car_export, car_suggest, AboutUsView
 
 urlpatterns = [
     path("", HomeView.as_view(), name="home"),
     path('favorites/', FavoritesView.as_view(), name='favorite-cars'),
     path('ajax/models/<int:brand_id>/', car_models_by_brand, name='ajax_car_models'),
+    path('ajax/catalogue.json', car_catalogue, name='car_catalogue'),
+    path('ajax/catalogue/<int:version>.json', car_catalogue, name='car_catalogue_version'),
+    path('ajax/suggest/', car_suggest, name='car_suggest'),
+    path('api/v1/cars/', CarListAPIView.as_view(), name='api_car_list'),
+    path('export/cars.<str:format>', car_export, name='car_export'),
     path("car/<slug:slug>/", CarDetailView.as_view(), name="car_detail"),
     path('toggle-favorite/', toggle_favorite, name='toggle_favorite'),
     path("about-us/", AboutUsView.as_view(), name="about_us"),
@@ -1,18 +1,34 @@
+import re
 from django.views.generic import ListView, DetailView, TemplateView
-from cars.models import Car, Brand, CarModel, Year, AboutPage, OurValue, WorkProcessStep
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from django.db.models import Case, When
-from django.db.models import Q, Min, Max
-from django.shortcuts import get_object_or_404
-from .recommendation import recommend_for_car
+from cars.models import Car, CarQuerySet, AboutPage, OurValue, WorkProcessStep
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.utils.cache import add_never_cache_headers, patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.db.models import prefetch_related_objects
+from django.shortcuts import get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .export import FORMATS as EXPORT_FORMATS, export_stream
+from .facets import facet_counts, filter_q, filter_state
+from .history import record_view, toggle_visitor_favorite, visitor_favorites
+from .pagination import CursorPaginationMixin
+from .page_cache import get_detail, set_detail
+from .reference import brands, catalogue, models_for_brand, reference_version
+from .recommendation import recommend_for_car, recommend_for_general
+from .search import search_ids
+from .suggest import suggest
+from .templatetags.car_images import variant_url
 
 # Create your views here.
 
 
-class HomeView(ListView):
+class HomeView(CursorPaginationMixin, ListView):
     """
     Displays a list of available cars on the home page with filtering.
+    ?cursor= switches to keyset pagination (see cars/pagination.py).
     """
     model = Car
     template_name = "home.html"
@@ -21,47 +37,63 @@ class HomeView(ListView):
     ordering = ["-created_at"]
 
     def get_queryset(self):
-        qs = super().get_queryset()
-
-        # Filter based on GET parameters
-        category = self.request.GET.get("category")
-        brand_id = self.request.GET.get("brand")
-        model_id = self.request.GET.get("model")
-        from_year = self.request.GET.get("from_year")  # from slider value
-        to_year = self.request.GET.get("to_year")      # to slider value
-
-        filters = Q()
-        if category:
-            filters &= Q(category=category)
-        if brand_id:
-            filters &= Q(brand_id=brand_id)
-        if model_id:
-            filters &= Q(model_id=model_id)
-        # Filter by year range from sliders
-        if from_year:
-            filters &= Q(year__year__gte=int(from_year))  # greater or equal to from_year
-        if to_year:
-            filters &= Q(year__year__lte=int(to_year))    # less or equal to to_year
-
-        return qs.filter(filters)
+        qs = super().get_queryset().for_listing()
+
+        # Filter based on GET parameters (category, brand, model, year range)
+        return qs.filter(filter_q(filter_state(self.request.GET)))
+
+    def search_query(self):
+        return self.request.GET.get("q", "").strip()
+
+    def paginate_queryset(self, queryset, page_size):
+        query = self.search_query()
+        if not query:
+            return super().paginate_queryset(queryset, page_size)
+
+        # Search results keep their rank order on numbered pages: the ranked
+        # ids passing the filters are paged, then only the page's cars loaded
+        ranked = search_ids(query)
+        matching = set(queryset.filter(pk__in=ranked).values_list("pk", flat=True))
+        paginator, page, page_ids, is_paginated = super(CursorPaginationMixin, self).paginate_queryset(
+            [car_id for car_id in ranked if car_id in matching], page_size
+        )
+        cars = Car.objects.for_listing().in_bulk(page_ids)
+        page.object_list = [cars[car_id] for car_id in page_ids]
+        return paginator, page, page.object_list, is_paginated
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['brands'] = Brand.objects.all()
-        context['car_models'] = CarModel.objects.all()
-
-        # Adding min and max date
-        year_stats = Year.objects.aggregate(min_year=Min('year'), max_year=Max('year'))
-        context['min_year'] = year_stats['min_year']
-        context['max_year'] = year_stats['max_year']
+        state = filter_state(self.request.GET)
+        # Sidebar counts for the current filters, cached (see cars/facets.py)
+        facets = facet_counts(state)
+        context['facets'] = facets
+
+        # Brands and models are cached reference data (see cars/reference.py);
+        # only the selected brand's models are sent to the template
+        context['brands'] = [
+            {**brand, 'car_count': facets['brand'].get(brand['id'], 0)} for brand in brands()
+        ]
+        context['car_models'] = [
+            {**model, 'car_count': facets['model'].get(model['id'], 0)}
+            for model in models_for_brand(state.get("brand"))
+        ]
+
+        # Adding min and max date (both ends read from the facet table)
+        context['min_year'] = facets['min_year']
+        context['max_year'] = facets['max_year']
 
         # Track selected filters for template
-        context['selected_category'] = self.request.GET.get("category", "")
-        context['selected_brand'] = int(self.request.GET.get("brand")) if self.request.GET.get("brand") else None
-        context['selected_model'] = int(self.request.GET.get("model")) if self.request.GET.get("model") else None
+        context['search_query'] = self.search_query()
+        # Numbered page links keep the filters and the search
+        query = self.request.GET.copy()
+        query.pop("page", None)
+        context['filter_query'] = query.urlencode()
+        context['selected_category'] = state.get("category", "")
+        context['selected_brand'] = state.get("brand")
+        context['selected_model'] = state.get("model")
         # Track selected slider values for template
-        context['selected_from_year'] = int(self.request.GET.get("from_year")) if self.request.GET.get("from_year") else context['min_year']
-        context['selected_to_year'] = int(self.request.GET.get("to_year")) if self.request.GET.get("to_year") else context['max_year']
+        context['selected_from_year'] = state.get("from_year", context['min_year'])
+        context['selected_to_year'] = state.get("to_year", context['max_year'])
 
         return context
 
@@ -70,26 +102,113 @@ def toggle_favorite(request):
     car_id = request.POST.get('car_id')
     if not car_id:
         return JsonResponse({"success": False, "error": "No car id provided."})
+    if not car_id.isdigit():
+        return JsonResponse({"success": False, "error": "Invalid car id."})
 
-    # initialize session list if it doesn't exist
-    favorites = request.session.get('favorites', [])
+    # The session's compact id list, or FavoriteCar rows once logged in
+    # (see cars/history.py)
+    added, favorites = toggle_visitor_favorite(request, int(car_id))
+    if favorites is None:
+        return JsonResponse({"success": False, "error": "Invalid car id."})
 
-    if car_id in favorites:
-        favorites.remove(car_id)
-        added = False
-    else:
-        favorites.append(car_id)
-        added = True
+    return JsonResponse({"success": True, "added": added, "favorites_count": len(favorites)})
 
-    request.session['favorites'] = favorites
-    request.session.modified = True
 
-    return JsonResponse({"success": True, "added": added, "favorites_count": len(favorites)})
+@cache_control(public=True, max_age=settings.CAR_SUGGEST_MAX_AGE)
+def car_suggest(request):
+    """
+    Typeahead suggestions for ?q=, from an in-process index: no query per
+    keystroke (see cars/suggest.py).
+    """
+    return JsonResponse({"suggestions": suggest(request.GET.get("q", ""))})
 
+
+def _models_etag(request, brand_id):
+    return f"{reference_version()}-{brand_id}"
+
+
+@cache_control(public=True, max_age=settings.CAR_MODELS_MAX_AGE)
+@condition(etag_func=_models_etag)
 def car_models_by_brand(request, brand_id):
-    models = CarModel.objects.filter(brand_id=brand_id).values('id', 'name')
-    print(brand_id)
-    return JsonResponse(list(models), safe=False)
+    """
+    Models of one brand. The ETag follows the catalogue version, so a
+    revalidation gets a 304 without touching the database.
+    """
+    return JsonResponse(models_for_brand(brand_id), safe=False)
+
+
+_ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+def _accepts_gzip(request):
+    return bool(_ACCEPTS_GZIP.search(request.headers.get("Accept-Encoding", "")))
+
+
+def _catalogue_etag(request, version=None):
+    # Only the current version has an ETag; strong ETags differ per encoding
+    if version != reference_version():
+        return None
+    return f"{version}-gzip" if _accepts_gzip(request) else str(version)
+
+
+@condition(etag_func=_catalogue_etag)
+def car_catalogue(request, version=None):
+    """
+    The whole brand -> models tree as one precompressed JSON document.
+    /ajax/catalogue.json redirects to the current /ajax/catalogue/<version>.json,
+    which never changes and may be cached for days.
+    """
+    current, body, compressed = catalogue()
+    if version != current:
+        response = redirect("car_catalogue_version", version=current)
+        add_never_cache_headers(response)
+        return response
+
+    if _accepts_gzip(request):
+        response = HttpResponse(compressed, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    patch_vary_headers(response, ("Accept-Encoding",))
+    patch_cache_control(response, public=True, max_age=settings.CAR_CATALOGUE_MAX_AGE, immutable=True)
+    return response
+
+
+def _export_allowed(request):
+    # Staff, or partners sending "Authorization: Token <CAR_EXPORT_TOKEN>"
+    if request.user.is_staff:
+        return True
+    token = settings.CAR_EXPORT_TOKEN
+    scheme, _, value = request.headers.get("Authorization", "").partition(" ")
+    return bool(token) and scheme == "Token" and constant_time_compare(value, token)
+
+
+def car_export(request, format):
+    """
+    Streams every car matching the home page filters as NDJSON or CSV,
+    gzipped on the fly when the client accepts it (see cars/export.py).
+    """
+    if format not in EXPORT_FORMATS:
+        raise Http404(f"Unknown export format: {format}")
+    if not _export_allowed(request):
+        return HttpResponseForbidden()
+
+    gzip = _accepts_gzip(request)
+    response = StreamingHttpResponse(
+        export_stream(
+            format,
+            gzip=gzip,
+            queryset=Car.objects.filter(filter_q(filter_state(request.GET))),
+            base_url=request.build_absolute_uri("/").rstrip("/"),
+        ),
+        content_type=EXPORT_FORMATS[format][1],
+    )
+    if gzip:
+        response["Content-Encoding"] = "gzip"
+    response["Content-Disposition"] = f'attachment; filename="cars.{format}"'
+    patch_vary_headers(response, ("Accept-Encoding",))
+    add_never_cache_headers(response)
+    return response
 
 class CarDetailView(DetailView):
     """
@@ -104,9 +223,11 @@ class CarDetailView(DetailView):
         """
         Override the default lookup to fetch the car by slug.
         Ensures a 404 page instead of crashing if slug is invalid.
+        Related rows are prefetched only when the page cache misses.
         """
         slug = self.kwargs.get("slug")
-        return get_object_or_404(Car, slug=slug)
+        queryset = Car.objects.select_related("brand", "model", "year")
+        return get_object_or_404(queryset, slug=slug)
 
     def get_context_data(self, **kwargs):
         """
@@ -117,38 +238,58 @@ class CarDetailView(DetailView):
 
         # Get the current Car object fetched by DetailView
         car_object = self.object 
-        
-        # ----------------------------------------------------------------------
-        # Retrieve the 17th image object (index 16) from the images queryset
-        # ----------------------------------------------------------------------
-        
-        try:
-            # Queryset slicing: car_object.images.all()[16] directly fetches the 17th item.
-            # Using slicing on a QuerySet is efficient as Django handles the limit in SQL.
-            seventeenth_image = car_object.images.all()[16] 
-        except IndexError:
-            # Handle the case where the car has less than 17 images.
-            # Set it to None or the last available image if needed.
-            seventeenth_image = None
-        except AttributeError:
-            # Handle if the 'images' attribute doesn't exist or is invalid.
-            seventeenth_image = None
-
-        # Add the retrieved object to the context
-        context["seventeenth_image"] = seventeenth_image
-        
+
+        # The visitor-independent body is cached per slug + updated_at
+        # (see cars/page_cache.py); only a miss renders it.
+        entry = get_detail(car_object) or self.render_detail(car_object)
+        context["car_body"] = mark_safe(entry["body"])
+        context["main_image_url"] = entry["main_image_url"]
+
         # -----------------------------
         # Recommended cars for this car
         # -----------------------------
-        recommended_cars = recommend_for_car(car_object.id, limit=6)
-        context["recommended_cars"] = recommended_cars
-        return context
+        # Cards show per-visitor favorite hearts, so they are not cached;
+        # the precomputed list is one indexed query (see cars/recommendation.py)
+        context["recommended_cars"] = list(recommend_for_car(car_object.id, limit=6))
 
+        # Recently viewed cars feed the visitor's "recommended for you";
+        # the session is only saved when the list actually changed
+        record_view(self.request.session, car_object.id)
+        return context
 
-class FavoritesView(ListView):
+    def render_detail(self, car_object):
+        """
+        Render the cacheable part of the page and store it.
+        """
+        prefetch_related_objects([car_object], *CarQuerySet.detail_lookups())
+
+        # Everything below reads the prefetched lists, so counts and loops
+        # in the templates never go back to the database.
+        car_images = list(car_object.images.all())
+        body = render_to_string("partials/car_details/body.html", {
+            "car": car_object,
+            "car_images": car_images,
+            "features": list(car_object.features.all()),
+            "changed_parts": list(car_object.changed_parts.all()),
+            "painted_parts": list(car_object.painted_parts.all()),
+            # The 17th image (index 16) is shown behind the "+N more" overlay
+            "seventeenth_image": car_images[16] if len(car_images) > 16 else None,
+        })
+
+        return set_detail(
+            car_object,
+            body=body,
+            main_image_url=variant_url(car_object.main_image),
+        )
+
+
+class FavoritesView(CursorPaginationMixin, ListView):
     """
     Displays a list of all favorite cars.
     Supports pagination and ordering by newest first.
+    Numbered pages slice the ordered favorite ids and fetch only that
+    page's cars; with ?cursor= pages are keyset-paginated by the cars'
+    (created_at, id).
     """
     model = Car
     template_name = "favorites.html"
@@ -156,20 +297,35 @@ class FavoritesView(ListView):
     paginate_by = 12  # Optional: show 12 cars per page
 
     def get_queryset(self):
-        # Get list of favorite car IDs from session
-        favorite_ids = self.request.session.get('favorites', [])
+        # Newest first, from one query or the session (see cars/history.py)
+        favorites = visitor_favorites(self.request)
 
         # If no favorites, return empty queryset
-        if not favorite_ids:
+        if not favorites:
             return Car.objects.none()
 
-        # Fetch only cars in favorites list
-        # Case/When preserves the list order stored in session
-        order = Case(*[
-            When(id=cid, then=pos) for pos, cid in enumerate(reversed(favorite_ids))
-        ])
+        return Car.objects.for_listing().filter(id__in=favorites)
 
-        return Car.objects.filter(id__in=favorite_ids).order_by(order)
+    def paginate_queryset(self, queryset, page_size):
+        if self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        # The id list is already ordered: page it, then load only the page's
+        # cars, so the SQL stays the same size for 10 or 1000 favorites
+        paginator, page, page_ids, is_paginated = super().paginate_queryset(
+            visitor_favorites(self.request), page_size
+        )
+        cars = Car.objects.for_listing().in_bulk(page_ids)
+        page.object_list = [cars[car_id] for car_id in page_ids if car_id in cars]
+        return paginator, page, page.object_list, is_paginated
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Ranked against the session's viewed and favorite cars
+        context["recommended_for_you"] = recommend_for_general(
+            self.request.session, limit=8, favorites=visitor_favorites(self.request)
+        )
+        return context
 
 
 class AboutUsView(TemplateView):
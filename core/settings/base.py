@@ -51,6 +51,7 @@ APPS = [
 
 THIRD_PARTY_APPS = [
     'image_uploader_widget',
+    'rest_framework',
 
 ]
 
@@ -78,6 +79,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'cars.context_processors.favorites',
             ],
         },
     },
@@ -150,4 +152,87 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 SESSION_COOKIE_AGE = 365 * 24 * 60 * 60  # 31536000 seconds
 
 # Session won't expire when browser closes
-SESSION_EXPIRE_AT_BROWSER_CLOSE = False
\ No newline at end of file
+SESSION_EXPIRE_AT_BROWSER_CLOSE = False
+
+# Car image derivatives (see cars/images.py)
+# AVIF variants are rendered only when enabled here and supported by Pillow
+CAR_IMAGE_AVIF = os.getenv("CAR_IMAGE_AVIF", "false").lower() == "true"
+# Failed derivatives are queued again when their owner is saved, up to this many renders
+CAR_IMAGE_MAX_ATTEMPTS = int(os.getenv("CAR_IMAGE_MAX_ATTEMPTS", 3))
+
+# Cache for rendered car detail pages (see cars/page_cache.py)
+# CAR_PAGE_CACHE_BACKEND: "locmem" (per process), "file" or "db"; the
+# shared cache below follows it. The db backend needs
+# `python manage.py createcachetable` once.
+CAR_PAGE_CACHE_BACKEND = os.getenv("CAR_PAGE_CACHE_BACKEND", "locmem")
+CAR_PAGE_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "car-pages"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / "cache" / "car_pages")),
+    "db": ("django.core.cache.backends.db.DatabaseCache", "car_page_cache"),
+}
+
+# Shared cache (CACHES["default"]): brand/model snapshot, facet tables,
+# listing counts and the version keys retiring them (see cars/reference.py
+# and cars/facets.py). It uses the backend picked for the page cache; with
+# "locmem" every process keeps its own versions, so serve several workers
+# with "file" or "db". Entries are many small keys, hence the larger cap.
+SHARED_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "shared"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / "cache" / "shared")),
+    "db": ("django.core.cache.backends.db.DatabaseCache", "shared_cache"),
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": SHARED_CACHE_BACKENDS[CAR_PAGE_CACHE_BACKEND][0],
+        "LOCATION": os.getenv("SHARED_CACHE_LOCATION", SHARED_CACHE_BACKENDS[CAR_PAGE_CACHE_BACKEND][1]),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("SHARED_CACHE_MAX_ENTRIES", 10000))},
+    },
+    "car_pages": {
+        "BACKEND": CAR_PAGE_CACHE_BACKENDS[CAR_PAGE_CACHE_BACKEND][0],
+        "LOCATION": os.getenv("CAR_PAGE_CACHE_LOCATION", CAR_PAGE_CACHE_BACKENDS[CAR_PAGE_CACHE_BACKEND][1]),
+        "TIMEOUT": int(os.getenv("CAR_PAGE_CACHE_TIMEOUT", 60 * 60)),
+    },
+}
+
+# Car listings (see cars/pagination.py)
+# Keyset pagination for every listing request, not only those with ?cursor=
+CAR_LISTING_CURSOR_PAGINATION = os.getenv("CAR_LISTING_CURSOR_PAGINATION", "false").lower() == "true"
+# Seconds an approximate listing count is cached
+CAR_LISTING_COUNT_TIMEOUT = int(os.getenv("CAR_LISTING_COUNT_TIMEOUT", 300))
+
+# Home filter sidebar (see cars/facets.py and cars/reference.py)
+# Seconds a facet table and its counts are cached; car edits clear them sooner
+CAR_FACET_TIMEOUT = int(os.getenv("CAR_FACET_TIMEOUT", 300))
+# Seconds the brand/model snapshot is kept; edits replace it sooner
+CAR_REFERENCE_TIMEOUT = int(os.getenv("CAR_REFERENCE_TIMEOUT", 60 * 60 * 24))
+# Seconds browsers may reuse /ajax/models/<brand>/ before revalidating its ETag
+CAR_MODELS_MAX_AGE = int(os.getenv("CAR_MODELS_MAX_AGE", 60))
+# Seconds browsers keep a versioned /ajax/catalogue/<version>.json
+CAR_CATALOGUE_MAX_AGE = int(os.getenv("CAR_CATALOGUE_MAX_AGE", 60 * 60 * 24 * 7))
+
+# Similar cars stored per car (see cars/recommendation.py)
+CAR_RECOMMENDATIONS_PER_CAR = int(os.getenv("CAR_RECOMMENDATIONS_PER_CAR", 6))
+
+# Per-visitor session lists (see cars/history.py)
+CAR_RECENTLY_VIEWED_LIMIT = int(os.getenv("CAR_RECENTLY_VIEWED_LIMIT", 20))
+CAR_FAVORITES_LIMIT = int(os.getenv("CAR_FAVORITES_LIMIT", 200))
+
+# Catalogue search (see cars/search.py)
+# Best matches considered per search, before the listing filters
+CAR_SEARCH_LIMIT = int(os.getenv("CAR_SEARCH_LIMIT", 1000))
+# Typeahead suggestions per request (see cars/suggest.py)
+CAR_SUGGEST_LIMIT = int(os.getenv("CAR_SUGGEST_LIMIT", 8))
+# Seconds browsers may reuse /ajax/suggest/ answers
+CAR_SUGGEST_MAX_AGE = int(os.getenv("CAR_SUGGEST_MAX_AGE", 60))
+
+# Listing API (see cars/api.py)
+CAR_API_PAGE_SIZE = int(os.getenv("CAR_API_PAGE_SIZE", 20))
+# Largest ?page_size= honoured
+CAR_API_MAX_PAGE_SIZE = int(os.getenv("CAR_API_MAX_PAGE_SIZE", 100))
+
+# Catalogue export (see cars/export.py)
+# Cars read per database round trip; memory use follows this, not the catalogue size
+CAR_EXPORT_CHUNK_SIZE = int(os.getenv("CAR_EXPORT_CHUNK_SIZE", 2000))
+# Token partners send as "Authorization: Token <token>"; empty allows staff only
+CAR_EXPORT_TOKEN = os.getenv("CAR_EXPORT_TOKEN", "")
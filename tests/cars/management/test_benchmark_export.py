@@ -0,0 +1,23 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from cars.models import Car, CarFeature, CarImage
+
+
+class BenchmarkExportCommandTest(TestCase):
+    """
+    Tests for the benchmark_export management command.
+    """
+
+    def test_reports_every_case_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_export", cars=50, chunk_size=20, stdout=out)
+
+        rows = {line.split()[0]: line.split() for line in out.getvalue().splitlines()[2:]}
+        self.assertEqual(set(rows), {"list", "ndjson", "ndjson.gz", "csv", "csv.gz"})
+        self.assertEqual(rows["list"][2], "-")
+        self.assertFalse(Car.objects.exists())
+        self.assertFalse(CarFeature.objects.exists())
+        self.assertFalse(CarImage.objects.exists())
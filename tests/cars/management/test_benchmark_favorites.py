@@ -0,0 +1,23 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from cars.models import Car
+
+
+class BenchmarkFavoritesCommandTest(TestCase):
+    """
+    Tests for the benchmark_favorites management command.
+    """
+
+    def test_reports_first_and_last_pages_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_favorites", favorites=[12, 30], repeat=1, stdout=out)
+
+        rows = [line.split() for line in out.getvalue().splitlines()[2:]]
+        self.assertEqual([row[:2] for row in rows], [["12", "1"], ["30", "1"], ["30", "3"]])
+        # The sliced page's SQL does not grow with the favorites, CASE/WHEN's does
+        self.assertEqual(rows[0][5], rows[1][5])
+        self.assertLess(int(rows[0][3]), int(rows[1][3]))
+        self.assertFalse(Car.objects.exists())
@@ -0,0 +1,34 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from cars.models import Car
+
+
+class BenchmarkHomeFiltersCommandTest(TestCase):
+    """
+    Tests for the benchmark_home_filters management command.
+    """
+
+    def car_indexes(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Car._meta.db_table)
+        return {name for name in constraints if name.startswith("car_")}
+
+    def test_reports_every_case_and_rolls_back(self):
+        """
+        A small run prints before/after timings and leaves no rows or index changes.
+        """
+        indexes = self.car_indexes()
+        out = StringIO()
+        call_command("benchmark_home_filters", cars=200, repeat=1, explain=True, stdout=out)
+
+        output = out.getvalue()
+        for case in ("all", "category", "brand+model", "years", "featured"):
+            self.assertIn(case, output)
+        self.assertIn("car_category_newest_idx", output)
+        self.assertFalse(Car.objects.exists())
+        self.assertEqual(self.car_indexes(), indexes)
+        self.assertIn("car_featured_newest_idx", indexes)
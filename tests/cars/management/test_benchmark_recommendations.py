@@ -0,0 +1,21 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+
+class BenchmarkRecommendationsCommandTest(SimpleTestCase):
+    """
+    Tests for the benchmark_recommendations management command.
+    """
+
+    def test_reports_every_size(self):
+        """
+        A small run prints one row per catalogue size without the database.
+        """
+        out = StringIO()
+        call_command("benchmark_recommendations", cars=[50, 200], repeat=1, batch=10, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn("numpy/query", lines[0])
+        self.assertEqual([line.split()[0] for line in lines[1:]], ["50", "200"])
@@ -0,0 +1,25 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from cars.models import Car, CarSearchDocument
+
+
+class BenchmarkSearchCommandTest(TestCase):
+    """
+    Tests for the benchmark_search management command.
+    """
+
+    def test_reports_every_case_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_search", cars=300, repeat=1, stdout=out)
+
+        rows = {line.split()[0]: line.split() for line in out.getvalue().splitlines()[2:]}
+        self.assertEqual(
+            set(rows), {"model", "prefix", "model+trim", "vin", "typo", "filtered", "common"}
+        )
+        # A VIN prefix finds its car
+        self.assertEqual(rows["vin"][3], "1")
+        self.assertFalse(Car.objects.exists())
+        self.assertFalse(CarSearchDocument.objects.exists())
@@ -0,0 +1,44 @@
+import gzip
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from cars.models import Brand, Car, CarModel
+
+
+class ExportCarsCommandTest(TestCase):
+    """
+    Tests for the export_cars management command.
+    """
+
+    def setUp(self):
+        model = CarModel.objects.create(name="Rio", brand=Brand.objects.create(name="Kia"))
+        self.cars = [
+            Car.objects.create(
+                brand=model.brand, model=model, fuel_type="petrol", transmission="manual",
+                engine_volume=1.4, price=10000 + 100 * i, mileage=1000 * i,
+            )
+            for i in range(3)
+        ]
+
+    def test_writes_to_stdout(self):
+        out = StringIO()
+        call_command("export_cars", "--base-url", "https://example.com/", "--chunk-size", "2", stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["id"] for row in rows], [car.pk for car in self.cars])
+        self.assertTrue(rows[0]["url"].startswith("https://example.com/car/"))
+        self.assertIsNone(rows[0]["main_image"])
+
+    def test_writes_gzipped_files(self):
+        path = self.enterContext(tempfile.TemporaryDirectory()) + "/cars.csv.gz"
+        out = StringIO()
+        call_command("export_cars", "--format", "csv", "--gzip", "--output", path, stdout=out)
+        with gzip.open(path, "rt") as dump:
+            self.assertEqual(len(dump.read().splitlines()), 4)
+        self.assertIn("Exported 3 cars", out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command("export_cars", "--gzip", stdout=StringIO())
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from cars.images import VARIANTS, process_pending
+from cars.models import Car, CarImage, ImageDerivative
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name="car.jpg", color=(90, 90, 90)):
+    buffer = BytesIO()
+    Image.new("RGB", (640, 480), color).save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RebuildCarImagesCommandTest(TestCase):
+    """
+    Tests for the rebuild_car_images management command.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            fuel_type="diesel",
+            transmission="manual",
+            engine_volume=2.0,
+            price=18000,
+            mileage=50000,
+            main_image=make_image(),
+        )
+        CarImage.objects.create(car=self.car, image=make_image("gallery.jpg", color=(1, 200, 1)))
+        self.checkpoint = os.path.join(MEDIA_ROOT, "checkpoint.json")
+
+    def rebuild(self, *args):
+        out = StringIO()
+        call_command(
+            "rebuild_car_images", *args, "--workers=1", f"--checkpoint={self.checkpoint}", stdout=out
+        )
+        return out.getvalue()
+
+    def test_dry_run_reports_without_rendering(self):
+        """
+        --dry-run counts the work but leaves derivatives pending.
+        """
+        output = self.rebuild("--dry-run")
+        self.assertIn(f"Would render {2 * len(VARIANTS)} image(s) for 2 row(s)", output)
+        self.assertFalse(ImageDerivative.objects.filter(status=ImageDerivative.READY).exists())
+
+    def test_rebuild_renders_everything_and_reports_throughput(self):
+        """
+        A full run renders every variant of every row and prints images/sec.
+        """
+        output = self.rebuild()
+        self.assertIn("images/sec", output)
+        self.assertEqual(
+            ImageDerivative.objects.filter(status=ImageDerivative.READY).count(), 2 * len(VARIANTS)
+        )
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_only_missing_skips_ready_derivatives(self):
+        """
+        --only-missing re-renders only what is not ready yet.
+        """
+        process_pending()
+        ImageDerivative.objects.filter(variant="card.webp").delete()
+        output = self.rebuild("--only-missing")
+        self.assertIn("Rendered 2 image(s)", output)
+        self.assertEqual(ImageDerivative.objects.filter(variant="card.webp").count(), 2)
+
+    def test_since_filters_rows(self):
+        """
+        --since skips rows changed before the given date.
+        """
+        output = self.rebuild("--dry-run", "--since=2999-01-01")
+        self.assertIn("for 0 row(s)", output)
+
+    def test_resume_continues_after_checkpoint(self):
+        """
+        --resume skips rows up to the stored checkpoint.
+        """
+        with open(self.checkpoint, "w") as handle:
+            json.dump({"cars.car": self.car.pk}, handle)
+        output = self.rebuild("--resume", "--dry-run")
+        self.assertIn("for 1 row(s)", output)
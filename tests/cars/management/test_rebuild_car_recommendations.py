@@ -0,0 +1,36 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from cars.models import Brand, Car, CarModel, CarRecommendation
+from cars.recommendation import process_refresh_queue
+
+
+class RebuildCarRecommendationsCommandTest(TestCase):
+    """
+    Tests for the rebuild_car_recommendations management command.
+    """
+
+    def test_rebuilds_every_list(self):
+        """
+        Wiped or stale lists are recomputed for every car.
+        """
+        model = CarModel.objects.create(name="Rio", brand=Brand.objects.create(name="Kia"))
+        cars = [
+            Car.objects.create(
+                brand=model.brand, model=model, fuel_type="petrol", transmission="manual",
+                engine_volume=1.4, price=10000 + 100 * i, mileage=1000 * i,
+            )
+            for i in range(4)
+        ]
+        process_refresh_queue()
+        expected = list(CarRecommendation.objects.values_list("car_id", "recommended_id", "rank"))
+        CarRecommendation.objects.all().delete()
+
+        out = StringIO()
+        call_command("rebuild_car_recommendations", "--batch-size", "3", stdout=out)
+
+        self.assertEqual(list(CarRecommendation.objects.values_list("car_id", "recommended_id", "rank")), expected)
+        self.assertEqual(CarRecommendation.objects.filter(car=cars[0]).count(), 3)
+        self.assertIn("for 4 cars", out.getvalue())
@@ -0,0 +1,35 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from cars.models import Brand, Car, CarModel, CarSearchDocument
+from cars.search import search_ids
+
+
+class RebuildCarSearchCommandTest(TestCase):
+    """
+    Tests for the rebuild_car_search management command.
+    """
+
+    def test_rebuilds_every_document(self):
+        """
+        Missing documents are written again and the cars can be found.
+        """
+        model = CarModel.objects.create(name="Tucson", brand=Brand.objects.create(name="Hyundai"))
+        cars = [
+            Car.objects.create(
+                brand=model.brand, model=model, fuel_type="petrol", transmission="manual",
+                engine_volume=2.0, price=10000 + 100 * i, mileage=1000 * i,
+            )
+            for i in range(3)
+        ]
+        CarSearchDocument.objects.all().delete()
+        self.assertEqual(list(search_ids("tucson")), [])
+
+        out = StringIO()
+        call_command("rebuild_car_search", "--batch-size", "2", stdout=out)
+
+        self.assertEqual(CarSearchDocument.objects.count(), 3)
+        self.assertEqual(sorted(search_ids("tucson")), sorted(car.pk for car in cars))
+        self.assertIn("of 3 cars", out.getvalue())
@@ -0,0 +1,89 @@
+import datetime
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+from django.urls import reverse
+
+from cars.models import Car, Year
+
+backfill = import_module("cars.migrations.0025_backfill_car_model_year")
+
+
+def make_car(**fields):
+    return Car.objects.create(
+        fuel_type="petrol",
+        transmission="manual",
+        engine_volume=1.6,
+        price=12000,
+        mileage=50000,
+        **fields,
+    )
+
+
+class CarModelYearTest(TestCase):
+    """
+    Tests for the denormalized Car.model_year column.
+    """
+
+    def test_year_is_copied_on_save(self):
+        """
+        The selected Year wins over the manufacture date.
+        """
+        car = make_car(year=Year.objects.create(year=2019), manufacture_date=datetime.date(2018, 11, 1))
+        self.assertEqual(car.model_year, 2019)
+
+    def test_manufacture_date_is_the_fallback(self):
+        """
+        Without a Year the manufacture date's year is used.
+        """
+        car = make_car(manufacture_date=datetime.date(2017, 5, 1))
+        self.assertEqual(car.model_year, 2017)
+        self.assertIsNone(make_car().model_year)
+
+    def test_update_fields_save_keeps_model_year_in_sync(self):
+        """
+        Saving only the year also writes model_year.
+        """
+        car = make_car(year=Year.objects.create(year=2015))
+        car.year = Year.objects.create(year=2021)
+        car.save(update_fields=["year"])
+        car.refresh_from_db()
+        self.assertEqual(car.model_year, 2021)
+
+    def test_year_edit_updates_its_cars(self):
+        """
+        Correcting a Year row updates every car pointing at it.
+        """
+        year = Year.objects.create(year=2012)
+        car = make_car(year=year)
+        year.year = 2013
+        year.save()
+        car.refresh_from_db()
+        self.assertEqual(car.model_year, 2013)
+
+    def test_backfill_migration(self):
+        """
+        The data migration fills model_year for existing rows.
+        """
+        with_year = make_car(year=Year.objects.create(year=2016))
+        with_date = make_car(manufacture_date=datetime.date(2014, 1, 1))
+        Car.objects.update(model_year=None)
+
+        backfill.backfill_model_year(apps, None)
+
+        self.assertEqual(Car.objects.get(pk=with_year.pk).model_year, 2016)
+        self.assertEqual(Car.objects.get(pk=with_date.pk).model_year, 2014)
+
+    def test_home_filters_and_slider_bounds_use_model_year(self):
+        """
+        The home year range filters on model_year without joining Year.
+        """
+        for value in (2010, 2015, 2020):
+            make_car(year=Year.objects.create(year=value))
+        Year.objects.create(year=1990)  # no car uses it
+
+        response = self.client.get(reverse("home"), {"from_year": 2012, "to_year": 2018})
+        self.assertEqual([car.model_year for car in response.context["cars"]], [2015])
+        self.assertEqual((response.context["min_year"], response.context["max_year"]), (2010, 2020))
+        self.assertNotIn("cars_year", str(response.context["cars"].query).split("WHERE")[1])
@@ -0,0 +1,185 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from cars.models import Brand, Car, CarModel, CarRecommendation, CarRecommendationRefresh, Year
+from cars.recommendation import (
+    load_vectors, neighbour_lists, process_refresh_queue, recommend_for_car, refresh_recommendations,
+)
+
+
+@override_settings(CAR_RECOMMENDATIONS_PER_CAR=2)
+class CarRecommendationTest(TestCase):
+    """
+    Tests for the precomputed nearest-neighbour table.
+    """
+
+    def setUp(self):
+        kia = Brand.objects.create(name="Kia")
+        self.rio = CarModel.objects.create(name="Rio", brand=kia)
+        self.ceed = CarModel.objects.create(name="Ceed", brand=kia)
+        self.camry = CarModel.objects.create(name="Camry", brand=Brand.objects.create(name="Toyota"))
+
+    def create_car(self, model, year, total_price, **fields):
+        """
+        A new car, with the worker's refresh of the queued recommendations run.
+        """
+        car = Car.objects.create(
+            brand=model.brand,
+            model=model,
+            year=Year.objects.create(year=year),
+            total_price=total_price,
+            **{
+                "fuel_type": "petrol",
+                "transmission": "manual",
+                "engine_volume": 1.6,
+                "price": total_price or 10000,
+                "mileage": 50000,
+                **fields,
+            },
+        )
+        process_refresh_queue()
+        return car
+
+    def queued(self):
+        return set(CarRecommendationRefresh.objects.values_list("car_id", flat=True))
+
+    def stored(self, car):
+        return list(CarRecommendation.objects.filter(car=car).values_list("recommended_id", flat=True))
+
+    def test_most_similar_cars_come_first(self):
+        """
+        Same model and close price/year beat a far-off car of another brand.
+        """
+        car = self.create_car(self.rio, 2019, 12000)
+        twin = self.create_car(self.rio, 2019, 12500)
+        cousin = self.create_car(self.ceed, 2018, 13000)
+        self.create_car(self.camry, 2010, 30000, fuel_type="diesel", transmission="automatic")
+
+        self.assertEqual(self.stored(car), [twin.pk, cousin.pk])
+        self.assertEqual([c.pk for c in recommend_for_car(car.pk)], [twin.pk, cousin.pk])
+
+    def test_missing_total_price_falls_back_to_price(self):
+        """
+        A car without total_price still gets and gives recommendations.
+        """
+        car = self.create_car(self.rio, 2019, None, price=12000)
+        other = self.create_car(self.camry, 2019, 12100)
+        self.assertEqual(self.stored(car), [other.pk])
+        self.assertEqual(self.stored(other), [car.pk])
+
+    def test_saving_a_car_updates_other_lists(self):
+        """
+        A new close car enters existing lists; an edited one can leave them.
+        """
+        car = self.create_car(self.rio, 2019, 12000)
+        self.create_car(self.camry, 2012, 25000)
+        self.create_car(self.camry, 2011, 26000)
+        twin = self.create_car(self.rio, 2019, 12100)
+        self.assertEqual(self.stored(car)[0], twin.pk)
+
+        twin.model = self.camry
+        twin.brand = self.camry.brand
+        twin.year = Year.objects.create(year=2001)
+        twin.total_price = 90000
+        twin.engine_volume = 3.5
+        twin.fuel_type = "diesel"
+        twin.save()
+        process_refresh_queue()
+        expected = [other for other, _ in neighbour_lists([car.pk], load_vectors(Car.objects.all()), 2)[car.pk]]
+        self.assertEqual(self.stored(car), expected)
+        self.assertNotEqual(self.stored(car)[0], twin.pk)
+
+    def test_incremental_matches_a_full_rebuild(self):
+        """
+        After a series of saves every list equals a from-scratch computation.
+        """
+        cars = [self.create_car(model, 2010 + i, 10000 + 1500 * i) for i, model in
+                enumerate([self.rio, self.ceed, self.camry, self.rio, self.camry, self.ceed])]
+        cars[2].total_price = 10100
+        cars[2].save()
+        cars[4].delete()
+        process_refresh_queue()
+
+        vectors = load_vectors(Car.objects.all())
+        for car_id, neighbours in neighbour_lists(vectors, vectors, 2).items():
+            self.assertEqual(self.stored(car_id), [other for other, _ in neighbours])
+
+    def test_unrelated_saves_do_not_recompute(self):
+        """
+        Saving only non-similarity fields leaves the table alone.
+        """
+        car = self.create_car(self.rio, 2019, 12000)
+        # pre_save reads the old main_image, then the UPDATE
+        with self.assertNumQueries(2):
+            car.featured = True
+            car.save(update_fields=["featured"])
+
+    def test_full_saves_without_feature_changes_do_not_recompute(self):
+        """
+        An admin form save of e.g. the customs estimate rewrites every
+        column, but the features are unchanged.
+        """
+        car = self.create_car(self.rio, 2019, 12000)
+        self.create_car(self.rio, 2019, 12500)
+        car.customs_tax_estimate = 1500
+        car.save()
+        self.assertEqual(self.queued(), set())
+
+        car.mileage = 90000
+        car.save()
+        self.assertEqual(self.queued(), {car.pk})
+
+    def test_saves_queue_the_refresh_for_the_worker(self):
+        """
+        The request only queues the car; the worker refreshes the lists,
+        once for all the cars a Year edit moves.
+        """
+        car = self.create_car(self.rio, 2019, 12000)
+        with mock.patch("cars.recommendation.refresh_recommendations") as refresh:
+            twin = Car.objects.create(
+                brand=self.rio.brand, model=self.rio, year=car.year, fuel_type="petrol", transmission="manual",
+                engine_volume=1.6, price=12100, total_price=12100, mileage=50000,
+            )
+            car.year.year = 2018
+            car.year.save()
+            refresh.assert_not_called()
+            self.assertEqual(self.queued(), {car.pk, twin.pk})
+
+            self.assertEqual(process_refresh_queue(), 2)
+            refresh.assert_called_once()
+            self.assertEqual(sorted(refresh.call_args.args), sorted([car.pk, twin.pk]))
+        self.assertEqual(self.queued(), set())
+
+    def test_refresh_reads_only_lists_that_can_move(self):
+        """
+        Lists that neither hold the car nor would take it in are not read.
+        """
+        car = self.create_car(self.rio, 2019, 12000)
+        twin = self.create_car(self.rio, 2019, 12100)
+        far = [self.create_car(self.camry, 2001, 90000 + 100 * i, fuel_type="diesel") for i in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            refresh_recommendations(car.pk)
+        # Only the twin's list holds the car; the far cars' lists are not read
+        lists = [query["sql"] for query in queries if '"cars_carrecommendation"."score"' in query["sql"]]
+        self.assertEqual(len(lists), 2)
+        self.assertIn(f'"cars_carrecommendation"."car_id" IN ({twin.pk})', lists[1])
+        self.assertEqual(self.stored(twin), [car.pk, far[0].pk])
+
+    def test_detail_reads_one_indexed_query(self):
+        """
+        Recommendations are a single query plus the cards' derivatives.
+        """
+        car = self.create_car(self.rio, 2019, 12000)
+        self.create_car(self.rio, 2019, 12500)
+        with self.assertNumQueries(2):
+            list(recommend_for_car(car.pk))
+
+    def test_refresh_ignores_deleted_cars(self):
+        """
+        Refreshing an id that no longer exists is a no-op.
+        """
+        with self.assertNumQueries(1):
+            refresh_recommendations(999999)
@@ -0,0 +1,313 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from cars.images import VARIANTS, process_derivatives, process_pending
+from cars.models import Brand, Car, CarImage, CarModel, ImageDerivative
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name="car.jpg", size=(1600, 900), color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageDerivativePipelineTest(TestCase):
+    """
+    Tests for the background image derivative pipeline.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        brand = Brand.objects.create(name="Toyota")
+        self.car = Car.objects.create(
+            brand=brand,
+            model=CarModel.objects.create(name="Corolla", brand=brand),
+            fuel_type="petrol",
+            transmission="automatic",
+            engine_volume=1.8,
+            price=20000,
+            mileage=0,
+            main_image=make_image(),
+        )
+
+    def test_save_queues_pending_derivative_without_touching_original(self):
+        """
+        Saving stores the original as-is and queues a pending derivative.
+        """
+        derivatives = self.car.derivatives.filter(field_name="main_image")
+        self.assertEqual(derivatives.count(), len(VARIANTS))
+        for derivative in derivatives:
+            self.assertEqual(derivative.status, ImageDerivative.PENDING)
+            self.assertEqual(derivative.source_name, self.car.main_image.name)
+        with Image.open(self.car.main_image.path) as original:
+            self.assertEqual(original.size, (1600, 900))
+
+    def test_worker_renders_every_variant(self):
+        """
+        The worker renders each size/format and marks the derivatives ready.
+        """
+        processed, ready = process_pending()
+        self.assertEqual((processed, ready), (len(VARIANTS), len(VARIANTS)))
+
+        detail = self.car.derivatives.get(field_name="main_image", variant="detail.jpeg")
+        self.assertEqual(detail.status, ImageDerivative.READY)
+        with Image.open(detail.file.path) as rendered:
+            self.assertEqual(rendered.size, (1000, 750))
+
+        thumb = self.car.derivatives.get(field_name="main_image", variant="thumb.webp")
+        with Image.open(thumb.file.path) as rendered:
+            self.assertEqual((rendered.format, rendered.size), ("WEBP", (200, 150)))
+
+    def test_worker_touches_each_car_once_per_batch(self):
+        """
+        Ready derivatives of a car and its gallery cost one touch_car() call.
+        """
+        CarImage.objects.create(car=self.car, image=make_image("gallery.jpg", color=(0, 90, 0)))
+        with patch("cars.images.touch_car") as touch_car:
+            process_pending()
+        touch_car.assert_called_once_with(self.car.pk)
+
+    def test_unrelated_edit_does_not_requeue(self):
+        """
+        Editing a non-image field keeps ready derivatives as they are.
+        """
+        process_pending()
+        self.car.customs_tax_estimate = 1500
+        self.car.save()
+        self.assertFalse(ImageDerivative.objects.filter(status=ImageDerivative.PENDING).exists())
+
+    def test_results_for_a_replaced_original_are_dropped(self):
+        """
+        An image replaced while the worker renders is queued again, not
+        marked ready (or failed) with the render of its old original.
+        """
+        claimed = list(ImageDerivative.objects.filter(status=ImageDerivative.PENDING))
+        self.car.main_image = make_image("new.jpg", color=(0, 0, 255))
+        self.car.save()
+
+        self.assertEqual(process_derivatives(claimed), 0)
+        derivatives = self.car.derivatives.all()
+        self.assertEqual({d.status for d in derivatives}, {ImageDerivative.PENDING})
+        self.assertEqual({d.source_name for d in derivatives}, {self.car.main_image.name})
+
+        process_pending()
+        self.assertEqual({d.status for d in derivatives.all()}, {ImageDerivative.READY})
+
+    def test_broken_image_marks_derivative_failed(self):
+        """
+        A file Pillow cannot decode ends up in the failed state with an error.
+        """
+        car_image = CarImage.objects.create(
+            car=self.car,
+            image=SimpleUploadedFile("broken.jpg", b"not an image", content_type="image/jpeg"),
+        )
+        process_pending()
+        for derivative in car_image.derivatives.all():
+            self.assertEqual(derivative.status, ImageDerivative.FAILED)
+            self.assertTrue(derivative.error)
+            self.assertEqual(derivative.attempts, 1)
+
+    def test_missing_original_does_not_break_save(self):
+        """
+        A file name without bytes on disk is queued and fails in the worker.
+        """
+        car_image = CarImage.objects.create(car=self.car, image="cars/gallery/missing.jpg")
+        process_pending()
+        self.assertEqual(
+            set(car_image.derivatives.values_list("status", flat=True)), {ImageDerivative.FAILED}
+        )
+
+    def test_failed_derivatives_are_retried_on_save(self):
+        """
+        Saving the owner queues failed renders again, up to
+        CAR_IMAGE_MAX_ATTEMPTS renders of the same original.
+        """
+        car_image = CarImage.objects.create(car=self.car, image="cars/gallery/late.jpg")
+        for attempt in range(3):
+            process_pending()
+            car_image.save()
+        self.assertEqual(
+            set(car_image.derivatives.values_list("status", "attempts")), {(ImageDerivative.FAILED, 3)}
+        )
+
+        with override_settings(CAR_IMAGE_MAX_ATTEMPTS=4):
+            default_storage.save("cars/gallery/late.jpg", make_image())
+            car_image.save()
+        process_pending()
+        self.assertEqual(set(car_image.derivatives.values_list("status", flat=True)), {ImageDerivative.READY})
+
+    def test_missing_original_falls_back_to_a_copy_of_the_same_bytes(self):
+        """
+        Rows sharing a hash are rendered from any original still on disk.
+        """
+        first, twin = [
+            Car.objects.create(
+                fuel_type="petrol", transmission="manual", engine_volume=1.6, price=1, mileage=0,
+                main_image=make_image("twin.jpg", color=(7, 77, 177)),
+            )
+            for _ in range(2)
+        ]
+        default_storage.delete(first.main_image.name)
+        process_pending()
+        self.assertEqual(set(twin.derivatives.values_list("status", flat=True)), {ImageDerivative.READY})
+
+    def test_delete_removes_derivatives(self):
+        """
+        Deleting the owner removes its derivative rows.
+        """
+        process_pending()
+        self.car.delete()
+        self.assertFalse(ImageDerivative.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageContentHashTest(TestCase):
+    """
+    Tests for content-hash tracking and deduplication of car images.
+    """
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            fuel_type="petrol",
+            transmission="automatic",
+            engine_volume=1.8,
+            price=20000,
+            mileage=0,
+            main_image=make_image(),
+        )
+        process_pending()
+
+    def test_processed_hash_and_dimensions_are_stored(self):
+        """
+        Ready derivatives record the source hash and rendered size.
+        """
+        derivative = self.car.derivatives.get(field_name="main_image", variant="detail.jpeg")
+        self.assertEqual(len(derivative.source_hash), 64)
+        self.assertEqual((derivative.width, derivative.height), (1000, 750))
+
+    def test_save_without_new_upload_does_not_hash(self):
+        """
+        A plain save never reads the image bytes.
+        """
+        with patch("cars.images.file_hash") as file_hash:
+            self.car.price = 21000
+            self.car.save()
+        file_hash.assert_not_called()
+
+    def test_identical_reupload_is_not_rerendered(self):
+        """
+        Uploading the same bytes again keeps the ready derivative.
+        """
+        before = self.car.derivatives.get(field_name="main_image", variant="detail.jpeg")
+        self.car.main_image = make_image("same.jpg")
+        self.car.save()
+
+        after = self.car.derivatives.get(field_name="main_image", variant="detail.jpeg")
+        self.assertEqual(after.status, ImageDerivative.READY)
+        self.assertEqual(after.file.name, before.file.name)
+        self.assertEqual(after.source_name, self.car.main_image.name)
+
+    def test_changed_bytes_are_requeued(self):
+        """
+        Uploading different bytes queues the derivative again.
+        """
+        self.car.main_image = make_image("other.jpg", color=(0, 0, 255))
+        self.car.save()
+        derivative = self.car.derivatives.get(field_name="main_image", variant="detail.jpeg")
+        self.assertEqual(derivative.status, ImageDerivative.PENDING)
+
+    def test_identical_gallery_uploads_share_one_file(self):
+        """
+        Identical CarImage uploads are stored once on disk.
+        """
+        first = CarImage.objects.create(car=self.car, image=make_image("gallery.jpg"))
+        second = CarImage.objects.create(car=self.car, image=make_image("gallery.jpg"))
+
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(second.derivatives.get(variant="card.webp").status, ImageDerivative.READY)
+
+        second.delete()
+        self.assertTrue(default_storage.exists(first.image.name))
+        self.assertTrue(default_storage.exists(first.derivatives.get(variant="card.webp").file.name))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImagePlaceholderTest(TestCase):
+    """
+    Tests for the inline placeholders stored on Car and CarImage.
+    """
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            fuel_type="petrol",
+            transmission="automatic",
+            engine_volume=1.8,
+            price=20000,
+            mileage=0,
+            main_image=make_image(color=(10, 200, 40)),
+        )
+
+    def test_worker_stores_placeholder_and_dominant_color(self):
+        """
+        Processing main_image stores a tiny WebP data URI and its colour.
+        """
+        self.assertEqual(self.car.placeholder, "")
+        process_pending()
+        self.car.refresh_from_db()
+        self.assertTrue(self.car.placeholder.startswith("data:image/webp;base64,"))
+        self.assertLess(len(self.car.placeholder), 2000)
+        red, green, blue = (int(self.car.dominant_color[i:i + 2], 16) for i in (1, 3, 5))
+        self.assertGreater(green, red + 100)
+        self.assertGreater(green, blue + 100)
+
+    def test_gallery_image_gets_its_own_placeholder(self):
+        """
+        CarImage rows store a placeholder of their image.
+        """
+        car_image = CarImage.objects.create(car=self.car, image=make_image("g.jpg", color=(0, 0, 250)))
+        process_pending()
+        car_image.refresh_from_db()
+        self.assertEqual(car_image.dominant_color[5:], "fa")
+
+    def test_identical_upload_copies_placeholder(self):
+        """
+        A duplicate upload reuses the placeholder without another render.
+        """
+        process_pending()
+        self.car.refresh_from_db()
+        other = Car.objects.create(
+            fuel_type="petrol",
+            transmission="automatic",
+            engine_volume=1.8,
+            price=20000,
+            mileage=0,
+            main_image=make_image("copy.jpg", color=(10, 200, 40)),
+        )
+        self.assertEqual(other.placeholder, self.car.placeholder)
+        self.assertFalse(other.derivatives.exclude(status=ImageDerivative.READY).exists())
+
+    def test_cleared_image_clears_placeholder(self):
+        """
+        Removing main_image also removes its placeholder.
+        """
+        process_pending()
+        self.car.refresh_from_db()
+        self.car.main_image = None
+        self.car.save()
+        self.car.refresh_from_db()
+        self.assertEqual((self.car.placeholder, self.car.dominant_color), ("", ""))
@@ -0,0 +1,60 @@
+from django.test import SimpleTestCase
+
+from cars.management.commands._synthetic import random_vectors
+from cars.recommendation import feature_matrix, similarity
+
+
+def top_neighbours(car_id, vectors, k):
+    """
+    The k cars most similar to car_id by similarity(), best first, ties to
+    the higher id, scored one pair at a time.
+    """
+    scored = sorted(
+        ((similarity(vectors[car_id], other), other_id) for other_id, other in vectors.items() if other_id != car_id),
+        reverse=True,
+    )
+    return [(other_id, score) for score, other_id in scored[:k]]
+
+
+class RecommendationEngineTest(SimpleTestCase):
+    """
+    The NumPy engine must rank exactly like similarity() scored pair by pair.
+    """
+
+    def setUp(self):
+        self.vectors = random_vectors(300, seed=3)
+        # Missing values and exact ties
+        self.vectors[5].update(price=None, model_year=None, fuel_type=None)
+        self.vectors[301] = dict(self.vectors[7])
+        self.vectors[302] = dict(self.vectors[7])
+
+    def assert_same_as_python(self, matrix, vectors):
+        for car_id, neighbours in matrix.top_neighbours(list(vectors), 6).items():
+            expected = top_neighbours(car_id, vectors, 6)
+            self.assertEqual([other for other, _ in neighbours], [other for other, _ in expected])
+            for (_, score), (_, expected_score) in zip(neighbours, expected):
+                self.assertAlmostEqual(score, expected_score, places=9)
+
+    def test_top_neighbours_match_python(self):
+        """
+        Same neighbours, order and scores, ties going to the higher id.
+        """
+        self.assert_same_as_python(feature_matrix(self.vectors), self.vectors)
+        self.assertEqual(feature_matrix(self.vectors).top_neighbours([301], 2)[301][0][0], 302)
+
+    def test_scores_match_similarity(self):
+        """
+        scores_by_id() is similarity() against every other car.
+        """
+        scores = feature_matrix(self.vectors).scores_by_id([5])[5]
+        self.assertNotIn(5, scores)
+        for other_id in (1, 2, 300):
+            self.assertAlmostEqual(scores[other_id], similarity(self.vectors[5], self.vectors[other_id]), places=9)
+
+    def test_fewer_cars_than_k(self):
+        """
+        A tiny catalogue returns every other car, and a single car none.
+        """
+        vectors = {car_id: self.vectors[car_id] for car_id in (1, 2, 3)}
+        self.assertEqual(len(feature_matrix(vectors).top_neighbours([1], 6)[1]), 2)
+        self.assertEqual(feature_matrix({1: self.vectors[1]}).top_neighbours([1], 6), {1: []})
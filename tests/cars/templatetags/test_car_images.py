@@ -0,0 +1,111 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+
+from cars.images import process_pending
+from cars.models import Car, CarImage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name="car.jpg"):
+    buffer = BytesIO()
+    Image.new("RGB", (1200, 900), (10, 120, 200)).save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PictureTagTest(TestCase):
+    """
+    Tests for the responsive image template tags.
+    """
+
+    template = Template(
+        '{% load car_images %}'
+        '{% picture car.main_image "thumb card" sizes="50vw" class="card-img-top" alt="Car" data_slide_to=1 %}'
+    )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            fuel_type="petrol",
+            transmission="automatic",
+            engine_volume=1.6,
+            price=15000,
+            mileage=1000,
+            main_image=make_image(),
+        )
+
+    def render(self):
+        car = Car.objects.prefetch_related("derivatives").get(pk=self.car.pk)
+        return self.template.render(Context({"car": car}))
+
+    def test_pending_image_falls_back_to_original(self):
+        """
+        Before the worker runs the tag renders a plain <img> of the original.
+        """
+        html = self.render()
+        self.assertNotIn("<picture>", html)
+        self.assertIn(f'src="{self.car.main_image.url}"', html)
+        self.assertIn('data-slide-to="1"', html)
+
+    def test_ready_image_renders_picture_with_srcsets(self):
+        """
+        Ready derivatives produce a WebP <source> and a JPEG fallback srcset.
+        """
+        process_pending()
+        html = self.render()
+        self.assertIn("<picture>", html)
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(".webp 200w", html)
+        self.assertIn(".jpg 480w", html)
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn('class="card-img-top"', html)
+        self.assertNotIn("1000w", html)
+
+    def test_placeholder_is_painted_inline(self):
+        """
+        The stored placeholder becomes the <img> background, with no extra request.
+        """
+        process_pending()
+        html = self.render()
+        self.assertIn("url(&#x27;data:image/webp;base64,", html)
+
+    def test_partials_load_the_first_images_eagerly(self):
+        """
+        Cards are lazy unless the page marks them as above the fold; the
+        first carousel thumbnail is eager and every thumbnail keeps its number.
+        """
+        CarImage.objects.create(car=self.car, image=make_image("gallery.jpg"))
+        car = Car.objects.get(pk=self.car.pk)
+
+        self.assertIn('loading="lazy"', render_to_string("partials/cars.html", {"car": car}))
+        card = render_to_string("partials/cars.html", {"car": car, "image_loading": "eager"})
+        self.assertIn('loading="eager"', card)
+
+        html = render_to_string("partials/car_details/carousel.html", {"car": car, "car_images": car.images.all()})
+        thumbnails = html.split('alt="Car Thumbnail ')[1:]
+        self.assertEqual([thumbnail[:1] for thumbnail in thumbnails], ["0", "1"])
+        self.assertIn('loading="eager"', thumbnails[0])
+        self.assertIn('loading="lazy"', thumbnails[1])
+
+    def test_variant_url_filter(self):
+        """
+        variant_url returns the derivative once it is ready.
+        """
+        process_pending()
+        car = Car.objects.prefetch_related("derivatives").get(pk=self.car.pk)
+        html = Template('{% load car_images %}{{ car.main_image|variant_url:"thumb.jpeg" }}').render(
+            Context({"car": car})
+        )
+        self.assertIn("derivatives/thumb/", html)
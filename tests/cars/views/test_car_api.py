@@ -0,0 +1,101 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from cars.models import Brand, Car, CarModel, Year
+
+
+class CarListAPITest(TestCase):
+    """
+    Tests for the read-only listing API (cars/api.py).
+    """
+
+    def setUp(self):
+        self.hyundai = Brand.objects.create(name="Hyundai")
+        self.kia = Brand.objects.create(name="Kia")
+        self.tucson = CarModel.objects.create(name="Tucson", brand=self.hyundai)
+        self.rio = CarModel.objects.create(name="Rio", brand=self.kia)
+        self.year = Year.objects.create(year=2020)
+        self.cars = [self.create_car(self.tucson, price=20000 + i) for i in range(3)]
+        self.rio_car = self.create_car(self.rio, price=9000, car_title="Kia Rio 1.4")
+        self.url = reverse("api_car_list")
+
+    def create_car(self, model, **fields):
+        return Car.objects.create(
+            brand=model.brand, model=model, year=self.year, fuel_type="petrol", transmission="automatic",
+            engine_volume=1.4, mileage=1000, main_image="cars/placeholder.jpg", **fields,
+        )
+
+    def test_home_filters_and_sparse_fields(self):
+        response = self.client.get(self.url, {"brand": self.kia.pk, "fields": "id,title,brand,price"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            [{
+                "id": self.rio_car.pk, "title": "Kia Rio 1.4",
+                "brand": {"id": self.kia.pk, "name": "Kia"}, "price": "9000.00",
+            }],
+        )
+
+    def test_every_field_by_default(self):
+        result = self.client.get(self.url).json()["results"][0]
+        self.assertEqual(result["url"], f"http://testserver{reverse('car_detail', args=[self.rio_car.slug])}")
+        self.assertEqual(result["main_image"], "http://testserver/media/cars/placeholder.jpg")
+        self.assertEqual(result["model"], {"id": self.rio.pk, "name": "Rio"})
+        self.assertEqual(result["year"], 2020)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.url, {"fields": "id,owner"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"fields": ["Unknown field: owner"]})
+
+    def test_cursor_pages(self):
+        response = self.client.get(self.url, {"fields": "id", "page_size": 3}).json()
+        self.assertEqual(
+            [row["id"] for row in response["results"]], [self.rio_car.pk, self.cars[2].pk, self.cars[1].pk]
+        )
+        self.assertIsNone(response["previous"])
+
+        response = self.client.get(response["next"]).json()
+        self.assertEqual([row["id"] for row in response["results"]], [self.cars[0].pk])
+        self.assertIsNone(response["next"])
+        self.assertIsNotNone(response["previous"])
+
+        self.assertEqual(self.client.get(self.url, {"cursor": "garbage"}).status_code, 404)
+
+    def test_page_costs_two_queries(self):
+        """
+        One aggregate for the ETag and one joined select for the rows, once
+        the brand/model version is cached.
+        """
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"fields": "id,brand,model"})
+        self.assertEqual(len(response.json()["results"]), 4)
+
+    def test_polling_clients_get_304s(self):
+        response = self.client.get(self.url, {"fields": "id"})
+        etag = response["ETag"]
+        self.assertFalse(response.has_header("Last-Modified"))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"fields": "id"}, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        # Another query string is another response
+        response = self.client.get(self.url, {"fields": "id,price"}, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+        self.cars[0].delete()
+        response = self.client.get(self.url, {"fields": "id"}, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_brand_renames_change_the_etag(self):
+        """
+        Renaming a brand changes the embedded names but no car.
+        """
+        etag = self.client.get(self.url, {"fields": "id,brand"})["ETag"]
+        self.kia.name = "KIA"
+        self.kia.save()
+        response = self.client.get(self.url, {"fields": "id,brand"}, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["brand"]["name"], "KIA")
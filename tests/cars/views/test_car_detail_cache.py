@@ -0,0 +1,131 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from cars.models import Brand, Car, CarFeature, CarImage, CarModel, ChangedPart, PaintedPart, Year
+from cars.page_cache import get_detail, page_cache
+from cars.recommendation import process_refresh_queue
+
+
+class CarDetailCacheTest(TestCase):
+    """
+    Tests for the cached detail page body and its signal-driven invalidation.
+    """
+
+    def setUp(self):
+        page_cache().clear()
+        brand = Brand.objects.create(name="Kia")
+        self.car = Car.objects.create(
+            brand=brand,
+            model=CarModel.objects.create(name="Sportage", brand=brand),
+            year=Year.objects.create(year=2022),
+            fuel_type="diesel",
+            transmission="automatic",
+            engine_volume=2.0,
+            price=25000,
+            total_price=28000,
+            mileage=10000,
+            main_image="cars/placeholder.jpg",
+        )
+        self.url = reverse("car_detail", args=[self.car.slug])
+        self.other = Car.objects.create(
+            brand=brand,
+            model=self.car.model,
+            year=self.car.year,
+            fuel_type="diesel",
+            transmission="automatic",
+            engine_volume=2.0,
+            price=24000,
+            total_price=27000,
+            mileage=12000,
+            main_image="cars/placeholder.jpg",
+        )
+        process_refresh_queue()
+
+    def get_page(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def assert_cached(self):
+        self.car.refresh_from_db()
+        self.assertIsNotNone(get_detail(self.car))
+
+    def assert_invalidated(self):
+        self.car.refresh_from_db()
+        self.assertIsNone(get_detail(self.car))
+
+    def test_second_hit_skips_the_related_queries(self):
+        """
+        A cached page only loads the car and the recommendation cards.
+        """
+        self.get_page()
+        self.assert_cached()
+        # car, recommended cards, their derivatives, the visitor's session
+        # (a reload of the same car does not write the session)
+        with self.assertNumQueries(4):
+            self.get_page()
+
+    def test_car_edit_invalidates(self):
+        """
+        Saving the car re-renders its page.
+        """
+        self.get_page()
+        self.car.vin = "KNAPM81ABCD123456"
+        self.car.save()
+        self.assert_invalidated()
+        self.assertIn("KNAPM81ABCD123456", self.get_page())
+
+    def test_gallery_image_invalidates(self):
+        """
+        Adding and deleting a gallery image re-renders the page.
+        """
+        self.get_page()
+        image = CarImage.objects.create(car=self.car, image="cars/gallery/new.jpg")
+        self.assert_invalidated()
+        self.assertIn("cars/gallery/new.jpg", self.get_page())
+
+        image.delete()
+        self.assert_invalidated()
+        self.assertNotIn("cars/gallery/new.jpg", self.get_page())
+
+    def test_parts_invalidate(self):
+        """
+        Painted and changed parts re-render the page.
+        """
+        self.get_page()
+        PaintedPart.objects.create(car=self.car, name="Hood")
+        self.assert_invalidated()
+        self.assertIn("Hood", self.get_page())
+
+        ChangedPart.objects.create(car=self.car, name="Front Bumper")
+        self.assert_invalidated()
+        self.assertIn("Front Bumper", self.get_page())
+
+    def test_features_invalidate(self):
+        """
+        Adding, renaming and removing a feature re-render the page.
+        """
+        feature = CarFeature.objects.create(name="Cruise Control")
+        self.get_page()
+        self.car.features.add(feature)
+        self.assert_invalidated()
+        self.assertIn("Cruise Control", self.get_page())
+
+        feature.name = "Adaptive Cruise Control"
+        feature.save()
+        self.assertIn("Adaptive Cruise Control", self.get_page())
+
+        feature.cars.clear()
+        self.assert_invalidated()
+        self.assertNotIn("Cruise Control", self.get_page())
+
+    def test_recommendation_hearts_are_not_cached(self):
+        """
+        Favorite hearts in recommended cards follow the visitor's session.
+        """
+        hearts = self.get_page().count("bi-heart-fill")
+
+        session = self.client.session
+        session["favorites"] = [str(self.other.id)]
+        session.save()
+        self.assertEqual(self.get_page().count("bi-heart-fill"), hearts + 1)
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from cars.page_cache import page_cache
+from cars.models import Brand, Car, CarFeature, CarImage, CarModel, ChangedPart, PaintedPart, Year
+
+
+class CarDetailQueryBudgetTest(TestCase):
+    """
+    The detail page must cost a fixed number of queries, however many
+    images, features and parts the car has.
+    """
+
+    def setUp(self):
+        page_cache().clear()
+        brand = Brand.objects.create(name="Hyundai")
+        self.car = Car.objects.create(
+            brand=brand,
+            model=CarModel.objects.create(name="Elantra", brand=brand),
+            year=Year.objects.create(year=2020),
+            fuel_type="petrol",
+            transmission="automatic",
+            engine_volume=2.0,
+            price=15000,
+            total_price=17000,
+            mileage=40000,
+            main_image="cars/placeholder.jpg",
+        )
+
+    def add_details(self, count):
+        offset = self.car.images.count()
+        for i in range(offset, offset + count):
+            CarImage.objects.create(car=self.car, image=f"cars/gallery/{i}.jpg")
+            PaintedPart.objects.create(car=self.car, name=f"Painted {i}")
+            ChangedPart.objects.create(car=self.car, name=f"Changed {i}")
+            self.car.features.add(CarFeature.objects.create(name=f"Feature {i}"))
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("car_detail", args=[self.car.slug]))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_images_and_parts(self):
+        """
+        A car with two of everything and one with twenty cost the same.
+        """
+        # The first visit creates the visitor's session
+        self.count_queries()
+        self.add_details(2)
+        few = self.count_queries()
+
+        self.add_details(18)
+        many = self.count_queries()
+
+        self.assertEqual(few, many)
+
+    def test_seventeenth_image_comes_from_prefetched_images(self):
+        """
+        The overlay image is the 17th gallery image, without its own query.
+        """
+        self.add_details(17)
+        response = self.client.get(reverse("car_detail", args=[self.car.slug]))
+        self.assertEqual(response.context["seventeenth_image"], self.car.images.order_by("pk")[16])
+        self.assertEqual(len(response.context["changed_parts"]), 17)
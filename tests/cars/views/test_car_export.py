@@ -0,0 +1,91 @@
+import csv
+import gzip
+import io
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from cars.export import COLUMNS, export_rows
+from cars.models import Brand, Car, CarFeature, CarImage, CarModel, Year
+
+
+@override_settings(CAR_EXPORT_TOKEN="partner-secret")
+class CarExportTest(TestCase):
+    """
+    Tests for the streaming catalogue export (cars/export.py).
+    """
+
+    def setUp(self):
+        self.kia = Brand.objects.create(name="Kia")
+        self.hyundai = Brand.objects.create(name="Hyundai")
+        self.rio = CarModel.objects.create(name="Rio", brand=self.kia)
+        self.tucson = CarModel.objects.create(name="Tucson", brand=self.hyundai)
+        self.year = Year.objects.create(year=2020)
+        self.cars = [self.create_car(self.rio, vin=f"KNADN512BL600000{i}") for i in range(3)]
+        self.tucson_car = self.create_car(self.tucson, car_title='Tucson "N Line", 2.0')
+        sunroof = CarFeature.objects.create(name="Sunroof")
+        camera = CarFeature.objects.create(name="Camera")
+        self.cars[0].features.add(sunroof, camera)
+        CarImage.objects.create(car=self.cars[0], image="cars/gallery/rio-1.jpg")
+        CarImage.objects.create(car=self.cars[0], image="cars/gallery/rio-2.jpg")
+        self.auth = {"Authorization": "Token partner-secret"}
+
+    def create_car(self, model, **fields):
+        return Car.objects.create(
+            brand=model.brand, model=model, year=self.year, fuel_type="petrol", transmission="automatic",
+            engine_volume=1.4, price=9000, mileage=1000, main_image="cars/placeholder.jpg", **fields,
+        )
+
+    def export(self, format, headers=None, **params):
+        response = self.client.get(
+            reverse("car_export", args=[format]), params, headers={**self.auth, **(headers or {})}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response
+
+    def test_ndjson_rows(self):
+        response = self.export("ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [car.pk for car in [*self.cars, self.tucson_car]])
+        self.assertEqual(list(rows[0]), list(COLUMNS))
+        self.assertEqual(rows[0]["features"], ["Camera", "Sunroof"])
+        self.assertEqual(
+            rows[0]["images"],
+            ["http://testserver/media/cars/gallery/rio-1.jpg", "http://testserver/media/cars/gallery/rio-2.jpg"],
+        )
+        self.assertEqual(rows[0]["url"], f"http://testserver{reverse('car_detail', args=[self.cars[0].slug])}")
+        self.assertEqual((rows[0]["brand"], rows[0]["price"], rows[1]["features"]), ("Kia", "9000.00", []))
+
+    def test_csv_with_filters_and_gzip(self):
+        response = self.export("csv", headers={"Accept-Encoding": "gzip"}, brand=self.hyundai.pk)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        text = gzip.decompress(b"".join(response.streaming_content)).decode()
+        header, row = csv.reader(io.StringIO(text))
+        self.assertEqual(header, list(COLUMNS))
+        self.assertEqual(dict(zip(header, row))["title"], 'Tucson "N Line", 2.0')
+
+        response = self.export("csv", brand=self.kia.pk)
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0]["features"], "Camera|Sunroof")
+        self.assertEqual(rows[0]["total_price"], "")
+
+    def test_partners_and_staff_only(self):
+        url = reverse("car_export", args=["ndjson"])
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, headers={"Authorization": "Token wrong"}).status_code, 403)
+        self.client.force_login(CustomUser.objects.create_superuser("admin", "admin@example.com", "password123"))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(reverse("car_export", args=["xml"])).status_code, 404)
+
+    def test_chunks_cost_two_prefetch_queries_each(self):
+        """
+        One query streams the cars; each chunk of them gets its images
+        and features in one query each.
+        """
+        with self.assertNumQueries(5):
+            rows = list(export_rows(chunk_size=2))
+        self.assertEqual(len(rows), 4)
@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from cars import suggest
+from cars.models import Brand, Car, CarModel, Year
+
+
+class CarSuggestTest(TestCase):
+    """
+    Tests for the search box typeahead (cars/suggest.py).
+    """
+
+    def setUp(self):
+        cache.clear()
+        suggest._local = (None, None)
+        self.hyundai = Brand.objects.create(name="Hyundai")
+        self.honda = Brand.objects.create(name="Honda")
+        self.tucson = CarModel.objects.create(name="Tucson", brand=self.hyundai)
+        self.civic = CarModel.objects.create(name="Civic", brand=self.honda)
+        self.year = Year.objects.create(year=2020)
+        self.create_car(self.tucson, vin="KMHJ381ABLU123456")
+        self.create_car(self.tucson, vin="KMHJ381ABLU654321")
+        self.create_car(self.civic, vin="SHHFK7H30LU000001")
+
+    def create_car(self, model, **fields):
+        return Car.objects.create(
+            brand=model.brand, model=model, year=self.year, fuel_type="petrol", transmission="automatic",
+            engine_volume=2.0, price=20000, mileage=1000, main_image="cars/placeholder.jpg", **fields,
+        )
+
+    def suggestions(self, query):
+        response = self.client.get(reverse("car_suggest"), {"q": query})
+        return response.json()["suggestions"]
+
+    def test_most_listed_first_with_filter_urls(self):
+        suggestions = self.suggestions("h")
+        self.assertEqual(
+            [(s["kind"], s["label"], s["count"]) for s in suggestions],
+            [
+                ("brand", "Hyundai", 2), ("model", "Hyundai Tucson", 2), ("year", "Hyundai Tucson 2020", 2),
+                ("brand", "Honda", 1), ("model", "Honda Civic", 1), ("year", "Honda Civic 2020", 1),
+            ],
+        )
+        self.assertEqual(suggestions[0]["url"], f"{reverse('home')}?brand={self.hyundai.pk}")
+
+    def test_models_and_years_match_without_the_brand(self):
+        suggestions = self.suggestions("tucson 20")
+        self.assertEqual([s["label"] for s in suggestions], ["Hyundai Tucson 2020"])
+        self.assertEqual(
+            suggestions[0]["url"],
+            f"{reverse('home')}?brand={self.hyundai.pk}&model={self.tucson.pk}&from_year=2020&to_year=2020",
+        )
+        self.assertEqual(
+            [s["label"] for s in self.suggestions("  HYUNDAI   tuc")],
+            ["Hyundai Tucson", "Hyundai Tucson 2020"],
+        )
+
+    def test_vin_prefixes(self):
+        self.assertEqual(
+            [s["label"] for s in self.suggestions("kmhj381")], ["KMHJ381ABLU123456", "KMHJ381ABLU654321"]
+        )
+        self.assertEqual(self.suggestions("km"), [])
+        self.assertEqual(self.suggestions(""), [])
+
+    def test_keystrokes_do_not_query_the_database(self):
+        suggest.suggest("hyu")
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("car_suggest"), {"q": "hyundai t"})
+        self.assertEqual(len(response.json()["suggestions"]), 2)
+        self.assertIn("max-age=", response["Cache-Control"])
+
+    def test_index_follows_catalogue_changes(self):
+        suggest.suggest("hyu")
+        self.create_car(self.civic)
+        self.assertEqual([s["count"] for s in self.suggestions("honda")], [2, 2, 2])
+
+        self.honda.name = "Acura"
+        self.honda.save()
+        self.assertEqual(self.suggestions("honda"), [])
+        self.assertEqual([s["label"] for s in self.suggestions("acura")][0], "Acura")
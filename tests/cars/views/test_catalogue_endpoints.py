@@ -0,0 +1,86 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from cars.models import Brand, CarModel
+from cars.reference import reference_version
+
+
+class CatalogueEndpointsTest(TestCase):
+    """
+    Tests for the cacheable brand -> models endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.kia = Brand.objects.create(name="Kia")
+        self.rio = CarModel.objects.create(name="Rio", brand=self.kia)
+        self.url = reverse("ajax_car_models", args=[self.kia.id])
+
+    def test_models_send_etag_and_cache_control(self):
+        """
+        The ETag follows the catalogue version.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.json(), [{"id": self.rio.id, "name": "Rio"}])
+        self.assertEqual(response["ETag"], f'"{reference_version()}-{self.kia.id}"')
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+    def test_models_revalidation_is_304_without_queries(self):
+        """
+        A matching If-None-Match is answered without the database.
+        """
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+    def test_models_etag_changes_with_the_catalogue(self):
+        """
+        Editing a model makes the old ETag stale.
+        """
+        etag = self.client.get(self.url)["ETag"]
+        CarModel.objects.create(name="Sportage", brand=self.kia)
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_catalogue_redirects_to_current_version(self):
+        """
+        The unversioned and stale URLs point at the current version.
+        """
+        current = reverse("car_catalogue_version", args=[reference_version()])
+        for url in (reverse("car_catalogue"), reverse("car_catalogue_version", args=[1])):
+            response = self.client.get(url)
+            self.assertRedirects(response, current, fetch_redirect_response=False)
+            self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_catalogue_is_precompressed_and_immutable(self):
+        """
+        Gzip-accepting clients get the precompressed bytes; others plain JSON.
+        """
+        version = reference_version()
+        url = reverse("car_catalogue_version", args=[version])
+        expected = {"version": version, "brands": [
+            {"id": self.kia.id, "name": "Kia", "models": [{"id": self.rio.id, "name": "Rio"}]},
+        ]}
+
+        response = self.client.get(url, headers={"accept-encoding": "gzip, br"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.content)), expected)
+        self.assertEqual(response["ETag"], f'"{version}-gzip"')
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.json(), expected)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={"if-none-match": f'"{version}"'})
+        self.assertEqual(response.status_code, 304)
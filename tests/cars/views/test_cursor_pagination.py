@@ -0,0 +1,120 @@
+from urllib.parse import parse_qs
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from cars.models import Brand, Car, CarModel, Year
+from cars.pagination import decode_cursor, encode_cursor
+
+
+class CursorPaginationTest(TestCase):
+    """
+    Tests for the opt-in keyset pagination of the car listings.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.brand = Brand.objects.create(name="Kia")
+        model = CarModel.objects.create(name="Rio", brand=self.brand)
+        year = Year.objects.create(year=2021)
+        self.cars = [
+            Car.objects.create(
+                brand=self.brand,
+                model=model,
+                year=year,
+                fuel_type="petrol",
+                transmission="manual",
+                engine_volume=1.4,
+                price=10000 + i,
+                mileage=1000 * i,
+                main_image="cars/placeholder.jpg",
+            )
+            for i in range(25)
+        ]
+        # Ties on created_at must be broken by id
+        Car.objects.filter(pk__in=[car.pk for car in self.cars[5:15]]).update(created_at=timezone.now())
+
+    def expected_order(self):
+        return list(Car.objects.order_by("-created_at", "-pk").values_list("pk", flat=True))
+
+    def walk(self, url, params=None):
+        params = dict(params or {}, cursor="")
+        pages = []
+        while True:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response)
+            if "next_page_query" not in response.context:
+                return pages
+            params = {key: values[0] for key, values in parse_qs(response.context["next_page_query"]).items()}
+
+    def test_walks_every_car_once_in_order(self):
+        """
+        Following next links visits every car once, newest first.
+        """
+        pages = self.walk(reverse("home"))
+        seen = [car.pk for response in pages for car in response.context["cars"]]
+        self.assertEqual(seen, self.expected_order())
+        self.assertEqual([len(response.context["cars"]) for response in pages], [11, 11, 3])
+
+    def test_previous_link_returns_the_previous_page(self):
+        """
+        The previous link of page 2 shows page 1 again.
+        """
+        first, second, _ = self.walk(reverse("home"))
+        response = self.client.get(reverse("home") + "?" + second.context["previous_page_query"])
+        self.assertEqual(list(response.context["cars"]), list(first.context["cars"]))
+        self.assertNotIn("previous_page_query", first.context)
+
+    def test_links_keep_filters(self):
+        """
+        Cursor links carry the active filters along.
+        """
+        response = self.client.get(reverse("home"), {"brand": self.brand.pk, "cursor": ""})
+        self.assertIn(f"brand={self.brand.pk}", response.context["next_page_query"])
+
+    def test_deep_page_costs_the_same_as_the_first(self):
+        """
+        A deep page is a plain seek query; the count and the sidebar
+        data come from the cache.
+        """
+        *_, third = self.walk(reverse("home"))
+        cursor = parse_qs(third.request["QUERY_STRING"])["cursor"][0]
+        with self.assertNumQueries(2):
+            # cars, derivatives
+            self.client.get(reverse("home"), {"cursor": cursor})
+
+    def test_invalid_cursor_is_404(self):
+        """
+        A tampered cursor is not found rather than a server error.
+        """
+        response = self.client.get(reverse("home"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_round_trip(self):
+        """
+        Cursors decode back to the row's key.
+        """
+        car = Car.objects.get(pk=self.cars[0].pk)
+        self.assertEqual(decode_cursor(encode_cursor(car)), (car.created_at, car.pk, "n"))
+
+    def test_favorites_cursor_pages(self):
+        """
+        Favorites can be walked with cursors too.
+        """
+        session = self.client.session
+        session["favorites"] = [str(car.pk) for car in self.cars[:14]]
+        session.save()
+        pages = self.walk(reverse("favorite-cars"))
+        seen = [car.pk for response in pages for car in response.context["cars"]]
+        self.assertEqual(sorted(seen), sorted(car.pk for car in self.cars[:14]))
+        self.assertEqual(len(pages), 2)
+
+    def test_numbered_pages_stay_the_default(self):
+        """
+        Without ?cursor= the listing keeps its numbered pages.
+        """
+        response = self.client.get(reverse("home"), {"page": 2})
+        self.assertEqual(response.context["page_obj"].number, 2)
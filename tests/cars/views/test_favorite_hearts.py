@@ -0,0 +1,40 @@
+import re
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from cars import context_processors
+from cars.models import Brand, Car, CarModel, Year
+
+
+class FavoriteHeartsTest(TestCase):
+    """
+    The card hearts test membership in one set built per request.
+    """
+
+    def setUp(self):
+        model = CarModel.objects.create(name="Rio", brand=Brand.objects.create(name="Kia"))
+        year = Year.objects.create(year=2020)
+        self.cars = [
+            Car.objects.create(
+                brand=model.brand, model=model, year=year, price=9000 + i, mileage=1000,
+                engine_volume=1.4, main_image="cars/placeholder.jpg",
+            )
+            for i in range(6)
+        ]
+        session = self.client.session
+        # Many favorites, most of them not on the page
+        session["favorites"] = list(range(10_000, 10_300)) + [self.cars[0].pk, self.cars[3].pk]
+        session.save()
+
+    def test_hearts_on_the_home_grid(self):
+        with mock.patch.object(
+            context_processors, "visitor_favorites", wraps=context_processors.visitor_favorites
+        ) as loaded:
+            response = self.client.get(reverse("home"))
+
+        self.assertEqual(loaded.call_count, 1)
+        self.assertIsInstance(response.context["favorite_ids"]._wrapped, frozenset)
+        filled = re.findall(r'bi-heart-fill\s+position-absolute[^"]*"\s+data-car-id="(\d+)"', response.content.decode())
+        self.assertEqual(sorted(map(int, filled)), [self.cars[0].pk, self.cars[3].pk])
@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from cars import reference
+from cars.models import Brand, CarModel
+
+
+class FilterReferenceDataTest(TestCase):
+    """
+    Tests for the cached brands and models of the home filter sidebar.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.kia = Brand.objects.create(name="Kia")
+        self.toyota = Brand.objects.create(name="Toyota")
+        self.rio = CarModel.objects.create(name="Rio", brand=self.kia)
+        self.camry = CarModel.objects.create(name="Camry", brand=self.toyota)
+
+    def test_snapshot_is_served_from_this_process(self):
+        """
+        After the first load neither the database nor the shared copy is read.
+        """
+        reference.reference_data()
+        cache.delete(f"car-reference:{cache.get(reference.VERSION_KEY)}")
+        with self.assertNumQueries(0):
+            self.assertEqual([brand["name"] for brand in reference.brands()], ["Kia", "Toyota"])
+
+    def test_other_processes_reuse_the_shared_copy(self):
+        """
+        A process with an empty local copy loads from the shared cache.
+        """
+        reference.reference_data()
+        reference._local = (None, None)
+        with self.assertNumQueries(0):
+            self.assertEqual(reference.models_for_brand(self.kia.id), [{"id": self.rio.id, "name": "Rio"}])
+
+    def test_edits_replace_the_snapshot(self):
+        """
+        Adding, renaming and deleting brands and models shows up at once.
+        """
+        reference.reference_data()
+        corolla = CarModel.objects.create(name="Corolla", brand=self.toyota)
+        self.assertEqual([m["name"] for m in reference.models_for_brand(self.toyota.id)], ["Camry", "Corolla"])
+
+        self.kia.name = "KIA"
+        self.kia.save()
+        self.assertEqual(reference.brands()[0]["name"], "KIA")
+
+        corolla.delete()
+        self.toyota.delete()
+        self.assertEqual(reference.brands(), [{"id": self.kia.id, "name": "KIA"}])
+        self.assertEqual(reference.models_for_brand(self.toyota.id), [])
+
+    def test_version_follows_the_rows_not_the_process(self):
+        """
+        A restart or another process (empty caches) computes the same
+        version; only a brand or model edit changes it.
+        """
+        version = reference.reference_version()
+        cache.clear()
+        reference._local = (None, None)
+        self.assertEqual(reference.reference_version(), version)
+
+        self.rio.name = "Rio X"
+        self.rio.save()
+        self.assertNotEqual(reference.reference_version(), version)
+
+    def test_home_sends_only_the_selected_brands_models(self):
+        """
+        The template gets the selected brand's models, and none without one.
+        """
+        response = self.client.get(reverse("home"), {"brand": self.kia.id})
+        self.assertEqual(response.context["car_models"], [{"id": self.rio.id, "name": "Rio", "car_count": 0}])
+        self.assertNotContains(response, "Camry")
+
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["car_models"], [])
+
+    def test_models_endpoint(self):
+        """
+        The ajax endpoint answers from the snapshot.
+        """
+        response = self.client.get(reverse("ajax_car_models", args=[self.toyota.id]))
+        self.assertEqual(response.json(), [{"id": self.camry.id, "name": "Camry"}])
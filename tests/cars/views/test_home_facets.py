@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from cars.facets import facet_counts, filter_state
+from cars.models import Brand, Car, CarModel, Year
+
+
+class HomeFacetsTest(TestCase):
+    """
+    Tests for the filter sidebar counts of the home page.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.kia = Brand.objects.create(name="Kia")
+        self.toyota = Brand.objects.create(name="Toyota")
+        self.rio = CarModel.objects.create(name="Rio", brand=self.kia)
+        self.camry = CarModel.objects.create(name="Camry", brand=self.toyota)
+        self.create_car(self.rio, 2016, category="auction")
+        self.create_car(self.rio, 2019, fuel_type="diesel")
+        self.create_car(self.camry, 2021, transmission="automatic")
+
+    def create_car(self, model, year, **fields):
+        return Car.objects.create(
+            brand=model.brand,
+            model=model,
+            year=Year.objects.create(year=year),
+            engine_volume=1.6,
+            price=12000,
+            mileage=50000,
+            **{"fuel_type": "petrol", "transmission": "manual", **fields},
+        )
+
+    def test_counts_without_filters(self):
+        """
+        Every facet counts every car.
+        """
+        counts = facet_counts({})
+        self.assertEqual(counts["total"], 3)
+        self.assertEqual(counts["category"], {"auction": 1, "korea_stock": 2})
+        self.assertEqual(counts["brand"], {self.kia.id: 2, self.toyota.id: 1})
+        self.assertEqual(counts["model"], {self.rio.id: 2, self.camry.id: 1})
+        self.assertEqual((counts["min_year"], counts["max_year"]), (2016, 2021))
+
+    def test_a_facet_ignores_its_own_filter(self):
+        """
+        With Kia selected the brands keep their counts and the rest narrow.
+        """
+        counts = facet_counts(filter_state({"brand": str(self.kia.id), "from_year": "2018"}))
+        self.assertEqual(counts["total"], 1)
+        self.assertEqual(counts["brand"], {self.kia.id: 1, self.toyota.id: 1})
+        self.assertEqual(counts["model"], {self.rio.id: 1})
+        self.assertEqual(counts["category"], {"korea_stock": 1})
+
+    def test_counts_match_the_listing(self):
+        """
+        The total equals the number of cars the home page lists.
+        """
+        params = {"category": "korea_stock", "to_year": "2020"}
+        response = self.client.get(reverse("home"), params)
+        self.assertEqual(response.context["facets"]["total"], len(response.context["cars"]))
+        self.assertEqual(len(response.context["cars"]), 1)
+
+    def test_cached_until_a_car_changes(self):
+        """
+        Repeated requests cost no facet queries; a new car shows up at once.
+        """
+        facet_counts({})
+        with self.assertNumQueries(0):
+            facet_counts({})
+
+        self.create_car(self.camry, 2022)
+        self.assertEqual(facet_counts({})["brand"][self.toyota.id], 2)
+
+    def test_malformed_filters_are_ignored(self):
+        """
+        Blank and non-numeric values do not filter.
+        """
+        self.assertEqual(filter_state({"brand": "abc", "model": "", "category": "auction"}), {"category": "auction"})
+        response = self.client.get(reverse("home"), {"from_year": "x"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["cars"]), 3)
+
+    def test_sidebar_shows_counts(self):
+        """
+        Brand and model options and category labels carry their counts.
+        """
+        response = self.client.get(reverse("home"), {"brand": self.kia.id, "from_year": "2018"})
+        self.assertEqual(response.context["car_models"], [{"id": self.rio.id, "name": "Rio", "car_count": 1}])
+        self.assertContains(response, "${model.name} (${model.car_count})")
+
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, "Kia (2)")
+        self.assertContains(response, "Toyota (1)")
+        self.assertContains(response, "Hərrac maşınları <span class=\"text-muted\">(1)</span>")
@@ -0,0 +1,107 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from cars.models import Brand, Car, CarModel, Year
+from cars.recommendation import recommend_for_car
+
+
+class ListingQueryBudgetTest(TestCase):
+    """
+    The listing pages must cost a fixed number of queries, however many
+    cards they render.
+    """
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Kia")
+        self.model = CarModel.objects.create(name="Rio", brand=self.brand)
+        self.year = Year.objects.create(year=2021)
+
+    def create_cars(self, count):
+        return [
+            Car.objects.create(
+                brand=self.brand,
+                model=self.model,
+                year=self.year,
+                fuel_type="petrol",
+                transmission="manual",
+                engine_volume=1.4,
+                price=10000 + i,
+                total_price=12000 + i,
+                mileage=1000 * i,
+                main_image="cars/placeholder.jpg",
+            )
+            for i in range(count)
+        ]
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def set_favorites(self, cars):
+        session = self.client.session
+        session["favorites"] = [str(car.id) for car in cars]
+        session.save()
+
+    def test_home_query_count_does_not_grow_with_page_size(self):
+        """
+        Two cards and a full page of eleven cost the same.
+        """
+        # Brands and models stay cached; new cars only refresh the counts
+        self.count_queries(reverse("home"))
+        self.create_cars(2)
+        small_page = self.count_queries(reverse("home"))
+
+        self.create_cars(9)
+        full_page = self.count_queries(reverse("home"))
+
+        self.assertEqual(small_page, full_page)
+
+    def test_home_query_budget(self):
+        """
+        Count, facet table, brands, models, cars and their derivatives;
+        once the sidebar data is cached only count, cars and derivatives.
+        """
+        self.create_cars(11)
+        with self.assertNumQueries(6):
+            self.client.get(reverse("home"))
+        with self.assertNumQueries(3):
+            self.client.get(reverse("home"))
+
+    def test_favorites_query_count_does_not_grow_with_favorites(self):
+        """
+        The favorites page costs the same for 2 and 12 favorites.
+        """
+        # Two cars stay unfavorited, so both pages have recommendations
+        cars = self.create_cars(14)
+        self.set_favorites(cars[:2])
+        few = self.count_queries(reverse("favorite-cars"))
+
+        self.set_favorites(cars[:12])
+        many = self.count_queries(reverse("favorite-cars"))
+
+        self.assertEqual(few, many)
+
+    def test_favorites_page_fetches_only_its_cars(self):
+        """
+        Page 2 loads its own cars, in favorite order, without a CASE per favorite.
+        """
+        cars = self.create_cars(14)
+        self.set_favorites(cars)  # oldest first in this stored format
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("favorite-cars"), {"page": 2})
+        self.assertEqual(list(response.context["cars"]), [cars[1], cars[0]])
+        self.assertFalse(any("CASE" in query["sql"] for query in queries))
+
+    def test_recommendations_load_listing_columns_only(self):
+        """
+        Recommended cars render their cards without extra queries.
+        """
+        cars = self.create_cars(4)
+        recommended = list(recommend_for_car(cars[0].id))
+        with self.assertNumQueries(0):
+            for car in recommended:
+                (car.brand.name, car.model.name, str(car.year), car.main_image.name, car.placeholder)
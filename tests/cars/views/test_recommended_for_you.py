@@ -0,0 +1,114 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from cars.history import record_view
+from cars.models import Brand, Car, CarModel, Year
+from cars.recommendation import (
+    OLD_PROFILE_SESSION_KEY, process_refresh_queue, profile_similarity, profile_summary,
+    recommend_for_general, session_profile, session_vector, similarity,
+)
+
+
+class RecommendedForYouTest(TestCase):
+    """
+    Tests for the session profile behind "recommended for you".
+    """
+
+    def setUp(self):
+        kia = Brand.objects.create(name="Kia")
+        self.rio = CarModel.objects.create(name="Rio", brand=kia)
+        self.camry = CarModel.objects.create(name="Camry", brand=Brand.objects.create(name="Toyota"))
+        self.viewed = self.create_car(self.rio, 2019, 12000)
+        self.similar = self.create_car(self.rio, 2019, 12400)
+        self.other = self.create_car(self.camry, 2012, 30000, fuel_type="diesel")
+        process_refresh_queue()
+        self.session = import_module(settings.SESSION_ENGINE).SessionStore()
+
+    def create_car(self, model, year, total_price, **fields):
+        return Car.objects.create(
+            brand=model.brand,
+            model=model,
+            year=Year.objects.create(year=year),
+            total_price=total_price,
+            **{"fuel_type": "petrol", "transmission": "manual", "engine_volume": 1.6,
+               "price": total_price, "mileage": 50000, "main_image": "cars/placeholder.jpg", **fields},
+        )
+
+    def view(self, car):
+        record_view(self.session, car.pk)
+
+    def test_session_keeps_only_car_ids(self):
+        """
+        Detail views store the viewed ids, not the cars' features, and an
+        older session's features are dropped.
+        """
+        session = self.client.session
+        session[OLD_PROFILE_SESSION_KEY] = {str(self.viewed.pk): session_vector(self.viewed)}
+        session.save()
+        for car in (self.viewed, self.other):
+            self.client.get(reverse("car_detail", args=[car.slug]))
+        self.client.get(reverse("favorite-cars"))
+        self.assertEqual(dict(self.client.session), {"viewed": [self.other.pk, self.viewed.pk]})
+
+    def test_profile_is_loaded_with_one_query(self):
+        """
+        The profile's features come from the database; deleted cars drop out.
+        """
+        self.view(self.viewed)
+        self.session["favorites"] = [self.other.pk, self.similar.pk]
+        self.similar.delete()
+        with self.assertNumQueries(1):
+            profile = session_profile(self.session)
+        self.assertEqual(set(profile["vectors"]), {self.viewed.pk, self.other.pk})
+        self.assertEqual(profile["vectors"][self.other.pk], session_vector(self.other))
+
+    def test_one_car_profile_scores_like_similarity(self):
+        """
+        A profile of a single car ranks exactly like the detail page.
+        """
+        self.view(self.viewed)
+        means, shares = profile_summary(session_profile(self.session))
+        for car in (self.similar, self.other):
+            self.assertAlmostEqual(
+                profile_similarity(session_vector(car), means, shares),
+                similarity(session_vector(car), session_vector(self.viewed)),
+            )
+
+    def test_ranked_by_profile_without_seen_cars(self):
+        """
+        A favorite outweighs a view; seen cars never show.
+        """
+        self.create_car(self.camry, 2013, 31000, fuel_type="diesel")
+        self.view(self.other)
+        self.session["favorites"] = [self.viewed.pk]
+        recommended = recommend_for_general(self.session)
+        self.assertEqual(recommended[0], self.similar)
+        self.assertFalse({self.viewed, self.other} & set(recommended))
+
+    def test_profile_costs_three_queries(self):
+        """
+        The profile's cars and the candidates with their features, the
+        candidates' cards and the cards' derivatives.
+        """
+        self.view(self.viewed)
+        with self.assertNumQueries(3):
+            recommend_for_general(self.session)
+
+    def test_empty_profile(self):
+        """
+        A new visitor gets nothing and costs nothing.
+        """
+        with self.assertNumQueries(0):
+            self.assertEqual(recommend_for_general(self.session), [])
+
+    def test_favorites_page_shows_recommendations(self):
+        """
+        The favorites page lists cars like the visitor's favorites.
+        """
+        self.client.post(reverse("toggle_favorite"), {"car_id": self.viewed.pk})
+        response = self.client.get(reverse("favorite-cars"))
+        self.assertEqual(response.context["recommended_for_you"][0], self.similar)
+        self.assertContains(response, "Sizin üçün tövsiyələr")
@@ -0,0 +1,110 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from cars.models import Brand, Car, CarFeature, CarModel, CarSearchDocument, Year
+from cars.search import search_ids
+
+
+class CarSearchTest(TestCase):
+    """
+    Tests for the catalogue search (cars/search.py).
+    """
+
+    def setUp(self):
+        self.hyundai = Brand.objects.create(name="Hyundai")
+        self.tucson = CarModel.objects.create(name="Tucson", brand=self.hyundai)
+        self.sonata = CarModel.objects.create(name="Sonata", brand=self.hyundai)
+        self.year = Year.objects.create(year=2020)
+        self.tucson_car = self.create_car(self.tucson, vin="KMHJ381ABLU123456", car_title="Tucson 2.0 Premium")
+        self.sonata_car = self.create_car(
+            self.sonata, vin="KMHE341CBLA654321", description="Tucson owners love this sonata"
+        )
+
+    def create_car(self, model, **fields):
+        return Car.objects.create(
+            brand=model.brand, model=model, year=self.year, fuel_type="petrol", transmission="automatic",
+            engine_volume=2.0, price=20000, mileage=1000, main_image="cars/placeholder.jpg", **fields,
+        )
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(search_ids("tucson"), [self.tucson_car.pk, self.sonata_car.pk])
+
+    def test_every_word_matches_as_a_prefix(self):
+        self.assertEqual(search_ids("hyun tuc 2.0"), [self.tucson_car.pk])
+        self.assertEqual(search_ids("kmhe34"), [self.sonata_car.pk])
+        self.assertEqual(search_ids("tucson opel"), [])
+        self.assertEqual(search_ids("  ... "), [])
+
+    def test_misspelt_words_find_the_closest_title_words(self):
+        self.assertEqual(search_ids("sonatta"), [self.sonata_car.pk])
+
+    def test_documents_follow_their_sources(self):
+        """
+        Car, feature, brand and model edits rewrite the documents.
+        """
+        sunroof = CarFeature.objects.create(name="Sunroof")
+        self.sonata_car.features.add(sunroof)
+        self.assertEqual(search_ids("sunroof"), [self.sonata_car.pk])
+
+        sunroof.name = "Panorama"
+        sunroof.save()
+        self.assertEqual(search_ids("panorama"), [self.sonata_car.pk])
+        sunroof.delete()
+        self.assertEqual(search_ids("panorama"), [])
+
+        self.hyundai.name = "Genesis"
+        self.hyundai.save()
+        self.assertEqual(set(search_ids("genesis")), {self.sonata_car.pk, self.tucson_car.pk})
+
+        self.tucson_car.car_title = "Family crossover"
+        self.tucson_car.save()
+        self.assertEqual(search_ids("crossover"), [self.tucson_car.pk])
+
+        car_id = self.tucson_car.pk
+        self.tucson_car.delete()
+        self.assertFalse(CarSearchDocument.objects.filter(car_id=car_id).exists())
+        self.assertEqual(search_ids("crossover"), [])
+
+    def test_saves_that_keep_the_indexed_fields_keep_the_document(self):
+        """
+        A new car is indexed once, and so is an edit of its title; a price
+        edit writes nothing.
+        """
+        with patch("cars.signals.index_cars") as index_cars:
+            car = self.create_car(self.tucson)
+        index_cars.assert_called_once_with(car.pk)
+
+        with patch("cars.signals.index_cars") as index_cars:
+            car.price = 18000
+            car.save()
+            index_cars.assert_not_called()
+            car.car_title = "Tucson N Line"
+            car.save()
+        index_cars.assert_called_once_with(car.pk)
+
+    def test_home_search_with_filters(self):
+        response = self.client.get(reverse("home"), {"q": "tucson"})
+        self.assertEqual(list(response.context["cars"]), [self.tucson_car, self.sonata_car])
+        self.assertContains(response, 'value="tucson"')
+
+        response = self.client.get(reverse("home"), {"q": "tucson", "model": self.sonata.pk})
+        self.assertEqual(list(response.context["cars"]), [self.sonata_car])
+
+    def test_home_search_pages_keep_the_query(self):
+        for _ in range(11):
+            self.create_car(self.sonata)
+        response = self.client.get(reverse("home"), {"q": "sonata"})
+        self.assertEqual(len(response.context["cars"]), 11)
+        self.assertContains(response, "?q=sonata&amp;page=2")
+
+        response = self.client.get(reverse("home"), {"q": "sonata", "page": 2})
+        self.assertEqual(len(response.context["cars"]), 1)
+
+    def test_admin_search(self):
+        admin = CustomUser.objects.create_superuser("admin", "admin@example.com", "password123")
+        self.client.force_login(admin)
+        response = self.client.get(reverse("admin:cars_car_changelist"), {"q": "kmhj"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.tucson_car])
@@ -0,0 +1,98 @@
+import re
+from importlib import import_module
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from cars.history import (
+    FAVORITES_KEY, VIEWED_KEY, favorite_ids, record_view, recently_viewed, toggle_favorite_car,
+)
+from cars.models import Brand, Car, CarModel, Year
+
+
+class SessionHistoryTest(TestCase):
+    """
+    Tests for the recently viewed and favorite car lists in the session.
+    """
+
+    def setUp(self):
+        self.session = import_module(settings.SESSION_ENGINE).SessionStore()
+
+    def test_recently_viewed_is_a_capped_ring(self):
+        """
+        Newest first, without duplicates, only the last views kept.
+        """
+        with self.settings(CAR_RECENTLY_VIEWED_LIMIT=3):
+            for car_id in (1, 2, 3, 2, 4):
+                record_view(self.session, car_id)
+        self.assertEqual(recently_viewed(self.session), [4, 2, 3])
+
+    def test_viewing_the_latest_car_again_writes_nothing(self):
+        record_view(self.session, 7)
+        self.session.modified = False
+        self.assertFalse(record_view(self.session, 7))
+        self.assertFalse(self.session.modified)
+
+    def test_toggle_favorite(self):
+        self.assertEqual(toggle_favorite_car(self.session, 5), (True, [5]))
+        self.assertEqual(toggle_favorite_car(self.session, 6), (True, [6, 5]))
+        self.assertEqual(toggle_favorite_car(self.session, 5), (False, [6]))
+        self.assertEqual(self.session[FAVORITES_KEY], [6])
+
+    @override_settings(CAR_FAVORITES_LIMIT=2)
+    def test_oldest_favorite_drops_out(self):
+        for car_id in (1, 2, 3):
+            toggle_favorite_car(self.session, car_id)
+        self.assertEqual(favorite_ids(self.session), [3, 2])
+
+    def test_old_string_favorites(self):
+        """
+        Favorites stored by older versions (strings, oldest first) still read.
+        """
+        self.session[FAVORITES_KEY] = ["3", "9", "bad", "3"]
+        self.assertEqual(favorite_ids(self.session), [3, 9])
+        toggle_favorite_car(self.session, 4)
+        self.assertEqual(self.session[FAVORITES_KEY], [4, 3, 9])
+
+
+class SessionHistoryViewsTest(TestCase):
+    """
+    Tests for the views that record the session lists.
+    """
+
+    def setUp(self):
+        model = CarModel.objects.create(name="Sonata", brand=Brand.objects.create(name="Hyundai"))
+        self.cars = [
+            Car.objects.create(
+                brand=model.brand, model=model, year=Year.objects.create(year=2018 + i),
+                price=10000 + i, mileage=1000, engine_volume=2.0, main_image="cars/placeholder.jpg",
+            )
+            for i in range(2)
+        ]
+
+    def test_detail_view_records_and_reload_skips_session_save(self):
+        """
+        A reload of the same car leaves the session untouched.
+        """
+        url = reverse("car_detail", args=[self.cars[0].slug])
+        self.client.get(url)
+        self.assertEqual(self.client.session[VIEWED_KEY], [self.cars[0].pk])
+        response = self.client.get(url)
+        self.assertFalse(response.wsgi_request.session.modified)
+
+    def test_toggle_favorite_view(self):
+        response = self.client.post(reverse("toggle_favorite"), {"car_id": self.cars[1].pk})
+        self.assertEqual(response.json(), {"success": True, "added": True, "favorites_count": 1})
+        self.assertEqual(self.client.session[FAVORITES_KEY], [self.cars[1].pk])
+
+        response = self.client.post(reverse("toggle_favorite"), {"car_id": "abc"})
+        self.assertFalse(response.json()["success"])
+
+    def test_favorites_newest_first_with_hearts(self):
+        for car in self.cars:
+            self.client.post(reverse("toggle_favorite"), {"car_id": car.pk})
+        response = self.client.get(reverse("favorite-cars"))
+        self.assertEqual(list(response.context["cars"]), self.cars[::-1])
+        hearts = re.findall(r"bi-heart-fill\s+position-absolute", response.content.decode())
+        self.assertEqual(len(hearts), 2)
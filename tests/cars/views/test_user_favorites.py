@@ -0,0 +1,89 @@
+import re
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from cars.history import FAVORITES_KEY
+from cars.models import Brand, Car, CarModel, FavoriteCar, Year
+
+
+class UserFavoritesTest(TestCase):
+    """
+    Tests for the favorites of logged-in users, kept in FavoriteCar.
+    """
+
+    def setUp(self):
+        model = CarModel.objects.create(name="Sonata", brand=Brand.objects.create(name="Hyundai"))
+        self.cars = [
+            Car.objects.create(
+                brand=model.brand, model=model, year=Year.objects.create(year=2015 + i),
+                price=10000 + i, mileage=1000, engine_volume=2.0, main_image="cars/placeholder.jpg",
+            )
+            for i in range(4)
+        ]
+        self.user = CustomUser.objects.create_user("buyer", "buyer@example.com", "password123")
+
+    def toggle(self, car_id):
+        return self.client.post(reverse("toggle_favorite"), {"car_id": car_id}).json()
+
+    def hearts(self, response):
+        return len(re.findall(r"bi-heart-fill\s+position-absolute", response.content.decode()))
+
+    def test_toggle_stores_rows_not_session(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.toggle(self.cars[0].pk), {"success": True, "added": True, "favorites_count": 1})
+        self.assertTrue(FavoriteCar.objects.filter(user=self.user, car=self.cars[0]).exists())
+        self.assertNotIn(FAVORITES_KEY, self.client.session)
+
+        self.assertFalse(self.toggle(self.cars[0].pk)["added"])
+        self.assertFalse(FavoriteCar.objects.exists())
+
+    def test_unknown_car_is_rejected(self):
+        self.client.force_login(self.user)
+        self.assertFalse(self.toggle(9999)["success"])
+        self.assertFalse(FavoriteCar.objects.exists())
+
+    def test_login_merges_session_favorites(self):
+        """
+        Anonymous favorites join the account's at login and leave the session.
+        """
+        FavoriteCar.objects.create(user=self.user, car=self.cars[0])
+        for car in (self.cars[0], self.cars[1], self.cars[2]):
+            self.toggle(car.pk)
+        self.cars[2].delete()
+
+        response = self.client.post(reverse("login"), {"username": "buyer", "password": "password123"})
+        self.assertRedirects(response, reverse("home"), fetch_redirect_response=False)
+        self.assertEqual(
+            list(FavoriteCar.objects.filter(user=self.user).values_list("car_id", flat=True)),
+            [self.cars[1].pk, self.cars[0].pk],
+        )
+        self.assertNotIn(FAVORITES_KEY, self.client.session)
+
+    def test_favorites_page_loads_ids_once(self):
+        """
+        The list, the hearts and the recommendations share one id query.
+        """
+        self.client.force_login(self.user)
+        for car in self.cars[:2]:
+            FavoriteCar.objects.create(user=self.user, car=car)
+        response = self.client.get(reverse("favorite-cars"))
+        self.assertEqual(list(response.context["cars"]), [self.cars[1], self.cars[0]])
+        self.assertEqual(self.hearts(response), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("favorite-cars"))
+        favorite_queries = [query for query in queries if "cars_favoritecar" in query["sql"]]
+        self.assertEqual(len(favorite_queries), 1)
+
+    def test_favorites_follow_the_user(self):
+        """
+        Another device, another session: the same favorites.
+        """
+        FavoriteCar.objects.create(user=self.user, car=self.cars[3])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("home"))
+        self.assertEqual(self.hearts(response), 1)